@@ -33,6 +33,78 @@ bool magAvailable = false;
 int leftSpeed = 0;
 int rightSpeed = 0;
 
+// Per-wheel speed commands ("W:left,right") are streamed by the steering
+// controller; the motors stop if the stream goes quiet
+#define WHEEL_COMMAND_TIMEOUT 1000  // ms
+bool wheelMode = false;
+unsigned long lastWheelCommand = 0;
+
+// On-board heading control against the HMC5883: "G:heading" turns in place,
+// "H:heading,speed" drives while holding a heading (heading in tenths of a degree)
+#define HEADING_NONE 0
+#define HEADING_TURN 1
+#define HEADING_HOLD 2
+#define HEADING_CONTROL_INTERVAL 20  // ms (50 Hz)
+#define HEADING_TOLERANCE 2.0        // degrees
+#define HEADING_SETTLE_TIME 200      // ms inside tolerance before a turn is complete
+#define HEADING_TURN_TIMEOUT 5000    // ms
+#define HEADING_KP 3.0               // PWM per degree of error
+#define MAX_TURN_PWM 100
+#define MIN_TURN_PWM 45              // below this the motors stall
+uint8_t headingMode = HEADING_NONE;
+float headingTarget = 0;
+int headingSpeed = 0;
+unsigned long headingStarted = 0;
+unsigned long lastHeadingControl = 0;
+unsigned long headingSettledSince = 0;
+
+// Telemetry streaming (0 = off, sensor data only sent on "S" request)
+unsigned long telemetryInterval = 0;  // ms between pushed sensor frames
+unsigned long lastTelemetry = 0;
+
+// Binary framed protocol (see arduino_protocol.py), enabled with "P:1"
+// Frame: sync, version, type, seq, length, payload, CRC-16/CCITT (little-endian)
+#define PROTO_SYNC 0xA5
+#define PROTO_VERSION 1
+#define MSG_COMMAND 0x01
+#define MSG_ACK 0x02
+#define MSG_SENSOR 0x03
+#define MSG_EVENT 0x04
+#define EVENT_DONE 0
+#define EVENT_TIMEOUT 1
+#define ACK_OK 0
+#define ACK_UNKNOWN 1
+#define MAX_PAYLOAD 16
+
+struct __attribute__((packed)) CommandPayload {
+  char cmd;
+  uint8_t argc;
+  int16_t args[2];
+};
+
+struct __attribute__((packed)) AckPayload {
+  char cmd;
+  uint8_t status;
+};
+
+struct __attribute__((packed)) SensorPayload {
+  uint16_t front;
+  uint16_t left;
+  uint16_t right;
+  int16_t heading;  // tenths of a degree, -1 = no magnetometer
+  uint32_t timestamp;  // millis()
+};
+
+struct __attribute__((packed)) EventPayload {
+  char cmd;
+  uint8_t status;
+  int16_t heading;  // tenths of a degree
+};
+
+bool binaryMode = false;
+uint8_t rxFrame[5 + MAX_PAYLOAD + 2];
+uint8_t rxLen = 0;
+
 void setup() {
   // Initialize serial communication
   Serial.begin(115200);
@@ -54,90 +126,290 @@ void setup() {
 
 void loop() {
   // Check if there's a command from Raspberry Pi
-  if (Serial.available() > 0) {
+  if (binaryMode) {
+    while (Serial.available() > 0) {
+      receiveFrameByte(Serial.read());
+    }
+  }
+  else if (Serial.available() > 0) {
     String command = Serial.readStringUntil('\n');
     processCommand(command);
   }
+
+  // Stop if the Pi stops streaming wheel speeds or heading holds
+  if (wheelMode && millis() - lastWheelCommand > WHEEL_COMMAND_TIMEOUT) {
+    stopMotors();
+    wheelMode = false;
+    headingMode = HEADING_NONE;
+  }
+
+  updateHeadingControl();
+
+  // Push sensor frames at the subscribed rate
+  if (telemetryInterval > 0 && millis() - lastTelemetry >= telemetryInterval) {
+    lastTelemetry = millis();
+    sendSensorData(0);
+  }
 }
 
 void processCommand(String command) {
-  if (command.startsWith("S")) {
-    sendSensorData();  // Sensor readings
-  }
-  else if (command.startsWith("F")) {
-    int speed = 100;
-    if (command.indexOf(':') != -1) {
-      speed = command.substring(command.indexOf(':') + 1).toInt();
+  if (command.length() == 0) return;
+
+  int argc = 0;
+  int args[2] = {0, 0};
+  int colon = command.indexOf(':');
+  if (colon != -1) {
+    String values = command.substring(colon + 1);
+    int comma = values.indexOf(',');
+    args[0] = values.toInt();
+    argc = 1;
+    if (comma != -1) {
+      args[1] = values.substring(comma + 1).toInt();
+      argc = 2;
     }
-    moveForward(speed);
-    Serial.println("Moving forward");
   }
-  else if (command.startsWith("B")) {
-    int speed = 100;
-    if (command.indexOf(':') != -1) {
-      speed = command.substring(command.indexOf(':') + 1).toInt();
-    }
-    moveBackward(speed);
-    Serial.println("Moving backward");
+
+  char cmd = command.charAt(0);
+  const char *reply = executeCommand(cmd, argc, args, 0);
+  if (reply != NULL) {
+    Serial.println(reply);
+  } else if (cmd != 'S') {
+    // Unknown commands, and heading commands without a magnetometer, are rejected
+    // at once so the host falls back instead of waiting for a reply
+    Serial.print("ERR:");
+    Serial.println(cmd);
   }
-  else if (command.startsWith("L")) {
-    int radius = 0;
-    if (command.indexOf(':') != -1) {
-      radius = command.substring(command.indexOf(':') + 1).toInt();
-    }
-    turnLeft(radius);
-    Serial.println("Turning left");
+}
+
+// Runs a command from either protocol and returns the ASCII ack text
+// (NULL when the command sends its own reply or is unknown)
+const char *executeCommand(char cmd, int argc, int *args, uint8_t seq) {
+  if (strchr("FBLRXWGH", cmd) != NULL) {
+    // A new motion command replaces whatever was driving the motors
+    wheelMode = false;
+    headingMode = HEADING_NONE;
   }
-  else if (command.startsWith("R")) {
-    int radius = 0;
-    if (command.indexOf(':') != -1) {
-      radius = command.substring(command.indexOf(':') + 1).toInt();
-    }
-    turnRight(radius);
-    Serial.println("Turning right");
+  switch (cmd) {
+    case 'S':
+      sendSensorData(seq);  // Sensor readings
+      return NULL;
+    case 'T':
+      // Subscribe to pushed telemetry (value = rate in Hz, 0 = stop); rates above
+      // 1000 Hz run every millisecond rather than rounding down to off
+      if (argc > 0 && args[0] > 0) {
+        telemetryInterval = args[0] >= 1000 ? 1 : 1000 / args[0];
+      } else {
+        telemetryInterval = 0;
+      }
+      return "Telemetry set";
+    case 'P':
+      // Switch protocol (value 1 = binary frames, 0 = ASCII lines)
+      binaryMode = argc > 0 && args[0] == 1;
+      rxLen = 0;
+      return "Protocol set";
+    case 'F':
+      moveForward(argc > 0 ? args[0] : 100);
+      return "Moving forward";
+    case 'B':
+      moveBackward(argc > 0 ? args[0] : 100);
+      return "Moving backward";
+    case 'L':
+      turnLeft(argc > 0 ? args[0] : 0);
+      return "Turning left";
+    case 'R':
+      turnRight(argc > 0 ? args[0] : 0);
+      return "Turning right";
+    case 'X':
+      stopMotors();
+      return "Stopped";
+    case 'W':
+      // Signed PWM for each wheel (-255..255), one value sets both
+      setWheelSpeeds(argc > 0 ? args[0] : 0, argc > 1 ? args[1] : (argc > 0 ? args[0] : 0));
+      wheelMode = true;
+      lastWheelCommand = millis();
+      return "Wheels set";
+    case 'G':
+      if (!magAvailable || argc < 1) return NULL;
+      startHeadingControl(HEADING_TURN, args[0], 0);
+      return "Turning to heading";
+    case 'H':
+      if (!magAvailable || argc < 1) return NULL;
+      startHeadingControl(HEADING_HOLD, args[0], argc > 1 ? args[1] : 100);
+      wheelMode = true;  // Held like a wheel-speed stream, so the watchdog applies
+      lastWheelCommand = millis();
+      return "Holding heading";
   }
-  else if (command.startsWith("X")) {
-    stopMotors();
-    Serial.println("Stopped");
+  return NULL;
+}
+
+uint16_t crc16(const uint8_t *data, uint8_t len, uint16_t crc) {
+  for (uint8_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
   }
+  return crc;
 }
 
-void sendSensorData() {
-  StaticJsonDocument<256> doc;
+void sendFrame(uint8_t type, uint8_t seq, const void *payload, uint8_t len) {
+  uint8_t header[5] = {PROTO_SYNC, PROTO_VERSION, type, seq, len};
+  uint16_t crc = crc16(header + 1, 4, 0xFFFF);
+  crc = crc16((const uint8_t *)payload, len, crc);
+  Serial.write(header, 5);
+  Serial.write((const uint8_t *)payload, len);
+  Serial.write((uint8_t)(crc & 0xFF));
+  Serial.write((uint8_t)(crc >> 8));
+}
+
+void receiveFrameByte(uint8_t b) {
+  if (rxLen == 0 && b != PROTO_SYNC) return;  // Resynchronise on the sync byte
+  rxFrame[rxLen++] = b;
+
+  if (rxLen < 5) return;
+  uint8_t payloadLen = rxFrame[4];
+  if (rxFrame[1] != PROTO_VERSION || payloadLen > MAX_PAYLOAD) {
+    rxLen = 0;
+    return;
+  }
+  if (rxLen < 5 + payloadLen + 2) return;
+
+  uint16_t received = rxFrame[5 + payloadLen] | (rxFrame[6 + payloadLen] << 8);
+  rxLen = 0;
+  if (crc16(rxFrame + 1, 4 + payloadLen, 0xFFFF) != received) return;
+  if (rxFrame[2] != MSG_COMMAND || payloadLen != sizeof(CommandPayload)) return;
+
+  CommandPayload command;
+  memcpy(&command, rxFrame + 5, sizeof(command));
+  int args[2] = {command.args[0], command.args[1]};
+  uint8_t seq = rxFrame[3];
+
+  if (command.cmd == 'S') {
+    sendSensorData(seq);  // The sensor frame is the reply
+    return;
+  }
+  // Unknown commands, and heading commands without a magnetometer, are rejected
+  const char *reply = executeCommand(command.cmd, command.argc, args, seq);
+  AckPayload ack = {command.cmd, reply != NULL ? ACK_OK : ACK_UNKNOWN};
+  sendFrame(MSG_ACK, seq, &ack, sizeof(ack));
+}
 
+void readSensors(int &frontDistance, int &leftDistance, int &rightDistance, float &headingDegrees) {
   // Read ultrasonic sensors
-  int frontDistance = sonarFront.ping_cm();
-  int leftDistance = sonarLeft.ping_cm();
-  int rightDistance = sonarRight.ping_cm();
+  frontDistance = sonarFront.ping_cm();
+  leftDistance = sonarLeft.ping_cm();
+  rightDistance = sonarRight.ping_cm();
 
   if (frontDistance == 0) frontDistance = MAX_DISTANCE;
   if (leftDistance == 0) leftDistance = MAX_DISTANCE;
   if (rightDistance == 0) rightDistance = MAX_DISTANCE;
 
-  // Create ultrasonic JSON
-  JsonObject ultrasonic = doc.createNestedObject("ultrasonic");
-  ultrasonic["front"] = frontDistance;
-  ultrasonic["left"] = leftDistance;
-  ultrasonic["right"] = rightDistance;
-
   // Magnetometer data
-  if (magAvailable) {
-    sensors_event_t event;
-    mag.getEvent(&event);
+  headingDegrees = readHeading();
+}
+
+// Magnetometer heading in degrees (0-360), -1 when there is no magnetometer
+float readHeading() {
+  if (!magAvailable) return -1.0;
+
+  sensors_event_t event;
+  mag.getEvent(&event);
+
+  float heading = atan2(event.magnetic.y, event.magnetic.x);
+  float declination = 0.23;
+  heading += declination;
 
-    float heading = atan2(event.magnetic.y, event.magnetic.x);
-    float declination = 0.23;
-    heading += declination;
+  if (heading < 0) heading += 2 * PI;
+  if (heading > 2 * PI) heading -= 2 * PI;
 
-    if (heading < 0) heading += 2 * PI;
-    if (heading > 2 * PI) heading -= 2 * PI;
+  return heading * 180 / PI;
+}
+
+void startHeadingControl(uint8_t mode, int headingTenths, int speed) {
+  headingMode = mode;
+  headingTarget = headingTenths / 10.0;
+  headingSpeed = speed;
+  headingStarted = millis();
+  headingSettledSince = 0;
+  lastHeadingControl = 0;
+}
+
+// Closed heading loop, run from loop() at HEADING_CONTROL_INTERVAL
+void updateHeadingControl() {
+  if (headingMode == HEADING_NONE || millis() - lastHeadingControl < HEADING_CONTROL_INTERVAL) return;
+  lastHeadingControl = millis();
+
+  float heading = readHeading();
+  float error = headingTarget - heading;
+  while (error > 180) error -= 360;
+  while (error < -180) error += 360;
 
-    float headingDegrees = heading * 180 / PI;
-    doc["magnetometer"] = headingDegrees;
+  if (headingMode == HEADING_HOLD) {
+    int turn = constrain((int)(HEADING_KP * error), -MAX_TURN_PWM, MAX_TURN_PWM);
+    setWheelSpeeds(headingSpeed + turn, headingSpeed - turn);
+    return;
+  }
+
+  // Turn in place: done once the heading stays inside the tolerance
+  if (fabs(error) <= HEADING_TOLERANCE) {
+    stopMotors();
+    if (headingSettledSince == 0) headingSettledSince = millis();
+    if (millis() - headingSettledSince >= HEADING_SETTLE_TIME) {
+      finishHeadingTurn(EVENT_DONE, heading);
+    }
+    return;
+  }
+  headingSettledSince = 0;
+  if (millis() - headingStarted > HEADING_TURN_TIMEOUT) {
+    stopMotors();
+    finishHeadingTurn(EVENT_TIMEOUT, heading);
+    return;
+  }
+  int turn = constrain((int)(HEADING_KP * fabs(error)), MIN_TURN_PWM, MAX_TURN_PWM);
+  setWheelSpeeds(error > 0 ? turn : -turn, error > 0 ? -turn : turn);
+}
+
+// Report the end of a turn without waiting to be asked
+void finishHeadingTurn(uint8_t status, float heading) {
+  headingMode = HEADING_NONE;
+  EventPayload event = {'G', status, (int16_t)(heading * 10)};
+  if (binaryMode) {
+    sendFrame(MSG_EVENT, 0, &event, sizeof(event));
   } else {
-    doc["magnetometer"] = -1.0;
+    Serial.print("E:G,");
+    Serial.print(status);
+    Serial.print(",");
+    Serial.println(event.heading);
+  }
+}
+
+// seq is the request being answered (0 for pushed telemetry)
+void sendSensorData(uint8_t seq) {
+  int frontDistance, leftDistance, rightDistance;
+  float headingDegrees;
+  readSensors(frontDistance, leftDistance, rightDistance, headingDegrees);
+
+  if (binaryMode) {
+    SensorPayload payload;
+    payload.front = frontDistance;
+    payload.left = leftDistance;
+    payload.right = rightDistance;
+    payload.heading = headingDegrees < 0 ? -1 : (int16_t)(headingDegrees * 10);
+    payload.timestamp = millis();
+    sendFrame(MSG_SENSOR, seq, &payload, sizeof(payload));
+    return;
   }
 
+  StaticJsonDocument<256> doc;
+
+  // Create ultrasonic JSON
+  JsonObject ultrasonic = doc.createNestedObject("ultrasonic");
+  ultrasonic["front"] = frontDistance;
+  ultrasonic["left"] = leftDistance;
+  ultrasonic["right"] = rightDistance;
+
+  doc["magnetometer"] = headingDegrees;
+
   serializeJson(doc, Serial);
   Serial.println();
 }
@@ -188,6 +460,15 @@ void turnRight(int radius) {
   }
 }
 
+void setWheelSpeeds(int left, int right) {
+  leftSpeed = constrain(left, -255, 255);
+  rightSpeed = constrain(right, -255, 255);
+  analogWrite(LEFT_MOTOR_FWD, leftSpeed > 0 ? leftSpeed : 0);
+  analogWrite(LEFT_MOTOR_BWD, leftSpeed < 0 ? -leftSpeed : 0);
+  analogWrite(RIGHT_MOTOR_FWD, rightSpeed > 0 ? rightSpeed : 0);
+  analogWrite(RIGHT_MOTOR_BWD, rightSpeed < 0 ? -rightSpeed : 0);
+}
+
 void stopMotors() {
   analogWrite(LEFT_MOTOR_FWD, 0);
   analogWrite(LEFT_MOTOR_BWD, 0);
@@ -0,0 +1,390 @@
+# arduino_link.py
+
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import serial
+
+import arduino_protocol as protocol
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+REQUEST_TIMEOUT = 1.0  # seconds to wait for a reply before a request is failed
+POLL_INTERVAL = 0.005  # seconds the owner thread idles when there is nothing to do
+RECONNECT_INTERVAL = 2.0  # seconds between reconnection attempts
+ARDUINO_RESET_DELAY = 2.0  # Arduino resets when the port is opened
+NEGOTIATION_TIMEOUT = 0.5  # seconds to wait for the Arduino to accept binary mode
+
+# Reply lines printed by arduino.ino, mapped to the command that produced them
+ACK_REPLIES = {text: cmd for cmd, text in protocol.ACK_TEXT.items()}
+
+
+def command_args(value: Union[int, Tuple[int, ...], None]) -> Tuple[int, ...]:
+    """Normalise a command value (None, one int or several) to a tuple of ints"""
+    if value is None:
+        return ()
+    if isinstance(value, (tuple, list)):
+        return tuple(int(v) for v in value)
+    return (int(value),)
+
+
+class CommandRequest:
+    """A single command sent to the Arduino and its (eventual) reply"""
+
+    def __init__(self, cmd: str, value: Union[int, Tuple[int, ...], None] = None):
+        self.cmd = cmd
+        self.args = command_args(value)
+        self.line = cmd + (":" + ",".join(str(v) for v in self.args) if self.args else "") + "\n"
+        self.seq = 0  # binary protocol sequence number, assigned when written
+        self.created = time.monotonic()
+        self.sent_at = None
+        self.reply = None
+        self.latency = None
+        self.failed = False
+        self.rejected = False  # Arduino reported the command as unknown
+        self.cancelled = False  # dropped before being written (e.g. superseded by a stop)
+        self._done = threading.Event()
+
+    def resolve(self, reply: Any):
+        """Mark the request complete with a reply (None = failed or timed out)"""
+        self.reply = reply
+        self.failed = reply is None
+        if self.sent_at is not None:
+            self.latency = time.monotonic() - self.sent_at
+        self._done.set()
+
+    def cancel(self):
+        """Drop the request if it has not been written yet"""
+        self.cancelled = True
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Block until the reply arrives and return it (None on timeout or failure)"""
+        self._done.wait(timeout)
+        return self.reply
+
+
+class LatencyStats:
+    """Running command-to-reply latency statistics for one command type"""
+
+    def __init__(self, window: int = 100):
+        self.count = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.total = 0.0
+        self.queued_total = 0.0  # time spent waiting in the queue before being written
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, latency: float, queued: float = 0.0):
+        self.count += 1
+        self.total += latency
+        self.queued_total += queued
+        self.max = max(self.max, latency)
+        self.recent.append(latency)
+
+    def summary(self) -> Dict[str, float]:
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "mean_queued_ms": 1000 * self.queued_total / self.count if self.count else 0.0,
+            "p95_ms": 1000 * recent[int(0.95 * (len(recent) - 1))] if recent else 0.0,
+            "max_ms": 1000 * self.max,
+        }
+
+
+class ArduinoLink:
+    """Single owner of the Arduino serial port
+
+    One background thread does all reads and writes. Commands are queued with
+    submit() and matched to their replies. In binary mode (arduino_protocol.py)
+    every frame carries the sequence number of the request it answers. In
+    ASCII mode JSON lines answer the oldest pending "S" request and ack lines
+    ("Moving forward", ...) answer the oldest pending command of the matching
+    letter. Requests submitted with priority=True (stop) are written before
+    anything already queued. Every sensor frame is also handed to the
+    registered telemetry handlers as a dict, so pushed frames and polled
+    replies feed the same latest-state store.
+    """
+
+    def __init__(self, port="/dev/ttyACM0", baud=115200, protocol_mode="ascii"):
+        self.port = port
+        self.baud = baud
+        self.protocol_mode = protocol_mode  # requested: "ascii" or "binary"
+        self.binary = False  # True once the Arduino has accepted binary frames
+        self.ser = None
+        self.connected = False
+        self._requests = queue.Queue()
+        self._priority = queue.Queue()  # written before anything in _requests
+        self._wakeup = threading.Event()
+        self._pending: deque = deque()
+        self._seq = 0
+        self._decoder = protocol.FrameDecoder()
+        self._telemetry_handlers: List[Callable[[Dict], None]] = []
+        self._event_handlers: List[Callable[[Dict], None]] = []
+        self._stats: Dict[str, LatencyStats] = {}
+        self._stats_lock = threading.Lock()
+        self._last_connect_attempt = 0.0
+
+        self._connect()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="ArduinoLink")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _connect(self):
+        """Open the serial port and wait once for the Arduino to reset"""
+        self._last_connect_attempt = time.monotonic()
+        try:
+            self.ser = serial.Serial(self.port, self.baud, timeout=0)
+            time.sleep(ARDUINO_RESET_DELAY)
+            self.ser.reset_input_buffer()
+            self.connected = True
+            logger.info(f"Connected to Arduino on {self.port}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Arduino: {e}")
+            self.connected = False
+            return
+
+        # A freshly reset Arduino always starts in ASCII mode
+        self.binary = False
+        self._decoder = protocol.FrameDecoder()
+        if self.protocol_mode == "binary":
+            self._negotiate_binary()
+
+    def _negotiate_binary(self):
+        """Ask the Arduino to switch to binary frames, staying in ASCII if it does not answer"""
+        self.ser.write(b"P:1\n")
+        deadline = time.monotonic() + NEGOTIATION_TIMEOUT
+        buffer = bytearray()
+        while time.monotonic() < deadline:
+            buffer.extend(self.ser.read(self.ser.in_waiting or 1))
+            if protocol.ACK_TEXT["P"].encode() in buffer:
+                self.binary = True
+                logger.info("Arduino link using binary protocol")
+                return
+            time.sleep(POLL_INTERVAL)
+        logger.warning("Arduino did not accept binary protocol, using ASCII")
+
+    def add_telemetry_handler(self, handler: Callable[[Dict], None]):
+        """Register a callback for every sensor frame (as a dict), pushed or polled"""
+        self._telemetry_handlers.append(handler)
+
+    def add_event_handler(self, handler: Callable[[Dict], None]):
+        """Register a callback for completion events ({"cmd", "status", "heading"})"""
+        self._event_handlers.append(handler)
+
+    def submit(self, cmd: str, value: Union[int, Tuple[int, ...], None] = None,
+               priority: bool = False) -> CommandRequest:
+        """Queue a command for sending and return immediately"""
+        request = CommandRequest(cmd, value)
+        (self._priority if priority else self._requests).put(request)
+        self._wakeup.set()
+        return request
+
+    def request(self, cmd: str, value: Union[int, Tuple[int, ...], None] = None,
+                timeout: float = REQUEST_TIMEOUT) -> Any:
+        """Send a command and wait for its reply (a dict for "S", ack text otherwise)"""
+        return self.submit(cmd, value).wait(timeout)
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-command latency statistics"""
+        with self._stats_lock:
+            stats = {cmd: stats.summary() for cmd, stats in self._stats.items()}
+        if self.binary:
+            stats["frames"] = {"decoded": self._decoder.frames, "crc_errors": self._decoder.crc_errors,
+                               "discarded_bytes": self._decoder.discarded_bytes}
+        return stats
+
+    def close(self):
+        """Stop the owner thread and close the port"""
+        self.running = False
+        self.thread.join(timeout=1)
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except Exception as e:
+                logger.error(f"Error closing Arduino port: {e}")
+        self.connected = False
+
+    def _run(self):
+        """Owner thread: write queued commands, read and route replies"""
+        buffer = bytearray()
+        while self.running:
+            if not self.connected:
+                self._fail_all_pending()
+                if time.monotonic() - self._last_connect_attempt > RECONNECT_INTERVAL:
+                    self._connect()
+                else:
+                    time.sleep(POLL_INTERVAL)
+                continue
+
+            try:
+                self._write_queued()
+                self._expire_pending()
+
+                waiting = self.ser.in_waiting
+                if waiting:
+                    data = self.ser.read(waiting)
+                    if self.binary:
+                        for msg_type, seq, fields in self._decoder.feed(data):
+                            self._route_frame(msg_type, seq, fields)
+                        continue
+                    buffer.extend(data)
+                    while True:
+                        newline = buffer.find(b"\n")
+                        if newline < 0:
+                            break
+                        line = buffer[:newline].decode("utf-8", errors="replace").strip()
+                        del buffer[:newline + 1]
+                        if line:
+                            self._route_line(line)
+                else:
+                    # Idle until a new command arrives or it is time to poll the port again
+                    self._wakeup.wait(POLL_INTERVAL)
+                    self._wakeup.clear()
+            except Exception as e:
+                logger.error(f"Arduino link error: {e}")
+                self.connected = False
+                buffer.clear()
+
+    def _write_queued(self):
+        for requests in (self._priority, self._requests):
+            while True:
+                try:
+                    request = requests.get_nowait()
+                except queue.Empty:
+                    break
+                self._write(request)
+                if requests is self._requests and not self._priority.empty():
+                    break  # let a newly arrived stop jump the rest of the queue
+        if not self._priority.empty() or not self._requests.empty():
+            self._wakeup.set()
+
+    def _write(self, request: CommandRequest):
+        if request.cancelled:
+            request.resolve(None)
+            with self._stats_lock:
+                self._stats.setdefault(request.cmd, LatencyStats()).cancelled += 1
+            return
+        if self.binary:
+            self._seq = self._seq % 255 + 1  # 0 is reserved for unsolicited frames
+            request.seq = self._seq
+            self.ser.write(protocol.encode_command(request.seq, request.cmd, *request.args))
+        else:
+            self.ser.write(request.line.encode())
+        request.sent_at = time.monotonic()
+        self._pending.append(request)
+
+    def _route_line(self, line: str):
+        """ASCII mode: match a reply line to its pending request, or treat it as telemetry"""
+        if line.startswith(protocol.EVENT_PREFIX):
+            event = protocol.parse_event_line(line)
+            if event is not None:
+                self._publish(self._event_handlers, event)
+            return
+        if line.startswith(protocol.ERROR_PREFIX):
+            cmd = line[len(protocol.ERROR_PREFIX):].strip()
+            for request in self._pending:
+                if request.cmd == cmd:
+                    request.rejected = True
+                    logger.warning(f"Arduino rejected command {request.line.strip()}")
+                    self._complete(request, None)
+                    return
+            return
+        if line.startswith("{"):
+            try:
+                reply = json.loads(line)
+            except ValueError as e:
+                logger.debug(f"Bad sensor frame: {e}")
+                return
+            self._publish(self._telemetry_handlers, reply)
+            cmd = "S"
+        else:
+            reply = line
+            cmd = ACK_REPLIES.get(line)
+
+        if cmd is None:
+            logger.debug(f"Unsolicited Arduino message: {line}")
+            return
+
+        for request in self._pending:
+            if request.cmd == cmd:
+                self._complete(request, reply)
+                return
+
+    def _route_frame(self, msg_type: int, seq: int, fields: tuple):
+        """Binary mode: match a frame to its request by sequence number"""
+        if msg_type == protocol.MSG_SENSOR:
+            reply = protocol.sensor_dict(*fields)
+            self._publish(self._telemetry_handlers, reply)
+        elif msg_type == protocol.MSG_EVENT:
+            self._publish(self._event_handlers, protocol.event_dict(*fields))
+            return
+        elif msg_type == protocol.MSG_ACK:
+            cmd, status = fields
+            reply = protocol.ACK_TEXT.get(cmd, cmd) if status == protocol.ACK_OK else None
+        else:
+            return
+
+        if seq == 0:
+            return
+        for request in self._pending:
+            if request.seq == seq:
+                if reply is None:
+                    request.rejected = True
+                    logger.warning(f"Arduino rejected command {request.line.strip()}")
+                self._complete(request, reply)
+                return
+
+    def _publish(self, handlers: List[Callable[[Dict], None]], data: Dict):
+        for handler in handlers:
+            try:
+                handler(data)
+            except Exception as e:
+                logger.error(f"Arduino message handler error: {e}")
+
+    def _complete(self, request: CommandRequest, reply: Any):
+        self._pending.remove(request)
+        request.resolve(reply)
+        self._record(request)
+
+    def _record(self, request: CommandRequest):
+        with self._stats_lock:
+            stats = self._stats.setdefault(request.cmd, LatencyStats())
+            if request.failed:
+                stats.timeouts += 1
+            else:
+                stats.record(request.latency, request.sent_at - request.created)
+
+    def _expire_pending(self):
+        now = time.monotonic()
+        while self._pending and now - self._pending[0].sent_at > REQUEST_TIMEOUT:
+            request = self._pending.popleft()
+            logger.warning(f"No reply from Arduino for command {request.line.strip()}")
+            request.resolve(None)
+            self._record(request)
+
+    def _fail_all_pending(self):
+        while self._pending:
+            request = self._pending.popleft()
+            request.resolve(None)
+            self._record(request)
+        for requests in (self._priority, self._requests):
+            while True:
+                try:
+                    requests.get_nowait().resolve(None)
+                except queue.Empty:
+                    break
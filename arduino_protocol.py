@@ -0,0 +1,217 @@
+# arduino_protocol.py
+
+import json
+import time
+import struct
+import binascii
+from typing import Dict, List, Optional, Tuple
+
+# Frame layout (all fields little-endian):
+#   sync (0xA5) | version | type | seq | length | payload[length] | crc16
+# The CRC is CRC-16/CCITT-FALSE over version..payload. seq is the request
+# sequence number (1-255); frames the Arduino sends on its own carry seq 0.
+PROTOCOL_VERSION = 1
+SYNC = 0xA5
+HEADER = struct.Struct("<BBBBB")
+CRC = struct.Struct("<H")
+MAX_PAYLOAD = 16
+
+MSG_COMMAND = 0x01
+MSG_ACK = 0x02
+MSG_SENSOR = 0x03
+MSG_EVENT = 0x04
+
+EVENT_DONE = 0
+EVENT_TIMEOUT = 1
+
+ACK_OK = 0
+ACK_UNKNOWN = 1
+
+COMMAND = struct.Struct("<cBhh")  # cmd, argc, arg0, arg1
+ACK = struct.Struct("<cB")  # cmd, status
+SENSOR = struct.Struct("<HHHhI")  # front, left, right (cm), heading (0.1 deg), millis
+EVENT = struct.Struct("<cBh")  # cmd, status, heading (0.1 deg)
+
+# Text the ASCII firmware prints for each acknowledged command
+ACK_TEXT = {
+    "F": "Moving forward",
+    "B": "Moving backward",
+    "L": "Turning left",
+    "R": "Turning right",
+    "X": "Stopped",
+    "W": "Wheels set",
+    "T": "Telemetry set",
+    "P": "Protocol set",
+    "G": "Turning to heading",
+    "H": "Holding heading",
+}
+
+# ASCII form of an event (completion of a long-running command): "E:<cmd>,<status>,<heading tenths>"
+EVENT_PREFIX = "E:"
+# ASCII rejection of a command the firmware does not know or cannot run: "ERR:<cmd>"
+ERROR_PREFIX = "ERR:"
+
+
+def crc16(data, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT-FALSE, computed in C by binascii"""
+    return binascii.crc_hqx(data, crc)
+
+
+def encode_frame(msg_type: int, seq: int, payload: bytes) -> bytes:
+    """Build a complete frame around a payload"""
+    header = HEADER.pack(SYNC, PROTOCOL_VERSION, msg_type, seq, len(payload))
+    crc = crc16(payload, crc16(header[1:]))
+    return header + payload + CRC.pack(crc)
+
+
+def encode_command(seq: int, cmd: str, *args: int) -> bytes:
+    """Encode a motor/sensor command such as ('F', 150) as a frame"""
+    values = list(args[:2]) + [0] * (2 - len(args[:2]))
+    return encode_frame(MSG_COMMAND, seq, COMMAND.pack(cmd.encode(), len(args[:2]), *values))
+
+
+def encode_sensor(seq: int, front: int, left: int, right: int, heading: float, millis: int) -> bytes:
+    """Encode a sensor frame the way arduino.ino does (used by tools and tests)"""
+    heading_tenths = -1 if heading < 0 else int(round(heading * 10))
+    return encode_frame(MSG_SENSOR, seq, SENSOR.pack(front, left, right, heading_tenths, millis & 0xFFFFFFFF))
+
+
+def sensor_dict(front: int, left: int, right: int, heading_tenths: int, millis: int) -> Dict:
+    """Convert unpacked sensor fields to the same structure as the JSON frames"""
+    return {
+        "ultrasonic": {"front": front, "left": left, "right": right},
+        "magnetometer": heading_tenths / 10.0 if heading_tenths >= 0 else -1.0,
+        "millis": millis,
+    }
+
+
+def event_dict(cmd: str, status: int, heading_tenths: int) -> Dict:
+    """Convert unpacked event fields to a dict"""
+    return {"cmd": cmd, "status": status, "heading": heading_tenths / 10.0 if heading_tenths >= 0 else -1.0}
+
+
+def parse_event_line(line: str) -> Optional[Dict]:
+    """Parse an ASCII event line, None if it is malformed"""
+    try:
+        cmd, status, heading = line[len(EVENT_PREFIX):].split(",")
+        return event_dict(cmd, int(status), int(heading))
+    except ValueError:
+        return None
+
+
+class FrameDecoder:
+    """Incremental decoder for the binary framed protocol
+
+    Bytes are appended to a single receive buffer and frames are unpacked in
+    place with struct.unpack_from, so no per-frame slices are made. Consumed
+    bytes are dropped once per feed() call. Corrupt or truncated frames are
+    skipped by rescanning for the next sync byte.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.crc_errors = 0
+        self.discarded_bytes = 0
+
+    def feed(self, data: bytes) -> List[Tuple[int, int, tuple]]:
+        """Add received bytes and return the decoded (type, seq, fields) tuples"""
+        buf = self.buffer
+        buf += data
+        messages = []
+        pos = 0
+        end = len(buf)
+
+        with memoryview(buf) as view:
+            while True:
+                start = buf.find(SYNC, pos)
+                if start < 0:
+                    self.discarded_bytes += end - pos
+                    pos = end
+                    break
+                self.discarded_bytes += start - pos
+                pos = start
+                if end - pos < HEADER.size:
+                    break
+
+                _, version, msg_type, seq, length = HEADER.unpack_from(buf, pos)
+                if version != PROTOCOL_VERSION or length > MAX_PAYLOAD:
+                    pos += 1
+                    self.discarded_bytes += 1
+                    continue
+                frame_end = pos + HEADER.size + length + CRC.size
+                if frame_end > end:
+                    break
+
+                payload_start = pos + HEADER.size
+                (received,) = CRC.unpack_from(buf, frame_end - CRC.size)
+                if crc16(view[pos + 1:frame_end - CRC.size]) != received:
+                    self.crc_errors += 1
+                    pos += 1
+                    self.discarded_bytes += 1
+                    continue
+
+                fields = self._unpack(msg_type, length, buf, payload_start)
+                if fields is not None:
+                    messages.append((msg_type, seq, fields))
+                    self.frames += 1
+                pos = frame_end
+
+        del buf[:pos]
+        return messages
+
+    @staticmethod
+    def _unpack(msg_type: int, length: int, buf: bytearray, offset: int) -> Optional[tuple]:
+        if msg_type == MSG_SENSOR and length == SENSOR.size:
+            return SENSOR.unpack_from(buf, offset)
+        if msg_type == MSG_ACK and length == ACK.size:
+            cmd, status = ACK.unpack_from(buf, offset)
+            return cmd.decode("ascii", errors="replace"), status
+        if msg_type == MSG_EVENT and length == EVENT.size:
+            cmd, status, heading = EVENT.unpack_from(buf, offset)
+            return cmd.decode("ascii", errors="replace"), status, heading
+        if msg_type == MSG_COMMAND and length == COMMAND.size:
+            cmd, argc, arg0, arg1 = COMMAND.unpack_from(buf, offset)
+            return cmd.decode("ascii", errors="replace"), argc, arg0, arg1
+        return None
+
+
+def compare_protocols(frames: int = 20000, baud: int = 115200):
+    """Compare ASCII/JSON and binary sensor frames on size, link rate and decode cost"""
+    readings = [(40 + i % 200, 120 + i % 50, 300 - i % 90, (i * 7) % 3600 / 10.0, 1000 + i * 50)
+                for i in range(frames)]
+
+    ascii_stream = b"".join(
+        (json.dumps({"ultrasonic": {"front": f, "left": l, "right": r}, "magnetometer": h}) + "\r\n").encode()
+        for f, l, r, h, _ in readings)
+    binary_stream = b"".join(encode_sensor(0, f, l, r, h, ms) for f, l, r, h, ms in readings)
+
+    start = time.perf_counter()
+    for line in ascii_stream.split(b"\n"):
+        if line.strip():
+            json.loads(line)
+    ascii_time = time.perf_counter() - start
+
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    chunk = 64  # typical serial read size
+    decoded = 0
+    for i in range(0, len(binary_stream), chunk):
+        decoded += len(decoder.feed(binary_stream[i:i + chunk]))
+    binary_time = time.perf_counter() - start
+    if decoded != frames or decoder.crc_errors:
+        raise RuntimeError(f"binary decoder returned {decoded} of {frames} frames "
+                           f"with {decoder.crc_errors} CRC errors")
+
+    bytes_per_second = baud / 10  # 8N1 framing
+    for name, stream, elapsed in (("ascii/json", ascii_stream, ascii_time),
+                                  ("binary", binary_stream, binary_time)):
+        size = len(stream) / frames
+        print(f"{name:>10}: {size:5.1f} bytes/frame, "
+              f"max {bytes_per_second / size:6.0f} frames/s at {baud} baud, "
+              f"wire time {1000 * size / bytes_per_second:5.2f} ms/frame, "
+              f"decode {1e6 * elapsed / frames:5.2f} us/frame")
+
+
+if __name__ == "__main__":
+    compare_protocols()
@@ -0,0 +1,357 @@
+# caches.py
+
+import re
+import json
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from geodesy import METERS_PER_DEGREE, SAMPLE_ORIGIN, haversine_distances, local_projection
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+CACHE_FILE = "robot_cache.sqlite"
+ROUTE_CACHE_TTL = 7 * 24 * 3600  # seconds; campus walkways rarely change within a week
+ROUTE_CACHE_MEMORY = 128  # routes kept decoded in memory
+ROUTE_CACHE_MAX_ENTRIES = 5000  # routes kept on disk
+ORIGIN_CELL_SIZE = 20.0  # meters; starts in the same grid cell share a cached route
+DESTINATION_DECIMALS = 5  # destination lat/lon rounding in keys (about 1 m)
+GEOCODE_CACHE_TTL = 30 * 24 * 3600  # seconds a resolved address is kept
+GEOCODE_NEGATIVE_TTL = 6 * 3600  # seconds an address Google could not find is remembered
+GEOCODE_CACHE_MEMORY = 256  # addresses kept in memory
+GEOCODE_CACHE_MAX_ENTRIES = 2000  # addresses kept on disk
+ADDRESS_ABBREVIATIONS = {
+    "st": "street", "rd": "road", "ave": "avenue", "blvd": "boulevard", "ln": "lane",
+    "n": "north", "s": "south", "e": "east", "w": "west",
+    "bldg": "building", "blk": "block", "dept": "department", "univ": "university", "inst": "institute",
+    "engg": "engineering", "sci": "science", "lib": "library", "hosp": "hospital", "apt": "apartment",
+    "opp": "opposite", "nr": "near",
+}
+
+
+class CacheStats:
+    """Hit/miss accounting for a PersistentCache"""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0  # misses caused by an entry past its TTL
+        self.stores = 0
+        self.evictions = 0  # entries pruned from disk to stay within max_entries
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+    def __repr__(self):
+        return f"CacheStats({self.as_dict()})"
+
+
+class PersistentCache:
+    """In-memory LRU in front of a SQLite table, with per-entry expiry
+
+    Entries survive restarts in the SQLite file. Each one carries its own
+    expiry time, so callers can keep some results (failures, say) for less
+    time than others. Values pass through encode/decode on their way to and
+    from disk; the memory tier keeps them decoded.
+    """
+
+    def __init__(self, path: str, table: str, ttl: float, memory_size: int, max_entries: int,
+                 encode: Callable[[Any], Any] = json.dumps, decode: Callable[[Any], Any] = json.loads):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.encode = encode
+        self.decode = decode
+        self.stats = CacheStats()
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (expires, value)
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                             "(key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL)")
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+            self._db.commit()
+        except Exception as e:
+            # Still useful as a memory-only cache
+            logger.error(f"Failed to open cache {path}: {e}")
+            self._db = None
+
+    def _remember(self, key: str, expires: float, value: Any):
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None if it is missing or expired"""
+        return self.get_first([key])
+
+    def get_first(self, keys: Sequence[str]) -> Optional[Any]:
+        """Value of the first key with a live entry; counts as one lookup in the stats"""
+        now = time.time()
+        expired = False
+        with self._lock:
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    if entry[0] > now:
+                        self._memory.move_to_end(key)
+                        self.stats.memory_hits += 1
+                        return entry[1]
+                    del self._memory[key]
+
+            for key in keys:
+                row = None
+                if self._db is not None:
+                    try:
+                        row = self._db.execute(f"SELECT value, expires FROM {self.table} WHERE key = ?",
+                                               (key,)).fetchone()
+                        if row is not None and row[1] > now:
+                            self._db.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+                            self._db.commit()
+                    except Exception as e:
+                        logger.error(f"Cache read error: {e}")
+                        row = None
+                if row is None:
+                    continue
+                if row[1] <= now:
+                    expired = True
+                    continue
+                value = self.decode(row[0])
+                self._remember(key, row[1], value)
+                self.stats.disk_hits += 1
+                return value
+
+            self.stats.misses += 1
+            if expired:
+                self.stats.expired += 1
+            return None
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store value under key for ttl seconds (the cache's default TTL if None)"""
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, expires, value)
+            self.stats.stores += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, expires, accessed) "
+                                 "VALUES (?, ?, ?, ?)", (key, self.encode(value), expires, now))
+                self._prune(now)
+                self._db.commit()
+            except Exception as e:
+                logger.error(f"Cache write error: {e}")
+
+    def _prune(self, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        cursor = self._db.execute(f"DELETE FROM {self.table} WHERE expires <= ?", (now,))
+        removed = cursor.rowcount
+        count = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_entries:
+            cursor = self._db.execute(f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                                      "ORDER BY accessed LIMIT ?)", (count - self.max_entries,))
+            removed += cursor.rowcount
+        self.stats.evictions += max(removed, 0)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def _encode_points(points: np.ndarray) -> bytes:
+    return np.ascontiguousarray(points, dtype="<f8").tobytes()
+
+
+def _decode_points(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f8").reshape(-1, 2)
+
+
+class RouteCache:
+    """Waypoint routes keyed by the origin's grid cell and the destination
+
+    Starts a few meters apart fall in the same cell and share one route;
+    lookups also try the neighboring cells within half a cell of the start,
+    so a start just across a cell edge still finds it. Cells are a lat/lon
+    grid sized in meters for each degree of latitude, so keys stay the same
+    wherever the robot's local frame is anchored. A cached route is
+    trimmed to begin at its waypoint nearest the live position, so the
+    robot never drives back to where an earlier trip began.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl: float = ROUTE_CACHE_TTL, cell_size: float = ORIGIN_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cache = PersistentCache(path, "routes", ttl, ROUTE_CACHE_MEMORY, ROUTE_CACHE_MAX_ENTRIES,
+                                     encode=_encode_points, decode=_decode_points)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    def key(self, origin: Tuple[float, float], destination: Union[str, Tuple[float, float]],
+            profile: str = "", offset: Tuple[float, float] = (0.0, 0.0)) -> str:
+        lat_step = self.cell_size / METERS_PER_DEGREE
+        # East-west cell width fixed per whole degree of latitude, so cells tile without gaps
+        lon_step = lat_step / math.cos(math.radians(round(origin[0])))
+        lat = origin[0] + offset[1] / METERS_PER_DEGREE
+        lon = origin[1] + offset[0] / (METERS_PER_DEGREE * math.cos(math.radians(origin[0])))
+        cell = f"{math.floor(lon / lon_step)},{math.floor(lat / lat_step)}"
+        if isinstance(destination, str):
+            target = destination.strip().lower()
+        else:
+            target = f"{destination[0]:.{DESTINATION_DECIMALS}f},{destination[1]:.{DESTINATION_DECIMALS}f}"
+        return f"{profile}|{cell}|{target}"
+
+    def get(self, origin: Tuple[float, float], destination: Union[str, Tuple[float, float]],
+            profile: str = "") -> Optional[List[Tuple[float, float]]]:
+        """Cached waypoints from origin to destination, starting at the one nearest origin"""
+        half = self.cell_size / 2
+        keys = [self.key(origin, destination, profile)]
+        for offset in ((-half, -half), (-half, half), (half, -half), (half, half)):
+            key = self.key(origin, destination, profile, offset)
+            if key not in keys:
+                keys.append(key)
+        points = self.cache.get_first(keys)
+        if points is None or len(points) == 0:
+            return None
+        start = self.nearest_index(points, origin)
+        return [tuple(p) for p in points[start:].tolist()]
+
+    def put(self, origin: Tuple[float, float], destination: Union[str, Tuple[float, float]],
+            waypoints: Sequence[Tuple[float, float]], profile: str = ""):
+        if waypoints:
+            self.cache.put(self.key(origin, destination, profile), np.asarray(waypoints, dtype=float).reshape(-1, 2))
+
+    def nearest_index(self, points: np.ndarray, position: Tuple[float, float]) -> int:
+        """Index of the route point closest to a lat/lon position"""
+        return int(np.argmin(haversine_distances(points[:, 0], points[:, 1], position[0], position[1])))
+
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address: lowercase, no punctuation, common abbreviations spelled out"""
+    text = address.lower().replace("&", " and ")
+    words = re.sub(r"[^a-z0-9]+", " ", text).split()
+    return " ".join(ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+
+
+class GeocodeCache:
+    """Address to coordinates, keyed by the normalized address
+
+    "Main Bldg., Rajpur Rd" and "main building rajpur road" share one entry.
+    Addresses Google answered with no result are cached too, for a shorter
+    time, so a misheard destination does not cost a request on every retry.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, ttl: float = GEOCODE_CACHE_TTL,
+                 negative_ttl: float = GEOCODE_NEGATIVE_TTL):
+        self.negative_ttl = negative_ttl
+        self.cache = PersistentCache(path, "geocodes", ttl, GEOCODE_CACHE_MEMORY, GEOCODE_CACHE_MAX_ENTRIES)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    def get(self, address: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """(cached, coordinates); coordinates is None for a cached "not found" """
+        value = self.cache.get(normalize_address(address))
+        if value is None:
+            return False, None
+        return True, tuple(value) if value else None
+
+    def put(self, address: str, coordinates: Optional[Tuple[float, float]]):
+        """Store coordinates for an address, or None when the geocoder found nothing"""
+        if coordinates is None:
+            self.cache.put(normalize_address(address), [], self.negative_ttl)
+        else:
+            self.cache.put(normalize_address(address), [coordinates[0], coordinates[1]])
+
+
+def directions_profile(tolerance: float, mode: str = "walking") -> str:
+    """RouteCache profile for Directions routes simplified to tolerance meters"""
+    return f"{mode}/{tolerance}"
+
+
+@lru_cache(maxsize=None)
+def route_cache(path: str = CACHE_FILE) -> RouteCache:
+    """Shared RouteCache for a cache file"""
+    return RouteCache(path)
+
+
+@lru_cache(maxsize=None)
+def geocode_cache(path: str = CACHE_FILE) -> GeocodeCache:
+    """Shared GeocodeCache for a cache file"""
+    return GeocodeCache(path)
+
+
+def benchmark(routes: int = 50, lookups: int = 2000, path: str = "/tmp/route_cache_benchmark.sqlite"):
+    """Lookup latency for memory and disk hits, and the hit rate of a tour that repeats its legs"""
+    import os
+    import random
+    rng = random.Random(4)
+    if os.path.exists(path):
+        os.remove(path)
+    projection = local_projection(*SAMPLE_ORIGIN)
+    cache = RouteCache(path)
+    stops = [projection.to_geodetic(rng.uniform(0, 800), rng.uniform(0, 800)) for _ in range(routes)]
+    for a, b in zip(stops, stops[1:]):
+        cache.put(a, b, [a] + [projection.to_geodetic(rng.uniform(0, 800), rng.uniform(0, 800))
+                               for _ in range(40)] + [b])
+
+    # Starts scattered a few meters around each stop, like the robot arriving imprecisely
+    def jittered(point):
+        east, north = projection.to_local(*point)
+        return projection.to_geodetic(east + rng.gauss(0, 3), north + rng.gauss(0, 3))
+
+    legs = [(jittered(a), b) for a, b in zip(stops, stops[1:])]
+    start = time.perf_counter()
+    for i in range(lookups):
+        cache.get(*legs[i % len(legs)])
+    memory_time = (time.perf_counter() - start) / lookups
+
+    reopened = RouteCache(path)
+    start = time.perf_counter()
+    for origin, destination in legs:
+        reopened.get(origin, destination)
+    disk_time = (time.perf_counter() - start) / len(legs)
+    print(f"memory hit {1000 * memory_time:.3f} ms, disk hit after restart {1000 * disk_time:.3f} ms")
+    print(f"jittered starts: {cache.stats}")
+    print(f"after restart:   {reopened.stats}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,470 @@
+# campus_graph.py
+
+import os
+import csv
+import sys
+import json
+import math
+import time
+import heapq
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from geodesy import SAMPLE_ORIGIN, LocalProjection, centroid, local_projection
+from route import simplify_indices, SIMPLIFY_TOLERANCE
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+CAMPUS_GRAPH_FILE = "campus_graph.npz"
+PATH_SAMPLE_SPACING = 3.0  # meters between points when densifying drawn paths and tracks
+NODE_MERGE_DISTANCE = 2.5  # meters; points this close share a node, which joins crossing paths
+MAX_SNAP_DISTANCE = 25.0  # meters from the graph a start or goal may be before falling back
+
+
+def load_geojson_paths(path: str) -> List[List[Tuple[float, float]]]:
+    """Lat/lon polylines from the LineString and MultiLineString features of a GeoJSON file"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    features = data.get("features", [data])
+    paths = []
+    for feature in features:
+        geometry = feature.get("geometry", feature)
+        if geometry.get("type") == "LineString":
+            lines = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiLineString":
+            lines = geometry["coordinates"]
+        else:
+            continue
+        # GeoJSON stores [lon, lat]
+        paths.extend([[(c[1], c[0]) for c in line] for line in lines])
+    return paths
+
+
+def load_track_csv(path: str) -> List[Tuple[float, float]]:
+    """Lat/lon points from a recorded track CSV with lat and lon columns"""
+    with open(path, 'r', newline='') as f:
+        return [(float(row["lat"]), float(row["lon"])) for row in csv.DictReader(f)]
+
+
+class CampusGraph:
+    """Walkable campus paths as a graph in compressed sparse row (CSR) form
+
+    Node i's neighbors are indices[indptr[i]:indptr[i + 1]] with the edge
+    lengths in the same slice of weights. Node positions are campus-plane
+    meters, so straight-line distance is an admissible A* heuristic.
+    Shortest paths between landmarks are precomputed and saved with the
+    graph, so planning between them is a dictionary lookup. Searches can
+    add per-edge penalties (walkways found blocked) to the stored lengths.
+    """
+
+    def __init__(self, xy: np.ndarray, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray,
+                 projection: LocalProjection):
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.indptr = np.asarray(indptr, dtype=np.int32)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.projection = projection
+        self.landmark_nodes: Dict[str, int] = {}
+        self._paths: Dict[Tuple[int, int], List[int]] = {}
+        self.penalties: Optional[np.ndarray] = None  # extra meters per edge, CSR order
+        # Plain lists for the search loops, where numpy scalar indexing dominates
+        self._x = self.xy[:, 0].tolist()
+        self._y = self.xy[:, 1].tolist()
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._weights = self.weights.tolist()
+
+    def __len__(self):
+        return len(self.xy)
+
+    @property
+    def edges(self) -> int:
+        return len(self.indices) // 2
+
+    def set_edge_penalties(self, penalties: Optional[np.ndarray]):
+        """Add extra meters to each edge (CSR order) in every search; None or all zeros removes them"""
+        if penalties is None or not np.any(penalties):
+            self.penalties = None
+            self._weights = self.weights.tolist()
+        else:
+            self.penalties = np.asarray(penalties, dtype=np.float32)
+            self._weights = (self.weights + self.penalties).tolist()
+
+    def nearest_node(self, east: float, north: float) -> Tuple[int, float]:
+        """(node, distance in meters) of the graph node closest to a local position"""
+        d = self.xy - (east, north)
+        distances = np.einsum("ij,ij->i", d, d)
+        node = int(np.argmin(distances))
+        return node, math.sqrt(distances[node])
+
+    def astar(self, source: int, target: int) -> Optional[List[int]]:
+        """Shortest node path from source to target, or None if they are not connected"""
+        x, y, indptr, indices, weights = self._x, self._y, self._indptr, self._indices, self._weights
+        tx, ty = x[target], y[target]
+        best = {source: 0.0}
+        previous = {source: -1}
+        heap = [(math.hypot(x[source] - tx, y[source] - ty), 0.0, source)]
+        closed = set()
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                return self._unwind(previous, target)
+            if node in closed:
+                continue
+            closed.add(node)
+            for i in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[i]
+                new_cost = cost + weights[i]
+                if new_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = new_cost
+                    previous[neighbor] = node
+                    heapq.heappush(heap, (new_cost + math.hypot(x[neighbor] - tx, y[neighbor] - ty),
+                                          new_cost, neighbor))
+        return None
+
+    def shortest_paths_from(self, source: int) -> Dict[int, int]:
+        """Dijkstra from source; returns the predecessor of every reachable node"""
+        return self._dijkstra(source)[1]
+
+    def distances_from(self, source: int) -> Dict[int, float]:
+        """Dijkstra from source; returns the path length in meters to every reachable node"""
+        return self._dijkstra(source)[0]
+
+    def _dijkstra(self, source: int) -> Tuple[Dict[int, float], Dict[int, int]]:
+        indptr, indices, weights = self._indptr, self._indices, self._weights
+        best = {source: 0.0}
+        previous = {source: -1}
+        heap = [(0.0, source)]
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > best[node]:
+                continue
+            for i in range(indptr[node], indptr[node + 1]):
+                neighbor = indices[i]
+                new_cost = cost + weights[i]
+                if new_cost < best.get(neighbor, math.inf):
+                    best[neighbor] = new_cost
+                    previous[neighbor] = node
+                    heapq.heappush(heap, (new_cost, neighbor))
+        return best, previous
+
+    @staticmethod
+    def _unwind(previous: Dict[int, int], target: int) -> List[int]:
+        path = []
+        node = target
+        while node != -1:
+            path.append(node)
+            node = previous[node]
+        path.reverse()
+        return path
+
+    def path_length(self, nodes: Sequence[int]) -> float:
+        xy = self.xy[list(nodes)]
+        return float(np.hypot(*np.diff(xy, axis=0).T).sum()) if len(nodes) > 1 else 0.0
+
+    def precompute_landmark_paths(self, landmarks: Dict[str, Tuple[float, float]]):
+        """Snap landmarks to the graph and store the shortest path between every pair
+
+        One Dijkstra per landmark covers its paths to all the others.
+        """
+        self.landmark_nodes = {}
+        for name, (lat, lon) in landmarks.items():
+            node, distance = self.nearest_node(*self.projection.to_local(lat, lon))
+            if distance <= MAX_SNAP_DISTANCE:
+                self.landmark_nodes[name] = node
+            else:
+                logger.warning(f"Landmark {name} is {distance:.0f}m from the nearest campus path, not routed")
+
+        self._paths = {}
+        nodes = sorted(set(self.landmark_nodes.values()))
+        for source in nodes:
+            previous = self.shortest_paths_from(source)
+            for target in nodes:
+                if target != source and target in previous:
+                    self._paths[(source, target)] = self._unwind(previous, target)
+        logger.info(f"Precomputed {len(self._paths)} paths between {len(self.landmark_nodes)} landmarks")
+
+    def landmark_path(self, origin: str, destination: str) -> Optional[List[int]]:
+        """Precomputed node path between two landmarks, if both are on the graph and connected
+        (searched afresh while edge penalties are set)
+        """
+        if origin not in self.landmark_nodes or destination not in self.landmark_nodes:
+            return None
+        source, target = self.landmark_nodes[origin], self.landmark_nodes[destination]
+        if source == target:
+            return [source]
+        if self.penalties is not None:
+            return self.astar(source, target)
+        return self._paths.get((source, target))
+
+    def plan(self, start: Tuple[float, float], end: Tuple[float, float]) -> Optional[List[Tuple[float, float]]]:
+        """Lat/lon waypoints from start to end along campus paths, or None if the graph cannot route it"""
+        source, source_distance = self.nearest_node(*self.projection.to_local(*start))
+        target, target_distance = self.nearest_node(*self.projection.to_local(*end))
+        if source_distance > MAX_SNAP_DISTANCE or target_distance > MAX_SNAP_DISTANCE:
+            logger.info(f"Route endpoints are {source_distance:.0f}m and {target_distance:.0f}m "
+                        f"from the campus graph, beyond {MAX_SNAP_DISTANCE:.0f}m")
+            return None
+
+        # Precomputed paths ignore penalties, so search afresh while any walkway is penalized
+        precomputed = self._paths.get((source, target)) if self.penalties is None else None
+        nodes = [source] if source == target else precomputed or self.astar(source, target)
+        if nodes is None:
+            logger.info("Start and destination are not connected in the campus graph")
+            return None
+        lat, lon = self.projection.to_geodetic(self.xy[nodes, 0], self.xy[nodes, 1])
+        return list(zip(lat.tolist(), lon.tolist())) + [tuple(end)]
+
+    def save(self, path: str = CAMPUS_GRAPH_FILE):
+        """Write the graph and its precomputed landmark paths to a compressed .npz file"""
+        pairs = sorted(self._paths)
+        offsets = np.cumsum([0] + [len(self._paths[p]) for p in pairs])
+        np.savez_compressed(
+            path,
+            origin=np.array([self.projection.origin_lat, self.projection.origin_lon]),
+            xy=self.xy, indptr=self.indptr, indices=self.indices, weights=self.weights,
+            landmark_names=np.array(list(self.landmark_nodes), dtype=str),
+            landmark_nodes=np.array(list(self.landmark_nodes.values()), dtype=np.int32),
+            path_pairs=np.array(pairs, dtype=np.int32).reshape(-1, 2),
+            path_offsets=offsets.astype(np.int64),
+            path_nodes=np.array([n for p in pairs for n in self._paths[p]], dtype=np.int32),
+        )
+        logger.info(f"Saved campus graph with {len(self)} nodes, {self.edges} edges to {path}")
+
+    @classmethod
+    def load(cls, path: str = CAMPUS_GRAPH_FILE) -> Optional["CampusGraph"]:
+        """Read a graph written by save(), or None if the file is missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                graph = cls(data["xy"], data["indptr"], data["indices"], data["weights"],
+                            local_projection(*data["origin"].tolist()))
+                graph.landmark_nodes = dict(zip(data["landmark_names"].tolist(), data["landmark_nodes"].tolist()))
+                offsets = data["path_offsets"].tolist()
+                nodes = data["path_nodes"].tolist()
+                for i, (source, target) in enumerate(data["path_pairs"].tolist()):
+                    graph._paths[(source, target)] = nodes[offsets[i]:offsets[i + 1]]
+            logger.info(f"Loaded campus graph with {len(graph)} nodes, {graph.edges} edges, "
+                        f"{len(graph._paths)} landmark paths from {path}")
+            return graph
+        except Exception as e:
+            logger.error(f"Failed to load campus graph from {path}: {e}")
+            return None
+
+
+class CampusGraphBuilder:
+    """Builds a CampusGraph from hand-drawn paths and recorded GPS tracks
+
+    Paths are resampled every PATH_SAMPLE_SPACING meters and each sample
+    snaps to any existing node within NODE_MERGE_DISTANCE, so paths that
+    cross or retrace each other share nodes. build() then thins each chain
+    between junctions with Douglas-Peucker. Without a projection the graph
+    is anchored at the centroid of everything added; the origin is saved
+    with the graph either way.
+    """
+
+    def __init__(self, projection: Optional[LocalProjection] = None):
+        self.projection = projection
+        self._paths: List[Sequence[Tuple[float, float]]] = []
+        self._xy: List[Tuple[float, float]] = []
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        self._edges: Set[Tuple[int, int]] = set()
+
+    def _cell(self, east: float, north: float) -> Tuple[int, int]:
+        return math.floor(east / NODE_MERGE_DISTANCE), math.floor(north / NODE_MERGE_DISTANCE)
+
+    def _node(self, east: float, north: float) -> int:
+        """Existing node within the merge distance of a point, or a new one"""
+        cx, cy = self._cell(east, north)
+        best, best_distance = None, NODE_MERGE_DISTANCE
+        for x in (cx - 1, cx, cx + 1):
+            for y in (cy - 1, cy, cy + 1):
+                for node in self._grid.get((x, y), ()):
+                    distance = math.hypot(self._xy[node][0] - east, self._xy[node][1] - north)
+                    if distance <= best_distance:
+                        best, best_distance = node, distance
+        if best is not None:
+            return best
+        self._xy.append((east, north))
+        self._grid.setdefault((cx, cy), []).append(len(self._xy) - 1)
+        return len(self._xy) - 1
+
+    def add_path(self, points: Sequence[Tuple[float, float]]):
+        """Add a walkable lat/lon polyline (both directions)"""
+        if len(points) >= 2:
+            self._paths.append(points)
+
+    def _sample(self, points: Sequence[Tuple[float, float]]):
+        """Resample one polyline into nodes and edges"""
+        xy = self.projection.points_to_local(points)
+        previous = None
+        for (x0, y0), (x1, y1) in zip(xy[:-1].tolist(), xy[1:].tolist()):
+            steps = max(1, math.ceil(math.hypot(x1 - x0, y1 - y0) / PATH_SAMPLE_SPACING))
+            for k in range(steps + 1):
+                node = self._node(x0 + (x1 - x0) * k / steps, y0 + (y1 - y0) * k / steps)
+                if previous is not None and node != previous:
+                    self._edges.add((min(node, previous), max(node, previous)))
+                previous = node
+
+    def build(self, tolerance: float = SIMPLIFY_TOLERANCE) -> CampusGraph:
+        """Compact the sampled paths into a CSR CampusGraph"""
+        if self.projection is None:
+            if not self._paths:
+                raise ValueError("No paths to build a campus graph from")
+            self.projection = local_projection(*centroid([p for path in self._paths for p in path]))
+        self._xy, self._grid, self._edges = [], {}, set()
+        for points in self._paths:
+            self._sample(points)
+
+        neighbors: Dict[int, List[int]] = {}
+        for a, b in self._edges:
+            neighbors.setdefault(a, []).append(b)
+            neighbors.setdefault(b, []).append(a)
+        xy = np.array(self._xy, dtype=float).reshape(-1, 2)
+
+        # Walk every chain of degree-2 nodes between junctions and keep its Douglas-Peucker points
+        anchors = {node for node, adjacent in neighbors.items() if len(adjacent) != 2}
+        visited: Set[Tuple[int, int]] = set()
+        kept_edges: Dict[Tuple[int, int], float] = {}
+
+        def walk(start: int, step: int):
+            chain = [start, step]
+            visited.add((min(start, step), max(start, step)))
+            while chain[-1] not in anchors and chain[-1] != start:
+                a, b = neighbors[chain[-1]]
+                following = b if a == chain[-2] else a
+                visited.add((min(chain[-1], following), max(chain[-1], following)))
+                chain.append(following)
+            chain_xy = xy[chain]
+            lengths = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(chain_xy, axis=0).T))))
+            keep = simplify_indices(chain_xy, tolerance)
+            for i, j in zip(keep, keep[1:]):
+                a, b = chain[i], chain[j]
+                if a != b:
+                    key = (min(a, b), max(a, b))
+                    kept_edges[key] = min(kept_edges.get(key, math.inf), lengths[j] - lengths[i])
+
+        for anchor in sorted(anchors):
+            for step in neighbors[anchor]:
+                if (min(anchor, step), max(anchor, step)) not in visited:
+                    walk(anchor, step)
+        # Closed loops with no junction on them
+        for a, b in sorted(self._edges - visited):
+            if (a, b) not in visited:
+                anchors.add(a)
+                walk(a, b)
+
+        # Renumber the kept nodes and lay the edges out in CSR order
+        used = sorted({n for edge in kept_edges for n in edge})
+        renumber = {old: new for new, old in enumerate(used)}
+        sources, targets, weights = [], [], []
+        for (a, b), length in kept_edges.items():
+            sources += [renumber[a], renumber[b]]
+            targets += [renumber[b], renumber[a]]
+            weights += [length, length]
+        order = np.argsort(sources, kind="stable")
+        sources = np.array(sources, dtype=np.int32)[order]
+        indptr = np.searchsorted(sources, np.arange(len(used) + 1)).astype(np.int32)
+        graph = CampusGraph(xy[used], indptr, np.array(targets, dtype=np.int32)[order],
+                            np.array(weights, dtype=np.float32)[order], self.projection)
+        logger.info(f"Campus graph built: {len(self._xy)} sampled points -> {len(graph)} nodes, {graph.edges} edges")
+        return graph
+
+
+def build_campus_graph(path_files: Iterable[str], landmarks_file: Optional[str] = None,
+                       output: str = CAMPUS_GRAPH_FILE) -> CampusGraph:
+    """Build, precompute and save a graph from .geojson paths and .csv tracks
+
+    The graph's frame is anchored at the landmarks' centroid, or at the
+    paths' when there is no landmarks file.
+    """
+    landmarks = {}
+    if landmarks_file and os.path.exists(landmarks_file):
+        with open(landmarks_file, 'r') as f:
+            landmarks = {name: tuple(info["coordinates"]) for name, info in json.load(f).items()
+                         if info and info.get("coordinates")}
+    builder = CampusGraphBuilder(local_projection(*centroid(list(landmarks.values()))) if landmarks else None)
+    for path_file in path_files:
+        paths = load_geojson_paths(path_file) if path_file.endswith((".geojson", ".json")) \
+            else [load_track_csv(path_file)]
+        for points in paths:
+            builder.add_path(points)
+    graph = builder.build()
+    if landmarks:
+        graph.precompute_landmark_paths(landmarks)
+    graph.save(output)
+    return graph
+
+
+def benchmark(blocks: int = 40, block_size: float = 30.0, landmarks: int = 30, queries: int = 200):
+    """Plan on a synthetic campus of gridded walkways and compare with plain Dijkstra"""
+    import random
+    rng = random.Random(9)
+    projection = local_projection(*SAMPLE_ORIGIN)
+    builder = CampusGraphBuilder(projection)
+    extent = blocks * block_size
+    # Walkways along every grid line, with a few blocks' worth removed to force detours
+    for i in range(blocks + 1):
+        for horizontal in (True, False):
+            cuts = sorted(rng.sample(range(blocks), 3))
+            start = 0
+            for cut in cuts + [blocks]:
+                a, b = start * block_size, cut * block_size
+                if b > a:
+                    line = [(a, i * block_size), (b, i * block_size)] if horizontal else \
+                        [(i * block_size, a), (i * block_size, b)]
+                    builder.add_path([projection.to_geodetic(e, n) for e, n in line])
+                start = cut + 1
+    start_time = time.perf_counter()
+    graph = builder.build()
+    print(f"Built {len(graph)} nodes, {graph.edges} edges in {1000 * (time.perf_counter() - start_time):.0f} ms")
+
+    points = {f"lm-{i}": projection.to_geodetic(rng.uniform(0, extent), rng.uniform(0, extent))
+              for i in range(landmarks)}
+    start_time = time.perf_counter()
+    graph.precompute_landmark_paths(points)
+    print(f"Precomputed {len(graph._paths)} landmark paths in {1000 * (time.perf_counter() - start_time):.0f} ms")
+
+    path = "/tmp/campus_graph_benchmark.npz"
+    graph.save(path)
+    start_time = time.perf_counter()
+    loaded = CampusGraph.load(path)
+    print(f"Saved {os.path.getsize(path) / 1024:.0f} KiB, loaded in {1000 * (time.perf_counter() - start_time):.1f} ms")
+
+    pairs = [(rng.randrange(len(graph)), rng.randrange(len(graph))) for _ in range(queries)]
+    start_time = time.perf_counter()
+    found = [loaded.astar(s, t) for s, t in pairs]
+    astar_time = (time.perf_counter() - start_time) / queries
+    start_time = time.perf_counter()
+    trees = [loaded.shortest_paths_from(s) for s, _ in pairs]
+    dijkstra_time = (time.perf_counter() - start_time) / queries
+    optimal = all(path is None and t not in tree or
+                  path is not None and abs(loaded.path_length(path) - loaded.path_length(loaded._unwind(tree, t))) < 1e-6
+                  for path, tree, (_, t) in zip(found, trees, pairs))
+    print(f"A*: {1000 * astar_time:.2f} ms per query, Dijkstra: {1000 * dijkstra_time:.2f} ms, "
+          f"A* paths {'optimal' if optimal else 'NOT optimal'}")
+
+    names = list(loaded.landmark_nodes)
+    start_time = time.perf_counter()
+    for _ in range(queries):
+        loaded.plan(points[rng.choice(names)], points[rng.choice(names)])
+    print(f"plan() between landmarks: {1000 * (time.perf_counter() - start_time) / queries:.3f} ms per route")
+
+
+if __name__ == "__main__":
+    # python campus_graph.py build <paths.geojson|track.csv>... [--landmarks campus_landmarks.json]
+    if len(sys.argv) > 2 and sys.argv[1] == "build":
+        args = sys.argv[2:]
+        landmarks_file = "campus_landmarks.json"
+        if "--landmarks" in args:
+            i = args.index("--landmarks")
+            landmarks_file = args[i + 1]
+            args = args[:i] + args[i + 2:]
+        logging.basicConfig(level=logging.INFO)
+        build_campus_graph(args, landmarks_file)
+    else:
+        benchmark()
@@ -0,0 +1,162 @@
+# control_scheduler.py
+
+import time
+import random
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+CONTROL_RATE = 20  # Hz
+HISTOGRAM_BINS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100]  # upper bounds; the last bucket is open-ended
+
+
+class Histogram:
+    """Counts of millisecond values in fixed buckets"""
+
+    def __init__(self, bounds_ms: List[float] = HISTOGRAM_BINS_MS):
+        self.bounds = bounds_ms
+        self.counts = [0] * (len(bounds_ms) + 1)
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+        self.n = 0
+
+    def add(self, value_ms: float):
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.total_ms += value_ms
+        self.n += 1
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def as_dict(self) -> Dict[str, int]:
+        labels = [f"<={b}ms" for b in self.bounds] + [f">{self.bounds[-1]}ms"]
+        return {label: count for label, count in zip(labels, self.counts) if count}
+
+    def __repr__(self):
+        mean = self.total_ms / self.n if self.n else 0.0
+        return f"mean {mean:.2f}ms, max {self.max_ms:.2f}ms, {self.as_dict()}"
+
+
+class ControlStats:
+    """Per-tick accounting for a ControlScheduler"""
+
+    def __init__(self):
+        self.ticks = 0
+        self.early_wakes = 0  # ticks started by new data before the deadline
+        self.overruns = 0  # ticks whose step ran past the next deadline
+        self.missed_ticks = 0  # deadlines skipped because of overruns
+        self.compute = Histogram()  # step() duration
+        self.jitter = Histogram()  # wake-up lateness against the deadline
+
+    def summary(self) -> Dict:
+        return {
+            "ticks": self.ticks,
+            "early_wakes": self.early_wakes,
+            "overruns": self.overruns,
+            "missed_ticks": self.missed_ticks,
+            "compute": repr(self.compute),
+            "jitter": repr(self.jitter),
+        }
+
+
+class ControlScheduler:
+    """Runs a control step at a fixed rate on the monotonic clock
+
+    Deadlines are absolute (start + k * period), so sleep error and step
+    time never accumulate into rate drift. A step that overruns skips the
+    deadlines it missed instead of running a burst of catch-up ticks. When a
+    wake event is given, new data starts a tick immediately and the grid is
+    re-anchored at that tick, so the step never runs slower than the rate
+    and reacts to fresh sensor frames without waiting out the period.
+
+    step(now) returns True when the controlled task is finished.
+    """
+
+    def __init__(self, step: Callable[[float], bool], rate_hz: float = CONTROL_RATE,
+                 wake_event: Optional[threading.Event] = None, stats: Optional[ControlStats] = None):
+        self.step = step
+        self.period = 1.0 / rate_hz
+        self.wake_event = wake_event
+        self.stats = stats if stats is not None else ControlStats()
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Make run() return after the current tick"""
+        self._stop.set()
+        if self.wake_event is not None:
+            self.wake_event.set()
+
+    def run(self) -> bool:
+        """Run ticks until step() reports completion (True) or stop() is called (False)"""
+        stats = self.stats
+        period = self.period
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            early = False
+            if now < deadline:
+                if self.wake_event is not None:
+                    early = self.wake_event.wait(deadline - now)
+                    self.wake_event.clear()
+                else:
+                    time.sleep(deadline - now)
+                if self._stop.is_set():
+                    break
+                now = time.monotonic()
+
+            if early and now < deadline:
+                stats.early_wakes += 1
+                deadline = now
+            else:
+                stats.jitter.add(max(now - deadline, 0.0) * 1000)
+
+            finished = self.step(now)
+            done = time.monotonic()
+            stats.ticks += 1
+            stats.compute.add((done - now) * 1000)
+            if finished:
+                return True
+
+            deadline += period
+            if done > deadline:
+                missed = int((done - deadline) / period) + 1
+                stats.overruns += 1
+                stats.missed_ticks += missed
+                deadline += missed * period
+        return False
+
+
+def compare_pacing(duration: float = 3.0, rate_hz: float = CONTROL_RATE):
+    """Compare a sleep-paced loop with the scheduler on a step of varying cost"""
+    rng = random.Random(3)
+
+    def work():
+        time.sleep(rng.uniform(0.002, 0.02))  # sensor math, serial writes, logging
+
+    ticks = 0
+    start = time.monotonic()
+    while time.monotonic() - start < duration:
+        work()
+        time.sleep(1.0 / rate_hz)
+        ticks += 1
+    print(f"sleep-paced: {ticks / duration:5.1f} Hz achieved (target {rate_hz} Hz)")
+
+    end = time.monotonic() + duration
+
+    def step(now):
+        work()
+        return now >= end
+
+    scheduler = ControlScheduler(step, rate_hz)
+    scheduler.run()
+    stats = scheduler.stats
+    print(f"  scheduler: {stats.ticks / duration:5.1f} Hz achieved, {stats.overruns} overruns")
+    print(f"    compute: {stats.compute}")
+    print(f"     jitter: {stats.jitter}")
+
+
+if __name__ == "__main__":
+    compare_pacing()
@@ -0,0 +1,250 @@
+# geofence.py
+
+import math
+import time
+import heapq
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from geodesy import SAMPLE_ORIGIN, LocalProjection, centroid, local_projection
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+GRID_CELL_SIZE = 25.0  # meters per grid cell, about one geofence across
+GEOFENCE_RADIUS = 15.0  # meters around a landmark that count as passing it
+GEOFENCE_EXIT_MARGIN = 3.0  # meters beyond the radius before an exit, so GPS noise does not flap
+
+
+@dataclass(frozen=True)
+class GeofenceEvent:
+    """The robot entered or left a landmark's geofence"""
+    kind: str  # "enter" or "exit"
+    name: str
+    distance: float  # meters from the landmark when the event fired
+    t: float  # time.monotonic() of the position that caused it
+
+
+class ProximityIndex:
+    """Uniform grid over landmark positions in campus-plane meters
+
+    Each landmark is stored in the cell holding its position, for nearest
+    and radius queries that only visit cells near the query point. Its
+    geofence is also registered in every cell the fence (plus exit margin)
+    overlaps, so the fences around a position are one dictionary lookup.
+    Without a projection the grid is anchored at the landmarks themselves.
+    """
+
+    def __init__(self, projection: Optional[LocalProjection] = None, cell_size: float = GRID_CELL_SIZE):
+        self.projection = projection
+        self.cell_size = cell_size
+        self._landmarks: Dict[str, Tuple[float, float, float]] = {}  # name -> (east, north, radius)
+        self._point_cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._fence_cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._cell_bounds: Optional[Tuple[int, int, int, int]] = None  # min/max occupied cell x, y
+
+    def __len__(self):
+        return len(self._landmarks)
+
+    def __contains__(self, name):
+        return name in self._landmarks
+
+    def _cell(self, east: float, north: float) -> Tuple[int, int]:
+        return math.floor(east / self.cell_size), math.floor(north / self.cell_size)
+
+    def _cells_around(self, east: float, north: float, radius: float):
+        x0, y0 = self._cell(east - radius, north - radius)
+        x1, y1 = self._cell(east + radius, north + radius)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield x, y
+
+    def build(self, landmarks: Dict[str, Dict]):
+        """Rebuild the index from a campus_landmarks dictionary"""
+        self.__init__(self.projection, self.cell_size)
+        points = [info["coordinates"] for info in landmarks.values() if info and info.get("coordinates")]
+        if self.projection is None and points:
+            self.projection = local_projection(*centroid(points))
+        for name, info in landmarks.items():
+            if info and info.get("coordinates"):
+                lat, lon = info["coordinates"]
+                self.add(name, lat, lon, info.get("geofence_radius"))
+        logger.info(f"Proximity index built with {len(self._landmarks)} landmarks")
+
+    def add(self, name: str, lat: float, lon: float, radius: Optional[float] = None):
+        """Add or move a landmark and its geofence"""
+        if name in self._landmarks:
+            self.remove(name)
+        if self.projection is None:
+            self.projection = local_projection(lat, lon)
+        east, north = self.projection.to_local(lat, lon)
+        radius = GEOFENCE_RADIUS if radius is None else radius
+        self._landmarks[name] = (east, north, radius)
+
+        cell = self._cell(east, north)
+        self._point_cells.setdefault(cell, set()).add(name)
+        for fence_cell in self._cells_around(east, north, radius + GEOFENCE_EXIT_MARGIN):
+            self._fence_cells.setdefault(fence_cell, set()).add(name)
+
+        if self._cell_bounds is None:
+            self._cell_bounds = (cell[0], cell[0], cell[1], cell[1])
+        else:
+            x0, x1, y0, y1 = self._cell_bounds
+            self._cell_bounds = (min(x0, cell[0]), max(x1, cell[0]), min(y0, cell[1]), max(y1, cell[1]))
+
+    def remove(self, name: str):
+        """Remove a landmark and its geofence from the index"""
+        entry = self._landmarks.pop(name, None)
+        if entry is None:
+            return
+        east, north, radius = entry
+        cells = [(self._point_cells, [self._cell(east, north)]),
+                 (self._fence_cells, self._cells_around(east, north, radius + GEOFENCE_EXIT_MARGIN))]
+        for grid, keys in cells:
+            for key in keys:
+                names = grid.get(key)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del grid[key]
+        # Bounds only grow; a stale bound just makes nearest() search a little further
+
+    def distance(self, name: str, east: float, north: float) -> float:
+        landmark_east, landmark_north, _ = self._landmarks[name]
+        return math.hypot(east - landmark_east, north - landmark_north)
+
+    def within(self, lat: float, lon: float, radius: float) -> List[Tuple[str, float]]:
+        """(landmark name, distance) for every landmark within radius meters, nearest first"""
+        if not self._landmarks:
+            return []
+        east, north = self.projection.to_local(lat, lon)
+        found = []
+        for cell in self._cells_around(east, north, radius):
+            for name in self._point_cells.get(cell, ()):
+                distance = self.distance(name, east, north)
+                if distance <= radius:
+                    found.append((name, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def nearest(self, lat: float, lon: float, k: int = 1,
+                max_distance: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Up to k (landmark name, distance) pairs, nearest first
+
+        Searches rings of cells outward from the query cell and stops once
+        the k-th best is closer than anything an unvisited ring could hold.
+        """
+        if not self._landmarks or k <= 0:
+            return []
+        east, north = self.projection.to_local(lat, lon)
+        cx, cy = self._cell(east, north)
+        x0, x1, y0, y1 = self._cell_bounds
+        last_ring = max(abs(cx - x0), abs(cx - x1), abs(cy - y0), abs(cy - y1))
+
+        best: List[Tuple[float, str]] = []  # max-heap of the k best as (-distance, name)
+        for ring in range(last_ring + 1):
+            for x in range(cx - ring, cx + ring + 1):
+                step = 1 if abs(x - cx) == ring else 2 * ring
+                for y in range(cy - ring, cy + ring + 1, max(step, 1)):
+                    for name in self._point_cells.get((x, y), ()):
+                        distance = self.distance(name, east, north)
+                        if max_distance is not None and distance > max_distance:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-distance, name))
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, (-distance, name))
+            # Anything outside rings 0..ring is at least ring cells from the query point
+            reach = ring * self.cell_size
+            if len(best) == k and -best[0][0] <= reach:
+                break
+            if max_distance is not None and reach > max_distance:
+                break
+        return [(name, -negative) for negative, name in sorted(best, reverse=True)]
+
+    def fences_at(self, east: float, north: float) -> Set[str]:
+        """Landmarks whose geofence (plus exit margin) may contain a local position"""
+        return self._fence_cells.get(self._cell(east, north), set())
+
+
+class GeofenceMonitor:
+    """Turns a stream of positions into enter/exit events for landmark geofences
+
+    Each update checks only the fences registered in the robot's grid cell,
+    so its cost does not depend on how many landmarks the campus has.
+    """
+
+    def __init__(self, index: ProximityIndex):
+        self.index = index
+        self.inside: Dict[str, float] = {}  # landmark name -> time.monotonic() of entry
+
+    def reset(self):
+        self.inside.clear()
+
+    def update(self, lat: float, lon: float, t: Optional[float] = None) -> List[GeofenceEvent]:
+        """Process a position; returns the enter and exit events it caused"""
+        t = time.monotonic() if t is None else t
+        index = self.index
+        if index.projection is None:
+            return []
+        east, north = index.projection.to_local(lat, lon)
+
+        events = []
+        inside_now = set()
+        for name in index.fences_at(east, north):
+            _, _, radius = index._landmarks[name]
+            distance = index.distance(name, east, north)
+            limit = radius + GEOFENCE_EXIT_MARGIN if name in self.inside else radius
+            if distance <= limit:
+                inside_now.add(name)
+                if name not in self.inside:
+                    self.inside[name] = t
+                    events.append(GeofenceEvent("enter", name, distance, t))
+
+        for name in [name for name in self.inside if name not in inside_now]:
+            del self.inside[name]
+            distance = index.distance(name, east, north) if name in index else float("inf")
+            events.append(GeofenceEvent("exit", name, distance, t))
+        return events
+
+
+def benchmark(landmarks: int = 5000, extent: float = 3000.0, queries: int = 2000):
+    """Compare grid queries with a linear scan over all landmarks, and check they agree"""
+    import random
+    rng = random.Random(5)
+    projection = local_projection(*SAMPLE_ORIGIN)
+    index = ProximityIndex(projection)
+    points = {}
+    start = time.perf_counter()
+    for i in range(landmarks):
+        lat, lon = projection.to_geodetic(rng.uniform(0, extent), rng.uniform(0, extent))
+        points[f"poi-{i}"] = (lat, lon)
+        index.add(f"poi-{i}", lat, lon)
+    print(f"Indexed {landmarks} landmarks in {1000 * (time.perf_counter() - start):.1f} ms")
+
+    # A robot walking across campus, sampled like 5 Hz GPS at 1.2 m/s
+    track = [projection.to_geodetic(0.24 * i % extent, 0.1 * i % extent) for i in range(queries)]
+
+    def linear_nearest(lat, lon, k):
+        east, north = projection.to_local(lat, lon)
+        return heapq.nsmallest(k, ((index.distance(name, east, north), name) for name in points))
+
+    start = time.perf_counter()
+    expected = [linear_nearest(lat, lon, 3) for lat, lon in track]
+    linear_time = (time.perf_counter() - start) / queries
+    start = time.perf_counter()
+    results = [index.nearest(lat, lon, 3) for lat, lon in track]
+    grid_time = (time.perf_counter() - start) / queries
+    agree = all([name for name, _ in got] == [name for _, name in want] for got, want in zip(results, expected))
+    print(f"nearest-3: linear scan {1000 * linear_time:.3f} ms, grid {1000 * grid_time:.3f} ms "
+          f"per query, results {'match' if agree else 'DIFFER'}")
+
+    monitor = GeofenceMonitor(index)
+    start = time.perf_counter()
+    events = sum(len(monitor.update(lat, lon)) for lat, lon in track)
+    print(f"geofence update: {1000 * (time.perf_counter() - start) / queries:.4f} ms per fix, {events} events")
+
+
+if __name__ == "__main__":
+    benchmark()
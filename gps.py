@@ -1,6 +1,5 @@
 import serial
-import pynmea2
-import time
+from nmea import NMEAParser
 
 def read_gps():
     try:
@@ -8,6 +7,7 @@ def read_gps():
         gps_serial = serial.Serial('/dev/ttyS0', baudrate=9600, timeout=1)
         print("✅ Serial port opened. Waiting for GPS data...\n")
         
+        parser = NMEAParser()
         got_signal = False
         got_fix = False
 
@@ -22,36 +22,20 @@ def read_gps():
                 got_signal = True
                 print("📡 GPS module detected. Receiving NMEA sentences.")
 
-            # Check for fix using GGA (Global Positioning System Fix Data)
-            if line.startswith('$GPGGA'):
-                try:
-                    msg = pynmea2.parse(line)
-                    fix_quality = int(msg.gps_qual)
-
-                    if fix_quality > 0:
-                        if not got_fix:
-                            got_fix = True
-                            print(f"✅ GPS Fix Acquired! Satellites: {msg.num_sats}")
-                        print(f"🌍 Latitude: {msg.latitude}, Longitude: {msg.longitude}")
-                    else:
-                        print("❌ No GPS fix yet. Waiting for satellite lock...")
-
-                except pynmea2.ParseError:
-                    print("⚠️ Parse error in GGA sentence.")
-                    continue
-
-            elif line.startswith('$GPRMC'):
-                try:
-                    msg = pynmea2.parse(line)
-                    if msg.status == 'A':
-                        print(f"✔️  Valid RMC data - Lat: {msg.latitude}, Lon: {msg.longitude}")
-                    else:
-                        print("🚫 RMC data invalid or no fix.")
-                except pynmea2.ParseError:
-                    print("⚠️ Parse error in RMC sentence.")
-                    continue
+            fix = parser.parse_line(line)
+            if fix is None:
+                continue
 
-            time.sleep(1)
+            # Report every position sentence (GGA or RMC from any constellation)
+            if fix.valid:
+                if not got_fix:
+                    got_fix = True
+                    print(f"✅ GPS Fix Acquired! Satellites: {fix.satellites}")
+                print(f"🌍 [{fix.talker}] Latitude: {fix.lat:.6f}, Longitude: {fix.lon:.6f}, "
+                      f"Quality: {fix.fix_quality}, Sats: {fix.satellites}, HDOP: {fix.hdop}, "
+                      f"Speed: {fix.speed} m/s, Course: {fix.course}")
+            else:
+                print("❌ No GPS fix yet. Waiting for satellite lock...")
 
     except serial.SerialException as e:
         print(f"❌ Serial error: {e}")
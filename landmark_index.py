@@ -0,0 +1,197 @@
+# landmark_index.py
+
+import re
+import heapq
+import logging
+from typing import Dict, List, Tuple, Optional, Iterable
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+NGRAM_SIZE = 3  # character n-gram length used for fuzzy matching
+NGRAM_WEIGHT = 0.7  # share of the score coming from n-gram overlap
+PHONETIC_WEIGHT = 0.3  # share of the score coming from phonetic key overlap
+PHONETIC_KEY_LENGTH = 3  # Soundex prefix kept per word; shorter keys tolerate dropped syllables
+MIN_MATCH_SCORE = 0.45  # below this a lookup is treated as "no match"
+FILLER_WORDS = {"the", "a", "an", "to", "please", "take", "me", "go", "lets", "let's"}
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"),
+                         ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+def normalize_name(text: str) -> str:
+    """Lowercase, strip punctuation and filler words, and join spelled-out initials"""
+    text = text.lower().replace("&", " and ")
+    words = [w for w in re.sub(r"[^a-z0-9']+", " ", text).split() if w not in FILLER_WORDS]
+    words = [w.replace("'", "") for w in words]
+
+    # "c v raman" -> "cv raman", so spelled initials match the written form
+    merged = []
+    in_initials = False
+    for word in words:
+        if len(word) == 1 and word.isalpha():
+            if in_initials:
+                merged[-1] += word
+            else:
+                merged.append(word)
+            in_initials = True
+        else:
+            merged.append(word)
+            in_initials = False
+    return " ".join(merged)
+
+
+def soundex(word: str) -> str:
+    """American Soundex code for a single word (e.g. 'raman' -> 'R550')"""
+    if not word:
+        return ""
+    if word[0].isdigit():
+        return word  # numbers ("block 2") are kept verbatim
+    first = word[0].upper()
+    code = []
+    last = _SOUNDEX_CODES.get(word[0], "")
+    for ch in word[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != last:
+            code.append(digit)
+        if ch not in "hw":
+            last = digit
+    return (first + "".join(code) + "000")[:4]
+
+
+def _phonetic_keys(text: str) -> set:
+    """Truncated Soundex key for every word of a normalized name"""
+    return {soundex(word)[:PHONETIC_KEY_LENGTH] for word in text.split()}
+
+
+def _ngrams(text: str) -> set:
+    """Character n-grams of a normalized name, padded so word edges count"""
+    padded = f" {text} "
+    if len(padded) < NGRAM_SIZE:
+        return {padded}
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+class LandmarkIndex:
+    """Fuzzy name index over campus landmarks for matching spoken destinations
+
+    Every landmark name and alias is stored as a normalized "form" with its
+    character n-grams and per-word Soundex keys. Posting lists map each gram
+    and key to the forms containing it, so a lookup only scores candidates
+    that share at least one gram or key with the query.
+    """
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        """Drop every landmark, form and posting list"""
+        self._forms: Dict[int, Tuple[str, str, frozenset, frozenset]] = {}
+        self._names: Dict[str, List[int]] = {}  # landmark name -> form ids
+        self._gram_postings: Dict[str, set] = {}
+        self._phonetic_postings: Dict[str, set] = {}
+        self._exact: Dict[str, str] = {}  # normalized form -> landmark name
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def build(self, landmarks: Dict[str, Dict]):
+        """Rebuild the index from a campus_landmarks dictionary"""
+        self._clear()
+        for name, info in landmarks.items():
+            self.add(name, (info or {}).get("aliases", []))
+        logger.info(f"Landmark index built with {len(self._names)} landmarks, {len(self._forms)} name forms")
+
+    def add(self, name: str, aliases: Optional[Iterable[str]] = None):
+        """Add or replace a landmark and its aliases"""
+        if name in self._names:
+            self.remove(name)
+
+        form_ids = []
+        for surface in [name] + list(aliases or []):
+            text = normalize_name(surface)
+            if not text or text in self._exact and self._exact[text] == name:
+                continue
+            grams = frozenset(_ngrams(text))
+            keys = frozenset(_phonetic_keys(text))
+            form_id = self._next_id
+            self._next_id += 1
+
+            self._forms[form_id] = (name, text, grams, keys)
+            for gram in grams:
+                self._gram_postings.setdefault(gram, set()).add(form_id)
+            for key in keys:
+                self._phonetic_postings.setdefault(key, set()).add(form_id)
+            self._exact.setdefault(text, name)
+            form_ids.append(form_id)
+
+        self._names[name] = form_ids
+
+    def remove(self, name: str):
+        """Remove a landmark and all of its forms from the index"""
+        for form_id in self._names.pop(name, []):
+            _, text, grams, keys = self._forms.pop(form_id)
+            for gram in grams:
+                postings = self._gram_postings.get(gram)
+                if postings is not None:
+                    postings.discard(form_id)
+                    if not postings:
+                        del self._gram_postings[gram]
+            for key in keys:
+                postings = self._phonetic_postings.get(key)
+                if postings is not None:
+                    postings.discard(form_id)
+                    if not postings:
+                        del self._phonetic_postings[key]
+            if self._exact.get(text) == name:
+                del self._exact[text]
+
+    def lookup(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Return up to k (landmark name, score) pairs, best first
+
+        Scores are in [0, 1]; an exact match on a normalized name or alias
+        scores 1.0.
+        """
+        text = normalize_name(query)
+        if not text:
+            return []
+
+        exact = self._exact.get(text)
+        query_grams = _ngrams(text)
+        query_keys = _phonetic_keys(text)
+
+        shared_grams: Dict[int, int] = {}
+        for gram in query_grams:
+            for form_id in self._gram_postings.get(gram, ()):
+                shared_grams[form_id] = shared_grams.get(form_id, 0) + 1
+        shared_keys: Dict[int, int] = {}
+        for key in query_keys:
+            for form_id in self._phonetic_postings.get(key, ()):
+                shared_keys[form_id] = shared_keys.get(form_id, 0) + 1
+
+        best: Dict[str, float] = {}
+        for form_id in shared_grams.keys() | shared_keys.keys():
+            name, _, grams, keys = self._forms[form_id]
+            dice = 2.0 * shared_grams.get(form_id, 0) / (len(query_grams) + len(grams))
+            phonetic = 2.0 * shared_keys.get(form_id, 0) / (len(query_keys) + len(keys))
+            score = NGRAM_WEIGHT * dice + PHONETIC_WEIGHT * phonetic
+            if score > best.get(name, 0.0):
+                best[name] = score
+        if exact is not None:
+            best[exact] = 1.0
+
+        return heapq.nlargest(k, best.items(), key=lambda item: item[1])
+
+    def best_match(self, query: str, min_score: float = MIN_MATCH_SCORE) -> Optional[str]:
+        """Return the single best landmark name for a query, or None if nothing is close enough"""
+        matches = self.lookup(query, k=1)
+        if matches and matches[0][1] >= min_score:
+            return matches[0][0]
+        return None
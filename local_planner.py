@@ -0,0 +1,341 @@
+# local_planner.py
+
+import math
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from steering import wrap_degrees
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+SENSOR_ANGLES = {"front": 0.0, "left": -45.0, "right": 45.0}  # degrees from the robot's heading
+SENSOR_BEAM_WIDTH = 30.0  # degrees, ultrasonic cone; an echo may come from anywhere in it
+SENSOR_MAX_RANGE = 300  # cm, readings at or beyond this are "no echo"
+HISTOGRAM_SECTORS = 72  # 5 degree sectors around the robot
+OBSTACLE_MEMORY = 2.0  # seconds a range hit is remembered, fading linearly
+ACTIVE_RANGE = 150.0  # cm, hits farther away do not affect steering
+ROBOT_RADIUS = 25.0  # cm, half the track width plus a safety margin
+BLOCK_LEVEL = 0.2  # sectors whose obstacle density exceeds this are not driven into
+SLOW_RANGE = 80.0  # cm of clearance ahead below which the robot slows down
+GOAL_WEIGHT = 5.0  # cost per degree between a candidate direction and the goal
+HEADING_WEIGHT = 2.0  # cost per degree of turning from the current heading
+PREVIOUS_WEIGHT = 2.0  # cost per degree of change from the last chosen direction
+MAX_HITS = 512  # range hits kept (~4 s of three sensors at 20 Hz)
+
+
+@dataclass(frozen=True)
+class SteeringCommand:
+    """What the local planner wants for one control tick"""
+    bearing: float  # degrees to steer toward, the goal bearing when it is clear
+    speed_scale: float  # 0..1 multiplier for the forward speed; 0 turns in place
+    clearance: float  # cm to the nearest remembered obstacle along the current heading
+    avoiding: bool  # the goal direction is blocked and the robot is steering around it
+    blocked: bool  # every direction is blocked; bearing is the least cluttered one
+
+
+class LocalPlanner:
+    """Vector field histogram over recent ultrasonic hits
+
+    Each echo is stored as a point in the campus plane, placed along the
+    sensor's axis from the pose it was seen at, so obstacles stay where
+    they are while the robot turns and drives past them. Every tick the
+    points from the last OBSTACLE_MEMORY seconds are binned into a polar
+    histogram around the robot, each widened by the sensor cone and the
+    robot's radius and weighted by nearness and age. The robot steers at
+    the goal when its sector is free, else at the free sector that best
+    trades off goal, current heading and last choice (VFH+), and slows as
+    clearance ahead shrinks. Obstacles remembered from earlier runs can be
+    mixed in at their map strength.
+    """
+
+    def __init__(self, sensor_angles: Optional[Dict[str, float]] = None, memory: float = OBSTACLE_MEMORY):
+        self.sensor_angles = dict(SENSOR_ANGLES if sensor_angles is None else sensor_angles)
+        self.memory = memory
+        self._hits = deque(maxlen=MAX_HITS)  # (t, east, north) in seconds and meters
+        self._last_seen: Dict[str, float] = {}  # sensor -> time of the newest reading taken in
+        self._sector_width = 360.0 / HISTOGRAM_SECTORS
+        self._centres = np.arange(HISTOGRAM_SECTORS) * self._sector_width
+        self.previous: Optional[float] = None  # bearing chosen on the last tick
+        self.avoiding = False
+        self.blocked = False
+        self.encounters = 0  # times the goal direction became blocked
+
+    def reset(self):
+        """Forget remembered obstacles and steering history"""
+        self._hits.clear()
+        self._last_seen.clear()
+        self.previous = None
+        self.avoiding = False
+        self.blocked = False
+
+    def observe(self, sensor: str, distance: float, t: float, east: float, north: float, heading: float) -> bool:
+        """Take in one range reading (cm) taken at t from the given pose (meters, degrees)
+        Returns False for a reading already seen or from an unknown sensor
+        """
+        if t <= self._last_seen.get(sensor, -math.inf) or sensor not in self.sensor_angles:
+            return False
+        self._last_seen[sensor] = t
+        if 0 < distance < SENSOR_MAX_RANGE:
+            angle = math.radians(heading + self.sensor_angles[sensor])
+            reach = distance / 100.0
+            self._hits.append((t, east + reach * math.sin(angle), north + reach * math.cos(angle)))
+        return True
+
+    def observe_history(self, history, east: float, north: float, heading: float,
+                        now: float) -> List[Tuple[float, float]]:
+        """Take in every ultrasonic sample a SensorHistory recorded since the last call
+        Returns them as (bearing in degrees, distance in cm), e.g. for an ObstacleMap
+        """
+        readings = []
+        for sensor, offset in self.sensor_angles.items():
+            last = self._last_seen.get(sensor, -math.inf)
+            new = []
+            for sample in history.channel(sensor).samples(self.memory, now):
+                if sample.t <= last:
+                    break
+                new.append(sample)
+            for sample in reversed(new):
+                if self.observe(sensor, sample.value, sample.t, east, north, heading):
+                    readings.append(((heading + offset) % 360, sample.value))
+        return readings
+
+    def _obstacles(self, east: float, north: float, now: float,
+                   remembered: Optional[Tuple[np.ndarray, np.ndarray]] = None
+                   ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Bearing (degrees), distance (cm) and weight of the remembered hits in range
+
+        remembered adds obstacles known from earlier runs as (n, 2) local
+        positions and a 0-1 strength used as their weight.
+        """
+        if self._hits:
+            hits = np.array(self._hits)
+            x, y = hits[:, 1], hits[:, 2]
+            weight = 1.0 - (now - hits[:, 0]) / self.memory
+        else:
+            x = y = weight = np.empty(0)
+        if remembered is not None and len(remembered[0]):
+            xy, strength = remembered
+            x = np.concatenate((x, xy[:, 0]))
+            y = np.concatenate((y, xy[:, 1]))
+            weight = np.concatenate((weight, strength))
+        dx = x - east
+        dy = y - north
+        distance = np.hypot(dx, dy) * 100.0
+        keep = (weight > 0) & (distance < ACTIVE_RANGE)
+        bearing = np.degrees(np.arctan2(dx[keep], dy[keep])) % 360
+        return bearing, distance[keep], weight[keep]
+
+    def histogram(self, east: float, north: float, now: float,
+                  remembered: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> np.ndarray:
+        """Obstacle density per sector (sector i is centred on bearing i * 360 / HISTOGRAM_SECTORS)"""
+        bearing, distance, weight = self._obstacles(east, north, now, remembered)
+        if not len(bearing):
+            return np.zeros(HISTOGRAM_SECTORS)
+        # Widen each hit by the cone it could have come from and the angle the robot's body subtends
+        half_width = SENSOR_BEAM_WIDTH / 2 + np.degrees(np.arcsin(np.minimum(1.0, ROBOT_RADIUS / distance)))
+        magnitude = weight * (1.0 - distance / ACTIVE_RANGE)
+        offset = np.abs(wrap_degrees(self._centres[None, :] - bearing[:, None]))
+        covered = offset <= half_width[:, None] + self._sector_width / 2
+        return np.where(covered, magnitude[:, None], 0.0).max(axis=0)
+
+    def clearance(self, east: float, north: float, direction: float, now: float,
+                  remembered: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> float:
+        """cm to the nearest remembered hit the robot would sweep driving toward direction"""
+        bearing, distance, _ = self._obstacles(east, north, now, remembered)
+        lateral = distance * np.abs(np.sin(np.radians(bearing - direction)))
+        ahead = (np.abs(wrap_degrees(bearing - direction)) < 90) & (lateral < ROBOT_RADIUS)
+        return float(distance[ahead].min()) if ahead.any() else float(SENSOR_MAX_RANGE)
+
+    def _sector(self, bearing: float) -> int:
+        return int(round(bearing / self._sector_width)) % HISTOGRAM_SECTORS
+
+    def update(self, east: float, north: float, heading: float, goal_bearing: float, now: float,
+               stop_distance: float = 0.0,
+               remembered: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> SteeringCommand:
+        """Steering for this tick from the robot's pose and the bearing it wants to go
+        remembered is ObstacleMap.occupied_near() around the robot, if a map is kept
+        """
+        density = self.histogram(east, north, now, remembered)
+        free = density <= BLOCK_LEVEL
+        avoiding = not free[self._sector(goal_bearing)]
+        blocked = not free.any()
+
+        if not avoiding:
+            bearing = goal_bearing % 360
+        elif blocked:
+            bearing = float(self._centres[int(np.argmin(density))])
+        else:
+            candidates = self._centres[free]
+            previous = goal_bearing if self.previous is None else self.previous
+            cost = (GOAL_WEIGHT * np.abs(wrap_degrees(candidates - goal_bearing)) +
+                    HEADING_WEIGHT * np.abs(wrap_degrees(candidates - heading)) +
+                    PREVIOUS_WEIGHT * np.abs(wrap_degrees(candidates - previous)))
+            bearing = float(candidates[int(np.argmin(cost))])
+
+        if avoiding and not self.avoiding:
+            self.encounters += 1
+            logger.info(f"Obstacle toward goal {goal_bearing:.0f}°, steering to {bearing:.0f}°")
+        elif self.avoiding and not avoiding:
+            logger.info("Path to goal clear again")
+        if blocked and not self.blocked:
+            logger.warning(f"No free direction, turning toward the least cluttered one at {bearing:.0f}°")
+        self.avoiding = avoiding
+        self.blocked = blocked
+        self.previous = bearing
+
+        # Forward speed follows the room along the way the robot is actually pointing
+        clearance = self.clearance(east, north, heading, now, remembered)
+        span = max(SLOW_RANGE - stop_distance, 1.0)
+        speed_scale = 0.0 if blocked else min(1.0, max(0.0, (clearance - stop_distance) / span))
+        return SteeringCommand(bearing, speed_scale, clearance, avoiding, blocked)
+
+
+def _ray_distance(x: float, y: float, angle: float, obstacles: List[Tuple[float, float, float]]) -> float:
+    """cm from (x, y) along a bearing (radians) to the first circular obstacle, or SENSOR_MAX_RANGE"""
+    dx, dy = math.sin(angle), math.cos(angle)
+    best = SENSOR_MAX_RANGE / 100.0
+    for ox, oy, r in obstacles:
+        along = (ox - x) * dx + (oy - y) * dy
+        if along <= 0:
+            continue
+        miss = (ox - x) * dy - (oy - y) * dx
+        if abs(miss) < r:
+            best = min(best, along - math.sqrt(r * r - miss * miss))
+    return max(best, 0.0) * 100.0
+
+
+def _simulate_encounter(policy, obstacles, goal=(0.0, 30.0), dt=0.05, limit=120.0):
+    """Drive from the origin to goal past circular obstacles; returns (seconds, meters, collisions, reached)"""
+    from pose_estimator import TRACK_WIDTH, commanded_motion
+    x = y = heading = t = driven = 0.0
+    collisions, touching = 0, False
+    while math.hypot(goal[0] - x, goal[1] - y) > 1.0 and t < limit:
+        readings = {}
+        for sensor, offset in SENSOR_ANGLES.items():
+            # The echo comes from the nearest surface anywhere in the cone
+            readings[sensor] = min(_ray_distance(x, y, math.radians(heading + offset + spread), obstacles)
+                                   for spread in (-SENSOR_BEAM_WIDTH / 2, 0.0, SENSOR_BEAM_WIDTH / 2))
+        bearing = math.degrees(math.atan2(goal[0] - x, goal[1] - y)) % 360
+        v, turn_rate = commanded_motion(*policy(x, y, heading, bearing, readings, t))
+        heading = (heading + math.degrees(turn_rate) * dt) % 360
+        x += v * math.sin(math.radians(heading)) * dt
+        y += v * math.cos(math.radians(heading)) * dt
+        driven += abs(v) * dt
+        t += dt
+        inside = any(math.hypot(ox - x, oy - y) < r + TRACK_WIDTH / 2 for ox, oy, r in obstacles)
+        collisions += inside and not touching
+        touching = inside
+    return t, driven, collisions, math.hypot(goal[0] - x, goal[1] - y) <= 1.0
+
+
+# name -> (circular obstacles as (east, north, radius) meters, encounters they make)
+ENCOUNTER_SCENARIOS = {
+    "bench on the path": ([(0.0, 12.0, 0.5)], 1),
+    "bench off to the side": ([(0.6, 12.0, 0.5)], 1),
+    "hedge across the path": ([(x, 12.0, 0.35) for x in (-1.5, -0.9, -0.3, 0.3, 0.9)], 1),
+    "two staggered benches": ([(0.3, 9.0, 0.5), (-0.5, 18.0, 0.5)], 2),
+    "parked bicycles": ([(-0.6, 10.0, 0.3), (0.2, 10.6, 0.3), (1.0, 11.2, 0.3)], 1),
+}
+
+
+def _reactive_policy(speed: int, threshold: float):
+    """_handle_obstacles as it was: threshold checks on a 0.3 s window, then timed maneuvers"""
+    from pose_estimator import wheel_pwm
+    from steering import HeadingController
+    controller = HeadingController()
+    window = deque()
+    maneuver = {"until": 0.0, "queue": deque(), "pwm": (0, 0)}
+
+    def policy(x, y, heading, bearing, readings, t):
+        window.append((t, readings))
+        while window[0][0] < t - 0.3:
+            window.popleft()
+        if t < maneuver["until"]:
+            return maneuver["pwm"]
+        if maneuver["queue"]:
+            maneuver["pwm"], duration = maneuver["queue"].popleft()
+            maneuver["until"] = t + duration
+            controller.reset()
+            return maneuver["pwm"]
+        front, left, right = (min(r[name] for _, r in window) for name in ("front", "left", "right"))
+        if front < threshold:
+            spin = wheel_pwm('L' if left > right else 'R', (0,))
+            maneuver["queue"] = deque([(spin, 0.5), ((0, 0), 0.5)])
+            return 0, 0
+        if left < threshold:
+            maneuver["queue"] = deque([(wheel_pwm('R', (50,)), 0.2), ((speed, speed), 0.5)])
+            return 0, 0
+        if right < threshold:
+            maneuver["queue"] = deque([(wheel_pwm('L', (50,)), 0.2), ((speed, speed), 0.5)])
+            return 0, 0
+        return controller.update(bearing, heading, speed, t)
+    return policy
+
+
+def _planner_policy(speed: int, min_speed: int, threshold: float):
+    """The local planner steering a HeadingController, as NavigationSystem drives it"""
+    from steering import HeadingController
+    controller = HeadingController()
+    planner = LocalPlanner()
+
+    def policy(x, y, heading, bearing, readings, t):
+        for sensor, distance in readings.items():
+            planner.observe(sensor, distance, t, x, y, heading)
+        command = planner.update(x, y, heading, bearing, t, stop_distance=threshold)
+        forward = 0 if command.speed_scale <= 0 else max(min_speed, int(speed * command.speed_scale))
+        return controller.update(command.bearing, heading, forward, t)
+    return policy
+
+
+def compare_encounters(speed: int = 100, min_speed: int = 50, threshold: float = 30.0) -> Dict:
+    """Run every encounter scenario with both policies
+
+    Returns {"free": {policy: seconds}, "scenarios": {scenario: {policy: (seconds lost, meters,
+    collisions, reached)}}, "per_encounter": {policy: mean seconds lost}} for the "reactive" and
+    "planner" policies.
+    """
+    policies = {"reactive": lambda: _reactive_policy(speed, threshold),
+                "planner": lambda: _planner_policy(speed, min_speed, threshold)}
+    free = {name: _simulate_encounter(make(), [])[0] for name, make in policies.items()}
+    scenarios, totals = {}, dict.fromkeys(policies, 0.0)
+    for scenario, (obstacles, _) in ENCOUNTER_SCENARIOS.items():
+        scenarios[scenario] = {}
+        for name, make in policies.items():
+            seconds, meters, collisions, reached = _simulate_encounter(make(), obstacles)
+            lost = seconds - free[name]
+            totals[name] += lost
+            scenarios[scenario][name] = (lost, meters, collisions, reached)
+    encounters = sum(count for _, count in ENCOUNTER_SCENARIOS.values())
+    return {"free": free, "scenarios": scenarios,
+            "per_encounter": {name: total / encounters for name, total in totals.items()}}
+
+
+def benchmark(speed: int = 100, min_speed: int = 50, threshold: float = 30.0):
+    """Time lost per obstacle encounter: the old stop-and-spin maneuvers against the local planner"""
+    results = compare_encounters(speed, min_speed, threshold)
+    print(f"{'scenario':>22} | {'old maneuvers':>26} | {'local planner':>26}")
+    for scenario, row in results["scenarios"].items():
+        cells = [f"{lost:5.1f} s lost, {meters:4.1f} m, {collisions} hit"
+                 for lost, meters, collisions, _ in (row["reactive"], row["planner"])]
+        print(f"{scenario:>22} | {cells[0]:>26} | {cells[1]:>26}")
+    per_encounter = results["per_encounter"]
+    print(f"{'mean per encounter':>22} | {per_encounter['reactive']:5.1f} s lost{'':>13} | "
+          f"{per_encounter['planner']:5.1f} s lost")
+
+    planner = LocalPlanner()
+    for i in range(MAX_HITS):
+        planner.observe("front", 80 + i % 50, i * 0.004, 0.0, 0.0, i % 360)
+    import time
+    start = time.perf_counter()
+    for i in range(200):
+        planner.update(0.0, 0.0, 0.0, 10.0, MAX_HITS * 0.004)
+    print(f"update with {MAX_HITS} remembered hits: {1000 * (time.perf_counter() - start) / 200:.3f} ms per tick")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -3,12 +3,31 @@ import math
 from typing import Tuple, List, Union
 import polyline  # Make sure to install: pip install polyline
 import os
+import json
 from dotenv import load_dotenv
+from caches import route_cache, geocode_cache, directions_profile, CACHE_FILE
+from route import simplify_route, SIMPLIFY_TOLERANCE
+
+CONFIG_FILE = "robot_config.json"
 
 load_dotenv()
 
-def geocode_address(api_key: str, address: str) -> Union[Tuple[float, float], None]:
+def load_cache_settings(config_file: str = CONFIG_FILE) -> Tuple[str, float]:
+    """Cache file and route tolerance from the robot's config, so both share cache entries"""
+    try:
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    return config.get("cache_file", CACHE_FILE), config.get("route_tolerance", SIMPLIFY_TOLERANCE)
+
+def geocode_address(api_key: str, address: str, cache_file: str = CACHE_FILE) -> Union[Tuple[float, float], None]:
     """Convert an address to coordinates using Google Geocoding API."""
+    cache = geocode_cache(cache_file)
+    cached, coordinates = cache.get(address)
+    if cached:
+        return coordinates
+
     url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {
         "address": address,
@@ -21,10 +40,14 @@ def geocode_address(api_key: str, address: str) -> Union[Tuple[float, float], No
 
         if data["status"] != "OK":
             print(f"Geocoding error: {data['status']}")
+            if data["status"] == "ZERO_RESULTS":
+                cache.put(address, None)
             return None
 
         location = data["results"][0]["geometry"]["location"]
-        return (location["lat"], location["lng"])
+        coordinates = (location["lat"], location["lng"])
+        cache.put(address, coordinates)
+        return coordinates
 
     except Exception as e:
         print(f"Failed to geocode address: {e}")
@@ -34,18 +57,27 @@ def decode_polyline(encoded: str) -> List[Tuple[float, float]]:
     """Decode a polyline string into list of coordinates."""
     return polyline.decode(encoded)
 
-def get_waypoints(api_key: str, start_location: Tuple[float, float], end_location: Union[str, Tuple[float, float]]) -> List[Tuple[float, float]]:
-    """Get fine-grained waypoints using Google Directions API with polyline decoding."""
+def get_waypoints(api_key: str, start_location: Tuple[float, float], end_location: Union[str, Tuple[float, float]],
+                  tolerance: float = SIMPLIFY_TOLERANCE, cache_file: str = CACHE_FILE) -> List[Tuple[float, float]]:
+    """Get waypoints using Google Directions API with polyline decoding, simplified to tolerance meters."""
     
     # Geocode if end_location is an address
     if isinstance(end_location, str):
-        geocoded_end = geocode_address(api_key, end_location)
+        geocoded_end = geocode_address(api_key, end_location, cache_file)
         if not geocoded_end:
             print("Failed to geocode destination address")
             return []
         end_location = geocoded_end
         print(f"Geocoded destination to coordinates: {geocoded_end}")
 
+    # Same cache file, key and simplification as NavigationSystem, so either can reuse the other's routes
+    cache = route_cache(cache_file)
+    profile = directions_profile(tolerance)
+    cached = cache.get(start_location, end_location, profile)
+    if cached:
+        print(f"Using cached route ({cache.stats.hit_rate:.0%} hit rate)")
+        return cached
+
     url = "https://maps.googleapis.com/maps/api/directions/json"
     params = {
         "origin": f"{start_location[0]},{start_location[1]}",
@@ -73,15 +105,11 @@ def get_waypoints(api_key: str, start_location: Tuple[float, float], end_locatio
                 points = decode_polyline(step_polyline)
                 waypoints.extend(points)
 
-        # Remove duplicates while preserving order
-        filtered_waypoints = []
-        seen = set()
-        for pt in waypoints:
-            if pt not in seen:
-                filtered_waypoints.append(pt)
-                seen.add(pt)
+        # Douglas-Peucker in local meters drops the points that do not change the path's shape
+        simplified = [waypoints[i] for i in simplify_route(waypoints, tolerance)]
 
-        return filtered_waypoints
+        cache.put(start_location, end_location, simplified, profile)
+        return simplified
 
     except Exception as e:
         print(f"Failed to get route: {e}")
@@ -106,10 +134,11 @@ def main():
         destination = (float(parts[0].strip()), float(parts[1].strip()))
 
     # Get detailed waypoints
-    waypoints = get_waypoints(API_KEY, start_location, destination)
+    cache_file, tolerance = load_cache_settings()
+    waypoints = get_waypoints(API_KEY, start_location, destination, tolerance, cache_file)
 
     if waypoints:
-        print(f"\nSuccessfully retrieved {len(waypoints)} fine-grained waypoints:")
+        print(f"\nSuccessfully retrieved {len(waypoints)} waypoints:")
         for i, point in enumerate(waypoints):
             print(f"Waypoint {i+1}: {point}")
     else:
@@ -1,16 +1,36 @@
 # autonomous_robot_navigation.py
 
 import requests
-import math
 import time
 import serial
 import json
 import os
 import logging
-from typing import Tuple, List, Dict, Union, Optional
+from typing import Tuple, List, Dict, Union, Optional, Callable, Mapping
+from collections import deque
 import polyline
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
 import threading
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from landmark_index import LandmarkIndex
+from geofence import ProximityIndex, GeofenceMonitor
+from arduino_link import ArduinoLink, CommandRequest, command_args
+from arduino_protocol import EVENT_DONE
+from sensor_history import SensorHistory
+from nmea import NMEAParser, GPSFix
+from ublox import UbloxConfigurator, UBXStreamDecoder, nav_pvt_to_fix, CLS_NAV, NAV_PVT
+from pose_estimator import PoseEstimator, WHEEL_SPEED_PER_PWM, MIN_COURSE_SPEED
+from control_scheduler import ControlScheduler, ControlStats, CONTROL_RATE
+from steering import HeadingController, MAX_WHEEL_PWM, wrap_degrees
+from local_planner import LocalPlanner, SteeringCommand, ACTIVE_RANGE
+from geodesy import haversine_distance, calculate_bearing, centroid, local_projection, LocalProjection
+from campus_graph import CampusGraph, CAMPUS_GRAPH_FILE
+from caches import route_cache, geocode_cache, directions_profile, CACHE_FILE
+from obstacle_map import ObstacleMap, OBSTACLE_MAP_FILE
+from tour_planner import optimize_tour
+from route import PlannedRoute, Route, RouteProgress, simplify_route, SIMPLIFY_TOLERANCE
 # import numpy as np
 
 # Configure logging
@@ -25,25 +45,73 @@ logger = logging.getLogger("RobotNavigation")
 
 # Constants
 WAYPOINT_RADIUS = 2.0  # meters
-GPS_UPDATE_INTERVAL = 0.5  # seconds
+GPS_MODE = "ubx"  # Options: "ubx" (NAV-PVT, falls back to NMEA), "nmea"
+GPS_RATE = 5  # Hz, u-blox measurement rate in "ubx" mode
+GPS_UBX_BAUD = 115200  # receiver baud rate after configuration
 OBSTACLE_DISTANCE_THRESHOLD = 30  # cm, for ultrasonic sensors
 MAX_SPEED = 100  # maximum motor speed (0-255)
 MIN_SPEED = 50   # minimum motor speed
 CONFIG_FILE = "robot_config.json"
-HEADING_SOURCE = "magnetometer"  # Options: "gps", "magnetometer"
+HEADING_SOURCE = "fused"  # Options: "fused" (pose estimator), "gps", "magnetometer"
 GPS_AVERAGING_SAMPLES = 5  # Number of GPS readings to average for better accuracy
 MAX_GPS_AGE = 5.0  # Maximum age of GPS data in seconds before considering it stale
+MAX_POSITION_UNCERTAINTY = 6.0  # meters (1-sigma), dead reckoning stops navigation beyond this
+TELEMETRY_RATE = 20  # Hz, sensor frames pushed by the Arduino (0 = poll with "S")
+OBSTACLE_WINDOW = 0.3  # seconds of ultrasonic history considered when checking for obstacles
+MAX_SENSOR_AGE = 1.0  # Maximum age of sensor data in seconds before considering it stale
+COMMAND_COALESCE_WINDOW = 0.5  # seconds an identical motor command is not re-sent
+OBSTACLE_SETTLE_TIME = 0.5  # seconds after an avoidance maneuver before steering resumes
+OBSTACLE_AVOIDANCE = "vfh"  # Options: "vfh" (local planner steers every tick), "reactive" (timed maneuvers)
+STEERING_MODE = "onboard"  # Options: "onboard" (Arduino heading hold), "pid" (wheel speeds), "open_loop"
+ONBOARD_TURN_ERROR = 45  # degrees, larger errors turn in place on the Arduino before driving on
+ONBOARD_TURN_TIMEOUT = 6.0  # seconds, backstop if the completion event is lost
+UNSUPPORTED_COMMAND_FAILURES = 3  # unanswered W/G/H commands in a row before falling back
+ARDUINO_PROTOCOL = "binary"  # Options: "binary" (framed, falls back to ASCII), "ascii"
+PREFETCH_START_TOLERANCE = 15.0  # meters the robot may be from a prefetched route's start and still use it
+PREFETCH_WAIT = 15.0  # seconds to wait for a prefetch still in progress before planning afresh
+MAP_POSITION_SIGMA = 3.0  # meters (1-sigma); obstacles are only mapped from poses this certain
 
-@dataclass
+# Configuration written to CONFIG_FILE when there is none (copy before changing it)
+DEFAULT_CONFIG = {
+    "gps_port": "/dev/ttyS0",
+    "arduino_port": "/dev/ttyACM0",
+    "waypoint_radius": WAYPOINT_RADIUS,
+    "obstacle_threshold": OBSTACLE_DISTANCE_THRESHOLD,
+    "heading_source": HEADING_SOURCE,
+    "max_speed": MAX_SPEED,
+    "min_speed": MIN_SPEED,
+    "telemetry_rate": TELEMETRY_RATE,
+    "arduino_protocol": ARDUINO_PROTOCOL,
+    "gps_mode": GPS_MODE,
+    "gps_rate": GPS_RATE,
+    "control_rate": CONTROL_RATE,
+    "steering": STEERING_MODE,
+    "obstacle_avoidance": OBSTACLE_AVOIDANCE,
+    "route_tolerance": SIMPLIFY_TOLERANCE,
+    "campus_origin": None,
+    "campus_graph": CAMPUS_GRAPH_FILE,
+    "cache_file": CACHE_FILE,
+    "obstacle_map": OBSTACLE_MAP_FILE
+}
+
+@dataclass(frozen=True)
 class RobotState:
-    """Store current state of the robot"""
+    """Immutable snapshot of the robot's state
+    
+    NavigationSystem publishes a new snapshot for every update by swapping
+    one reference, so a reader always sees fields from the same moment
+    without taking a lock. version increases by one per snapshot.
+    """
     lat: float = 0.0
     lon: float = 0.0
     heading: float = 0.0  # degrees, 0 = North, 90 = East
     speed: float = 0.0
     magnetometer_heading: Optional[float] = None
     gps_heading: Optional[float] = None
-    obstacles: Dict[str, float] = None
+    obstacles: Mapping[str, float] = field(
+        default_factory=lambda: MappingProxyType({"front": 100, "left": 100, "right": 100}))
+    gps_fix: Optional[GPSFix] = None  # latest fix record (quality, satellites, HDOP, speed, course)
+    position_sigma: float = float("inf")  # meters, 1-sigma error of lat/lon from the pose estimator
     destination_reached: bool = False
     last_gps_update: float = 0.0
     navigation_active: bool = False
@@ -52,22 +120,44 @@ class RobotState:
     distance_to_waypoint: float = 0.0
     bearing_to_waypoint: float = 0.0
     remaining_distance: float = 0.0
-    
-    def __post_init__(self):
-        if self.obstacles is None:
-            self.obstacles = {"front": 100, "left": 100, "right": 100}
+    along_track_distance: float = 0.0  # meters travelled along the route, projected onto it
+    cross_track_error: float = 0.0  # meters off the route, positive = right of it
+    last_sensor_update: float = 0.0  # time.monotonic() of the sensor frame in this snapshot
+    updated: float = 0.0  # time.monotonic() when this snapshot was published
+    version: int = 0
 
 
 class GPSModule:
-    """Handles GPS data acquisition and processing"""
+    """Handles GPS data acquisition and processing
+    
+    A reader thread consumes every NMEA sentence at line rate and keeps the
+    latest fix plus a short history of valid fixes for averaging. The RMC and
+    GGA sentences of one epoch are published as a single fix: the second only
+    refreshes latest_fix with its extra fields. In "ubx"
+    mode the reader first configures the u-blox receiver for binary NAV-PVT
+    at a higher baud and rate, and keeps parsing NMEA if that fails.
+    """
     
-    def __init__(self, port="/dev/ttyS0", baud=9600):
+    def __init__(self, port="/dev/ttyS0", baud=9600, mode=GPS_MODE, rate_hz=GPS_RATE, ubx_baud=GPS_UBX_BAUD):
         self.port = port
         self.baud = baud
+        self.mode = mode
+        self.rate_hz = rate_hz
+        self.ubx_baud = ubx_baud
+        self.ubx_active = False
         self.serial_connected = False
-        self.gps_data = []  # Store recent GPS readings for averaging
+        self.gps_data = deque(maxlen=GPS_AVERAGING_SAMPLES)  # Recent valid fixes for averaging
+        self.parser = NMEAParser()
+        self.latest_fix: Optional[GPSFix] = None
+        self.new_fix = threading.Event()
+        self._fix_handlers: List[Callable[[GPSFix], None]] = []
         self._connect()
         
+        self.running = True
+        self.reader_thread = threading.Thread(target=self._reader_loop, name="GPSReader")
+        self.reader_thread.daemon = True
+        self.reader_thread.start()
+        
     def _connect(self):
         """Connect to GPS module"""
         try:
@@ -78,48 +168,104 @@ class GPSModule:
             logger.error(f"Failed to connect to GPS: {e}")
             self.serial_connected = False
     
-    def read_gps(self) -> Tuple[float, float]:
-        """Read GPS data from serial and return lat, lon"""
-        if not self.serial_connected:
-            try:
+    def add_fix_handler(self, handler: Callable[[GPSFix], None]):
+        """Register a callback run on the reader thread for every new fix"""
+        self._fix_handlers.append(handler)
+    
+    def _reader_loop(self):
+        """Background thread that parses every sentence the receiver sends"""
+        configured = False
+        decoder = UBXStreamDecoder()
+        while self.running:
+            if not self.serial_connected:
+                time.sleep(1)
                 self._connect()
-            except Exception as e:
-                logger.error(f"Failed to reconnect to GPS: {e}")
-                logger.error("GPS reconnection failed")
-                return None, None
-        
-        try:
-            # This is a simplified implementation
-            # In a real implementation, you would parse NMEA sentences
-            line = self.ser.readline().decode('ascii', errors='replace').strip()
-            
-            # Parse NMEA data (simplified)
-            if line.startswith('$GPRMC') or line.startswith('$GNRMC'):
-                parts = line.split(',')
-                if len(parts) >= 7 and parts[2] == 'A':  # Valid fix
-                    lat = float(parts[3][:2]) + float(parts[3][2:]) / 60
-                    if parts[4] == 'S':
-                        lat = -lat
-                    lon = float(parts[5][:3]) + float(parts[5][3:]) / 60
-                    if parts[6] == 'W':
-                        lon = -lon
-                    return lat, lon
+                configured = False
+                continue
             
+            try:
+                if self.mode == "ubx" and not configured:
+                    configured = True
+                    for item in self._configure_receiver():
+                        self._handle_item(item)
+                
+                if self.mode == "ubx":
+                    data = self.ser.read(self.ser.in_waiting or 1)
+                    for item in decoder.feed(data):
+                        self._handle_item(item)
+                    continue
+                
+                line = self.ser.readline()
+                if not line:
+                    continue
+                fix = self.parser.parse_line(line.decode('ascii', errors='replace'), time.monotonic())
+                if fix is not None:
+                    self._publish(fix)
+            except Exception as e:
+                logger.error(f"GPS read error: {e}")
+                self.serial_connected = False
+    
+    def _configure_receiver(self) -> List[tuple]:
+        """Switch the u-blox receiver to NAV-PVT, returning anything read meanwhile"""
+        # The receiver keeps its baud rate across our restarts, so also try the fast rate directly
+        pending = []
+        nmea_baud = self.baud
+        for baud in dict.fromkeys((self.baud, self.ubx_baud)):
+            self.ser.baudrate = baud
+            configurator = UbloxConfigurator(self.ser, target_baud=self.ubx_baud, rate_hz=self.rate_hz)
+            self.ubx_active = configurator.configure()
+            pending.extend(configurator.pending)
+            if self.ubx_active:
+                return pending
+            if any(item[0] == "nmea" for item in configurator.pending):
+                nmea_baud = self.ser.baudrate  # where the configurator left the port after reading them
+        # Listen where the receiver was last heard, not at the last baud tried
+        self.ser.baudrate = nmea_baud
+        logger.warning(f"u-blox configuration failed, falling back to NMEA at {nmea_baud} baud")
+        return pending
+    
+    def _handle_item(self, item: tuple):
+        """Route one decoded item from the receiver stream to the fix publisher"""
+        if item[0] == "ubx":
+            if item[1:3] == (CLS_NAV, NAV_PVT):
+                self._publish(nav_pvt_to_fix(item[3], time.monotonic()))
+        else:
+            fix = self.parser.parse_line(item[1], time.monotonic())
+            if fix is not None:
+                self._publish(fix)
+    
+    def _publish(self, fix: GPSFix):
+        previous = self.latest_fix
+        self.latest_fix = fix
+        # Same receiver epoch as the fix already published: one measurement, not two
+        if fix.utc and previous is not None and fix.utc == previous.utc:
+            return
+        if fix.valid and fix.lat is not None:
+            self.gps_data.append(fix)
+        self.new_fix.set()
+        for handler in self._fix_handlers:
+            try:
+                handler(fix)
+            except Exception as e:
+                logger.error(f"GPS fix handler error: {e}")
+    
+    def wait_for_fix(self, timeout: float) -> bool:
+        """Block until the reader publishes a new fix or timeout expires"""
+        got_fix = self.new_fix.wait(timeout)
+        self.new_fix.clear()
+        return got_fix
+    
+    def read_gps(self) -> Tuple[float, float]:
+        """Return lat, lon of the latest valid fix (None, None if there is none)"""
+        fix = self.latest_fix
+        if fix is None or not fix.valid or fix.lat is None:
             return None, None
-        except Exception as e:
-            logger.error(f"GPS read error: {e}")
-            return None, None
+        return fix.lat, fix.lon
     
     def get_averaged_position(self) -> Tuple[float, float]:
-        """Get averaged GPS position from multiple readings for improved accuracy"""
-        valid_readings = []
-        
-        # Collect several readings
-        for _ in range(GPS_AVERAGING_SAMPLES):
-            lat, lon = self.read_gps()
-            if lat is not None and lon is not None:
-                valid_readings.append((lat, lon))
-            time.sleep(0.2)  # Short delay between readings
+        """Get averaged GPS position from recent fixes for improved accuracy"""
+        now = time.monotonic()
+        valid_readings = [(fix.lat, fix.lon) for fix in list(self.gps_data) if now - fix.t <= MAX_GPS_AGE]
             
         if not valid_readings:
             return None, None
@@ -130,6 +276,13 @@ class GPSModule:
         
         return avg_lat, avg_lon
     
+    def close(self):
+        """Stop the reader thread and close the port"""
+        self.running = False
+        self.reader_thread.join(timeout=1.5)
+        if self.serial_connected:
+            self.ser.close()
+    
     def calculate_heading_from_positions(self, prev_pos, current_pos) -> Optional[float]:
         """Calculate heading based on two GPS positions"""
         if not prev_pos or not current_pos:
@@ -142,68 +295,98 @@ class GPSModule:
 class SensorModule:
     """Handles various sensors for obstacle detection and orientation"""
     
-    def __init__(self, arduino_port="/dev/ttyACM0", baud=115200):
-        self.port = arduino_port
-        self.baud = baud
-        self.serial_connected = False
-        self._connect()
+    def __init__(self, arduino_port="/dev/ttyACM0", baud=115200, link: Optional[ArduinoLink] = None,
+                 telemetry_rate=TELEMETRY_RATE):
+        # Share the serial owner with MotionController when one is given
+        self.link = link if link is not None else ArduinoLink(arduino_port, baud)
+        self.port = self.link.port
+        self.baud = self.link.baud
+        self.telemetry_rate = telemetry_rate
         
-    def _connect(self):
-        """Connect to Arduino handling sensors"""
-        try:
-            self.ser = serial.Serial(self.port, self.baud, timeout=1)
-            self.serial_connected = True
-            logger.info(f"Connected to Arduino on {self.port}")
-            time.sleep(2)  # Allow Arduino to reset after serial connection
-        except Exception as e:
-            logger.error(f"Failed to connect to Arduino: {e}")
-            self.serial_connected = False
+        # Latest-state store, filled continuously by the link's reader thread
+        self.latest: Dict = {}
+        self.latest_time = 0.0  # time.monotonic() of the last frame
+        self.frame_count = 0
+        self.new_data = threading.Event()
+        self.link.add_telemetry_handler(self._on_telemetry)
+        self._last_subscribe = 0.0
+        self.subscribe()
+    
+    @property
+    def serial_connected(self) -> bool:
+        return self.link.connected
+    
+    @property
+    def streaming(self) -> bool:
+        """True while pushed sensor frames are arriving at the subscribed rate"""
+        if self.telemetry_rate <= 0:
+            return False
+        return time.monotonic() - self.latest_time < max(5.0 / self.telemetry_rate, 0.5)
+    
+    def subscribe(self):
+        """Ask the Arduino to push sensor frames at telemetry_rate"""
+        if self.telemetry_rate <= 0 or not self.serial_connected:
+            return
+        self._last_subscribe = time.monotonic()
+        if self.link.request('T', self.telemetry_rate) is None:
+            logger.warning("Arduino did not acknowledge telemetry subscription, polling instead")
+        else:
+            logger.info(f"Subscribed to sensor telemetry at {self.telemetry_rate} Hz")
+    
+    def _on_telemetry(self, data: Dict):
+        """Store a decoded sensor frame as the latest state (runs on the link thread)"""
+        self.latest = data
+        self.latest_time = time.monotonic()
+        self.frame_count += 1
+        self.new_data.set()
+    
+    def wait_for_data(self, timeout: float) -> bool:
+        """Block until a new sensor frame arrives or timeout expires"""
+        got_data = self.new_data.wait(timeout)
+        self.new_data.clear()
+        return got_data
     
     def read_sensors(self) -> Dict:
         """Read all sensor data from Arduino"""
+        if self.streaming:
+            return self.latest
+        
         if not self.serial_connected:
-            try:
-                self._connect()
-            except Exception as e:
-                logger.error(f"Failed to reconnect to Arduino: {e}")
-                logger.error("Arduino reconnection failed")
-                return {"error": "Connection failed"}
+            return {"error": "Connection failed"}
+        
+        # The subscription is lost whenever the Arduino resets, so renew it
+        if self.telemetry_rate > 0 and time.monotonic() - self._last_subscribe > 2.0:
+            self.subscribe()
+            if self.streaming:
+                return self.latest
         
         try:
-            # Clear any pending data
-            self.ser.reset_input_buffer()
-            
-            # Request sensor readings
-            self.ser.write(b'S\n')  # Send sensor read command
-            
-            # Wait a moment for Arduino to process and respond
-            time.sleep(0.1)
-            
-            # Read the response
-            response = self.ser.readline().decode('utf-8', errors='replace').strip()
-            
-            # Parse JSON response from Arduino
-            data = json.loads(response)
+            # Request sensor readings; the link matches the decoded reply to this request
+            data = self.link.request('S')
+            if data is None:
+                return {"error": "No response from Arduino"}
             return data
         except Exception as e:
             logger.error(f"Sensor read error: {e}")
             return {"error": str(e)}
     
-    def get_magnetometer_heading(self) -> Optional[float]:
+    def get_magnetometer_heading(self, data: Optional[Dict] = None) -> Optional[float]:
         """Get heading from magnetometer in degrees (0-359.9)"""
         try:
-            data = self.read_sensors()
-            if "magnetometer" in data:
+            if data is None:
+                data = self.read_sensors()
+            if "magnetometer" in data and data["magnetometer"] >= 0:
                 return float(data["magnetometer"])
             return None
         except Exception as e:
             logger.error(f"Magnetometer read error: {e}")
             return None
     
-    def get_obstacle_distances(self) -> Dict[str, float]:
+    def get_obstacle_distances(self, data: Optional[Dict] = None) -> Dict[str, float]:
         """Get obstacle distances from ultrasonic sensors"""
         try:
-            data = self.read_sensors()
+            if data is None:
+                data = self.read_sensors()
             if "ultrasonic" in data:
                 return data["ultrasonic"]
             return {"front": 100, "left": 100, "right": 100}
@@ -213,28 +396,45 @@ class SensorModule:
 
 
 class MotionController:
-    """Controls the robot's movement by sending commands to motors"""
+    """Controls the robot's movement by sending commands to motors
     
-    def __init__(self, arduino_port="/dev/ttyACM0", baud=115200):
-        self.port = arduino_port
-        self.baud = baud
-        self.arduino = None
-        self.connected = False
-        self._connect()
+    Commands are queued on the shared ArduinoLink and written by its owner
+    thread, so callers never wait for an ack. A command identical to the
+    previous one is coalesced unless it failed or is older than
+    COMMAND_COALESCE_WINDOW. Stop goes through the link's priority lane and
+    cancels any motion commands that have not been written yet.
+    """
+    
+    def __init__(self, arduino_port="/dev/ttyACM0", baud=115200, link: Optional[ArduinoLink] = None):
+        # Share the serial owner with SensorModule when one is given
+        self.link = link if link is not None else ArduinoLink(arduino_port, baud)
+        self.port = self.link.port
+        self.baud = self.link.baud
+        self.last_request: Optional[CommandRequest] = None
+        self.coalesced = 0
+        self._unsent: List[CommandRequest] = []
+        self._command_handlers: List[Callable[[str, tuple], None]] = []
+        self.unsupported = set()  # commands the firmware rejected or never answered
+        self._probes: Dict[str, CommandRequest] = {}
+        self._probe_failures: Dict[str, int] = {}
         
-    def _connect(self):
-        """Connect to Arduino motor controller"""
-        try:
-            self.arduino = serial.Serial(self.port, self.baud, timeout=1)
-            self.connected = True
-            logger.info(f"Connected to motor controller on {self.port}")
-            time.sleep(2)  # Allow Arduino to reset after serial connection
-        except Exception as e:
-            logger.error(f"Failed to connect to motor controller: {e}")
-            self.connected = False
+        # Completion of on-board turns, reported asynchronously by the Arduino
+        self.heading_reached = threading.Event()
+        self.heading_result: Optional[Dict] = None
+        self._heading_request: Optional[CommandRequest] = None
+        self.link.add_event_handler(self._on_event)
+    
+    @property
+    def connected(self) -> bool:
+        return self.link.connected
     
-    def send_command(self, cmd: str, value: Optional[int] = None):
-        """Send command to Arduino
+    def add_command_handler(self, handler: Callable[[str, tuple], None]):
+        """Register a callback run with (cmd, args) for every command queued"""
+        self._command_handlers.append(handler)
+    
+    def send_command(self, cmd: str, value: Union[int, Tuple[int, ...], None] = None,
+                     coalesce: bool = True) -> Optional[CommandRequest]:
+        """Queue a command for the Arduino and return without waiting for the ack
         
         Commands:
         F - Forward (value = speed 0-255)
@@ -242,46 +442,119 @@ class MotionController:
         L - Left turn (value = turn radius, 0 = spin in place)
         R - Right turn (value = turn radius, 0 = spin in place)
         X - Stop
+        W - Wheel speeds (value = (left, right) signed PWM)
+        G - Turn in place to a heading (value = tenths of a degree)
+        H - Hold a heading while driving (value = (tenths of a degree, speed))
         """
         if not self.connected:
-            try:
-                self._connect()
-            except Exception as e:
-                logger.error(f"Failed to reconnect to motor controller: {e}")
-                logger.error("Motor controller reconnection failed")
-                return
-                
+            logger.error("Motor controller not connected, command dropped")
+            return None
+        
+        last = self.last_request
+        if coalesce and last is not None and last.cmd == cmd and last.args == command_args(value) \
+                and not last.failed and not last.cancelled \
+                and time.monotonic() - last.created < COMMAND_COALESCE_WINDOW:
+            self.coalesced += 1
+            return last
+        
         try:
-            command = f"{cmd}"
-            if value is not None:
-                command += f":{value}"
-            command += "\n"
-            
-            self.arduino.write(command.encode())
-            response = self.arduino.readline().decode('utf-8').strip()
-            logger.debug(f"Motor command sent: {command.strip()}, Response: {response}")
+            if cmd == 'X':
+                # Anything still queued would undo the stop, so drop it
+                for request in self._unsent:
+                    if request.sent_at is None:
+                        request.cancel()
+                self._unsent.clear()
+                request = self.link.submit(cmd, value, priority=True)
+            else:
+                self._unsent = [r for r in self._unsent if r.sent_at is None and not r.done]
+                request = self.link.submit(cmd, value)
+                self._unsent.append(request)
+            self.last_request = request
+            logger.debug(f"Motor command queued: {request.line.strip()}")
+            for handler in self._command_handlers:
+                handler(cmd, request.args)
+            return request
         except Exception as e:
             logger.error(f"Failed to send motor command: {e}")
+            return None
     
     def move_forward(self, speed=MAX_SPEED):
         """Move forward at specified speed"""
-        self.send_command('F', speed)
+        return self.send_command('F', speed)
     
     def move_backward(self, speed=MAX_SPEED):
         """Move backward at specified speed"""
-        self.send_command('B', speed)
+        return self.send_command('B', speed)
     
     def turn_left(self, radius=0):
         """Turn left with specified radius (0 = spin in place)"""
-        self.send_command('L', radius)
+        return self.send_command('L', radius)
     
     def turn_right(self, radius=0):
         """Turn right with specified radius (0 = spin in place)"""
-        self.send_command('R', radius)
+        return self.send_command('R', radius)
     
     def stop(self):
         """Stop all movement"""
-        self.send_command('X')
+        return self.send_command('X')
+    
+    def set_wheel_speeds(self, left: int, right: int):
+        """Drive each wheel at a signed PWM (-255..255, negative = backward)"""
+        left = max(-MAX_WHEEL_PWM, min(MAX_WHEEL_PWM, int(left)))
+        right = max(-MAX_WHEEL_PWM, min(MAX_WHEEL_PWM, int(right)))
+        return self._probe(self.send_command('W', (left, right)))
+    
+    def turn_to_heading(self, heading: float):
+        """Spin in place until the Arduino's magnetometer reads heading (degrees)
+        
+        The Arduino closes the loop itself and reports completion with an
+        event; poll heading_turn_done() or wait on heading_reached.
+        """
+        self.heading_reached.clear()
+        self.heading_result = None
+        request = self.send_command('G', int(round(heading * 10)) % 3600, coalesce=False)
+        self._heading_request = request
+        return self._probe(request)
+    
+    def hold_heading(self, heading: float, speed=MAX_SPEED):
+        """Drive at speed while the Arduino holds a magnetometer heading (degrees)"""
+        return self._probe(self.send_command('H', (int(round(heading * 10)) % 3600, speed)))
+    
+    def heading_turn_done(self) -> bool:
+        """True once the last turn_to_heading finished, timed out or was not accepted"""
+        if self.heading_reached.is_set():
+            return True
+        request = self._heading_request
+        return request is None or (request.done and (request.failed or request.cancelled))
+    
+    def supports(self, cmd: str) -> bool:
+        """False once the firmware has rejected cmd, or left several in a row unanswered"""
+        request = self._probes.get(cmd)
+        if request is not None and request.done:
+            del self._probes[cmd]
+            if request.cancelled:
+                return cmd not in self.unsupported
+            failures = self._probe_failures.get(cmd, 0) + 1 if request.failed else 0
+            self._probe_failures[cmd] = failures
+            if cmd not in self.unsupported and (request.rejected or failures >= UNSUPPORTED_COMMAND_FAILURES):
+                logger.warning(f"Arduino does not support the {cmd} command, falling back")
+                self.unsupported.add(cmd)
+        return cmd not in self.unsupported
+    
+    def _probe(self, request: Optional[CommandRequest]) -> Optional[CommandRequest]:
+        """Remember a request of an optional command for supports(), one outstanding at a time"""
+        if request is not None and request.cmd not in self._probes:
+            self._probes[request.cmd] = request
+        return request
+    
+    def _on_event(self, event: Dict):
+        """Completion events from the Arduino (runs on the link thread)"""
+        if event["cmd"] != 'G':
+            return
+        if event["status"] != EVENT_DONE:
+            logger.warning(f"On-board turn timed out at heading {event['heading']:.1f}°")
+        self.heading_result = event
+        self.heading_reached.set()
 
 
 class NavigationSystem:
@@ -290,17 +563,66 @@ class NavigationSystem:
     def __init__(self, api_key, config_file=CONFIG_FILE):
         self.api_key = api_key
         self.config_file = config_file
-        self.state = RobotState()
+        self._state = RobotState()
+        self._state_lock = threading.Lock()  # serializes writers; readers never take it
+        self.state_changed = threading.Event()  # set on every published snapshot
+        self.history = SensorHistory()  # timestamped sensor readings for windowed queries
         
         # Initialize modules
         self.load_config()
-        self.gps = GPSModule(port=self.config.get("gps_port", "/dev/ttyS0"))
-        self.sensors = SensorModule(arduino_port=self.config.get("arduino_port", "/dev/ttyACM0"))
-        self.motors = MotionController(arduino_port=self.config.get("arduino_port", "/dev/ttyACM0"))
+        self.gps = GPSModule(port=self.config.get("gps_port", "/dev/ttyS0"),
+                             mode=self.config.get("gps_mode", GPS_MODE),
+                             rate_hz=self.config.get("gps_rate", GPS_RATE))
+        # Sensors and motors share one Arduino, so one link owns the serial port
+        self.arduino = ArduinoLink(port=self.config.get("arduino_port", "/dev/ttyACM0"),
+                                   protocol_mode=self.config.get("arduino_protocol", ARDUINO_PROTOCOL))
+        self.sensors = SensorModule(link=self.arduino,
+                                    telemetry_rate=self.config.get("telemetry_rate", TELEMETRY_RATE))
+        self.motors = MotionController(link=self.arduino)
+        
+        # Fused pose, dead-reckoned from motor commands between GPS fixes
+        self.pose = PoseEstimator()
+        self.motors.add_command_handler(self.pose.set_command)
+        
+        # Offline walkable-path graph; routes it cannot plan go to Google Directions
+        self.campus_graph = CampusGraph.load(self.config.get("campus_graph", CAMPUS_GRAPH_FILE))
+        # Directions results, reused for starts within a few meters of an earlier request
+        self.route_cache = route_cache(self.config.get("cache_file", CACHE_FILE))
+        self.geocode_cache = geocode_cache(self.config.get("cache_file", CACHE_FILE))
+        
+        # Planar frame shared by route geometry, per-tick distance/bearing math and the obstacle map.
+        # It must sit on campus, so it is anchored by the config, the campus graph, the landmarks
+        # or the first fix, in that order, and the anchor is saved for later runs
+        self.projection: Optional[LocalProjection] = None
+        # Where obstacles were met on earlier runs; raises route costs and feeds the local planner
+        self.obstacle_map: Optional[ObstacleMap] = None
+        self._origin_lock = threading.Lock()
+        if self.config.get("campus_origin"):
+            self.set_origin(*self.config["campus_origin"], source="config")
+        elif self.campus_graph is not None:
+            graph_origin = self.campus_graph.projection
+            self.set_origin(graph_origin.origin_lat, graph_origin.origin_lon, source="campus graph")
         
         # Navigation data
         self.waypoints = []
+        self.route: Optional[Route] = None
+        self.route_progress: Optional[RouteProgress] = None
         self.previous_position = None
+        self.last_fix_position = None
+        
+        # Control loop pacing and timed motor maneuvers
+        self.scheduler: Optional[ControlScheduler] = None
+        self.control_stats = ControlStats()
+        self._maneuver = deque()
+        self._maneuver_until = 0.0
+        self._maneuver_done = None
+        self._driving_through = False  # the last waypoint was passed without stopping
+        self.steering = HeadingController()
+        # Steers around obstacles using the recent ultrasonic history
+        self.local_planner = LocalPlanner()
+        self._position_handlers: List[Callable[[RobotState], None]] = []
+        # Plans upcoming legs in the background; one worker keeps requests in order
+        self._planner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="route-planner")
         
         # Start background threads
         self.running = True
@@ -311,6 +633,43 @@ class NavigationSystem:
         self.gps_thread.start()
         self.sensor_thread.start()
     
+    @property
+    def state(self) -> RobotState:
+        """Latest consistent state snapshot (never changes after it is returned)"""
+        return self._state
+    
+    def update_state(self, **changes) -> RobotState:
+        """Publish a new snapshot with the given fields changed and return it"""
+        if "obstacles" in changes:
+            changes["obstacles"] = MappingProxyType(dict(changes["obstacles"]))
+        with self._state_lock:
+            state = replace(self._state, version=self._state.version + 1, updated=time.monotonic(), **changes)
+            self._state = state
+        self.state_changed.set()
+        return state
+    
+    def set_origin(self, lat: float, lon: float, source: str = "") -> LocalProjection:
+        """Anchor the local frame at lat/lon unless it already is; returns the projection in use"""
+        with self._origin_lock:
+            if self.projection is not None:
+                return self.projection
+            self.projection = local_projection(lat, lon)
+            self.obstacle_map = ObstacleMap(self.config.get("obstacle_map", OBSTACLE_MAP_FILE), self.projection)
+            logger.info(f"Local frame anchored at ({lat:.6f}, {lon:.6f}) from the {source or 'caller'}")
+            if source != "config":
+                # The obstacle map and route geometry stay in the same frame on later runs
+                self.config["campus_origin"] = [lat, lon]
+                try:
+                    with open(self.config_file, 'w') as f:
+                        json.dump(self.config, f, indent=4)
+                except Exception as e:
+                    logger.error(f"Failed to save campus origin: {e}")
+            return self.projection
+    
+    def add_position_handler(self, handler: Callable[[RobotState], None]):
+        """Register a callback run on the GPS update thread with each snapshot published for a fix"""
+        self._position_handlers.append(handler)
+    
     def load_config(self):
         """Load robot configuration from file"""
         try:
@@ -318,105 +677,154 @@ class NavigationSystem:
                 with open(self.config_file, 'r') as f:
                     self.config = json.load(f)
             else:
-                # Default configuration
-                self.config = {
-                    "gps_port": "/dev/ttyS0",
-                    "arduino_port": "/dev/ttyACM0",
-                    "waypoint_radius": WAYPOINT_RADIUS,
-                    "obstacle_threshold": OBSTACLE_DISTANCE_THRESHOLD,
-                    "heading_source": HEADING_SOURCE,
-                    "max_speed": MAX_SPEED,
-                    "min_speed": MIN_SPEED
-                }
+                self.config = dict(DEFAULT_CONFIG)
                 with open(self.config_file, 'w') as f:
                     json.dump(self.config, f, indent=4)
         except Exception as e:
             logger.error(f"Error loading config: {e}")
-            # Set default configuration
-            self.config = {
-                "gps_port": "/dev/ttyS0", 
-                "arduino_port": "/dev/ttyACM0",
-                "waypoint_radius": WAYPOINT_RADIUS,
-                "obstacle_threshold": OBSTACLE_DISTANCE_THRESHOLD,
-                "heading_source": HEADING_SOURCE,
-                "max_speed": MAX_SPEED,
-                "min_speed": MIN_SPEED
-            }
+            self.config = dict(DEFAULT_CONFIG)
     
     def _gps_update_loop(self):
         """Background thread to continuously update GPS position"""
         while self.running:
+            # Run once per fix published by the GPS reader thread
+            if not self.gps.wait_for_fix(timeout=MAX_GPS_AGE):
+                continue
+            
             try:
-                lat, lon = self.gps.get_averaged_position()
+                fix = self.gps.latest_fix
+                lat, lon = self.gps.read_gps()
                 if lat is not None and lon is not None:
-                    # Store previous position for heading calculation
-                    self.previous_position = (self.state.lat, self.state.lon)
+                    if self.projection is None:
+                        self.set_origin(lat, lon, source="first GPS fix")
                     
-                    # Update current position
-                    self.state.lat = lat
-                    self.state.lon = lon
-                    self.state.last_gps_update = time.time()
+                    # Store previous fix for heading calculation
+                    self.previous_position = self.last_fix_position
+                    self.last_fix_position = (lat, lon)
                     
-                    # Calculate GPS-based heading if we have previous position
-                    if self.previous_position and self.previous_position != (lat, lon):
-                        self.state.gps_heading = self.gps.calculate_heading_from_positions(
+                    # The estimator weighs the fix against its dead-reckoned prediction
+                    self.pose.update_gps(fix)
+                    changes = self._pose_changes()
+                    changes["gps_fix"] = fix
+                    changes["last_gps_update"] = time.time()
+                    self.history.record_many({"lat": lat, "lon": lon}, t=fix.t)
+                    if fix.speed is not None:
+                        self.history.record("speed", fix.speed, t=fix.t)
+                    
+                    # Course over ground is the best GPS heading while moving
+                    if fix.course is not None and fix.speed is not None and fix.speed > MIN_COURSE_SPEED:
+                        changes["gps_heading"] = fix.course
+                        self.history.record("gps_heading", fix.course, t=fix.t)
+                    
+                    # Otherwise calculate GPS-based heading if we have previous position
+                    elif self.previous_position and self.previous_position != (lat, lon):
+                        gps_heading = self.gps.calculate_heading_from_positions(
                             self.previous_position, (lat, lon)
                         )
-                        
+                        changes["gps_heading"] = gps_heading
+                        if gps_heading is not None:
+                            self.history.record("gps_heading", gps_heading, t=fix.t)
+                    
                     # Update distance to current waypoint if navigating
-                    if self.state.navigation_active and self.waypoints:
-                        current_wp = self.waypoints[self.state.current_waypoint_index]
-                        self.state.distance_to_waypoint = haversine_distance(
-                            self.state.lat, self.state.lon, 
-                            current_wp[0], current_wp[1]
-                        )
-                        self.state.bearing_to_waypoint = calculate_bearing(
-                            self.state.lat, self.state.lon,
+                    state = self.state
+                    cur_lat = changes.get("lat", state.lat)
+                    cur_lon = changes.get("lon", state.lon)
+                    progress = self.route_progress
+                    if state.navigation_active and self.waypoints and progress is not None:
+                        current_wp = self.waypoints[state.current_waypoint_index]
+                        distance, bearing = self.projection.distance_bearing(
+                            cur_lat, cur_lon,
                             current_wp[0], current_wp[1]
                         )
+                        changes["distance_to_waypoint"] = distance
+                        changes["bearing_to_waypoint"] = bearing
                         
-                        # Calculate total remaining distance
-                        remaining = 0
-                        for i in range(self.state.current_waypoint_index, len(self.waypoints)-1):
-                            wp1 = self.waypoints[i]
-                            wp2 = self.waypoints[i+1]
-                            remaining += haversine_distance(wp1[0], wp1[1], wp2[0], wp2[1])
-                        self.state.remaining_distance = remaining
+                        # Project onto the precomputed route: constant time however many waypoints remain
+                        progress.update(cur_lat, cur_lon)
+                        changes["remaining_distance"] = progress.remaining
+                        changes["along_track_distance"] = progress.along_track
+                        changes["cross_track_error"] = progress.cross_track
                         
-                        logger.debug(f"GPS Update: {lat}, {lon}, Dist to WP: {self.state.distance_to_waypoint:.2f}m")
+                        logger.debug(f"GPS Update: {lat}, {lon}, Dist to WP: {changes['distance_to_waypoint']:.2f}m")
+                    
+                    state = self.update_state(**changes)
+                    for handler in self._position_handlers:
+                        try:
+                            handler(state)
+                        except Exception as e:
+                            logger.error(f"Position handler error: {e}")
             except Exception as e:
                 logger.error(f"Error in GPS update loop: {e}")
-            
-            time.sleep(GPS_UPDATE_INTERVAL)
     
     def _sensor_update_loop(self):
         """Background thread to continuously update sensor readings"""
+        last_frame = -1
         while self.running:
             try:
+                # One frame carries both magnetometer and ultrasonic data
+                data = self.sensors.read_sensors()
+                
+                changes = {}
+                
                 # Update magnetometer heading
-                heading = self.sensors.get_magnetometer_heading()
+                heading = self.sensors.get_magnetometer_heading(data)
                 if heading is not None:
-                    self.state.magnetometer_heading = heading
+                    changes["magnetometer_heading"] = heading
                 
                 # Update obstacle sensors
-                obstacles = self.sensors.get_obstacle_distances()
+                obstacles = self.sensors.get_obstacle_distances(data)
                 if obstacles:
-                    self.state.obstacles = obstacles
+                    changes["obstacles"] = obstacles
+                
+                # Record each new frame once, stamped with its arrival time
+                if "error" not in data and self.sensors.frame_count != last_frame:
+                    last_frame = self.sensors.frame_count
+                    changes["last_sensor_update"] = self.sensors.latest_time
+                    readings = {direction: float(obstacles[direction]) for direction in ("front", "left", "right")}
+                    if heading is not None:
+                        readings["magnetometer"] = heading
+                    self.history.record_many(readings, t=self.sensors.latest_time)
+                    if heading is not None:
+                        self.pose.update_heading(heading, t=self.sensors.latest_time)
                 
-                # Set the heading based on configuration
-                if self.config["heading_source"] == "magnetometer" and self.state.magnetometer_heading is not None:
-                    self.state.heading = self.state.magnetometer_heading
-                elif self.config["heading_source"] == "gps" and self.state.gps_heading is not None:
-                    self.state.heading = self.state.gps_heading
+                # Dead-reckon the fused pose forward at the sensor rate
+                changes.update(self._pose_changes())
                 
-                logger.debug(f"Sensor Update: Heading: {self.state.heading}, Obstacles: {self.state.obstacles}")
+                # A single raw heading source overrides the fused heading when configured
+                gps_heading = self.state.gps_heading
+                if self.config["heading_source"] == "magnetometer" and heading is not None:
+                    changes["heading"] = heading
+                elif self.config["heading_source"] == "gps" and gps_heading is not None:
+                    changes["heading"] = gps_heading
+                
+                state = self.update_state(**changes)
+                logger.debug(f"Sensor Update: Heading: {state.heading}, Obstacles: {dict(state.obstacles)}")
             except Exception as e:
                 logger.error(f"Error in sensor update loop: {e}")
             
-            time.sleep(0.2)  # Update sensors more frequently than GPS
+            if self.sensors.streaming:
+                # Wake as soon as the next pushed frame arrives
+                self.sensors.wait_for_data(timeout=0.2)
+            else:
+                time.sleep(0.2)  # Update sensors more frequently than GPS
+    
+    def _pose_changes(self) -> Dict:
+        """State fields taken from the estimator's current pose"""
+        pose = self.pose.pose()
+        if pose is None:
+            return {}
+        changes = {"lat": pose.lat, "lon": pose.lon, "speed": pose.speed, "position_sigma": pose.position_sigma}
+        if self.config["heading_source"] == "fused":
+            changes["heading"] = pose.heading
+        return changes
     
     def geocode_address(self, address: str) -> Union[Tuple[float, float], None]:
         """Convert an address to coordinates using Google Geocoding API."""
+        cached, coordinates = self.geocode_cache.get(address)
+        if cached:
+            logger.info(f"Geocode cache hit for '{address}': {coordinates}")
+            return coordinates
+        
         url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {
             "address": address,
@@ -429,10 +837,15 @@ class NavigationSystem:
 
             if data["status"] != "OK":
                 logger.error(f"Geocoding error: {data['status']}")
+                # Only a definite "no such place" is worth remembering, not quota or network trouble
+                if data["status"] == "ZERO_RESULTS":
+                    self.geocode_cache.put(address, None)
                 return None
 
             location = data["results"][0]["geometry"]["location"]
-            return (location["lat"], location["lng"])
+            coordinates = (location["lat"], location["lng"])
+            self.geocode_cache.put(address, coordinates)
+            return coordinates
 
         except Exception as e:
             logger.error(f"Failed to geocode address: {e}")
@@ -440,7 +853,7 @@ class NavigationSystem:
     
     def get_waypoints(self, start_location: Tuple[float, float], 
                      end_location: Union[str, Tuple[float, float]]) -> List[Tuple[float, float]]:
-        """Get fine-grained waypoints using Google Directions API with polyline decoding."""
+        """Get fine-grained waypoints from the campus graph, or Google Directions API with polyline decoding."""
         
         # Geocode if end_location is an address
         if isinstance(end_location, str):
@@ -451,6 +864,25 @@ class NavigationSystem:
             end_location = geocoded_end
             logger.info(f"Geocoded destination to coordinates: {geocoded_end}")
 
+        # Campus paths first: planned offline in milliseconds and only along walkways the robot can use
+        if self.campus_graph is not None:
+            start = time.monotonic()
+            self.update_route_costs()
+            waypoints = self.campus_graph.plan(start_location, end_location)
+            if waypoints:
+                logger.info(f"Planned {len(waypoints)} waypoints on the campus graph "
+                            f"in {1000 * (time.monotonic() - start):.1f}ms")
+                return waypoints
+            logger.info("Campus graph cannot plan this route, falling back to Google Directions")
+
+        # Simplified routes depend on the tolerance, so it is part of the cache key
+        profile = directions_profile(self.config.get("route_tolerance", SIMPLIFY_TOLERANCE))
+        cached = self.route_cache.get(start_location, end_location, profile)
+        if cached:
+            logger.info(f"Using cached route with {len(cached)} waypoints "
+                        f"(hit rate {self.route_cache.stats.hit_rate:.0%})")
+            return cached
+
         url = "https://maps.googleapis.com/maps/api/directions/json"
         params = {
             "origin": f"{start_location[0]},{start_location[1]}",
@@ -477,6 +909,7 @@ class NavigationSystem:
 
             # Filter waypoints to reduce redundancy while preserving critical points
             filtered_waypoints = self._optimize_waypoints(waypoints)
+            self.route_cache.put(start_location, end_location, filtered_waypoints, profile)
             
             return filtered_waypoints
 
@@ -488,66 +921,13 @@ class NavigationSystem:
         """Optimize waypoints by removing redundant points while preserving path shape"""
         if len(waypoints) <= 2:
             return waypoints
-            
-        # Always keep first and last waypoints
-        optimized = [waypoints[0]]
-        
-        # Douglas-Peucker algorithm for path simplification
-        # This reduces the number of points while maintaining the path shape
-        epsilon = 0.00001  # Adjust based on desired detail level
-        
-        def point_line_distance(point, line_start, line_end):
-            if line_start == line_end:
-                return haversine_distance(point[0], point[1], line_start[0], line_start[1])
-                
-            # Calculate perpendicular distance from point to line
-            # using the formula: d = |cross_product| / |line_vector|
-            line_vector = (line_end[0] - line_start[0], line_end[1] - line_start[1])
-            point_vector = (point[0] - line_start[0], point[1] - line_start[1])
-            
-            # Cross product magnitude
-            cross = abs(line_vector[0] * point_vector[1] - line_vector[1] * point_vector[0])
-            
-            # Line length
-            line_length = math.sqrt(line_vector[0]**2 + line_vector[1]**2)
-            
-            if line_length == 0:
-                return 0
-                
-            # Distance
-            return cross / line_length
-        
-        def simplify_recursive(points, start_idx, end_idx):
-            # Find point with maximum distance
-            max_dist = 0
-            max_idx = start_idx
-            
-            for i in range(start_idx + 1, end_idx):
-                dist = point_line_distance(points[i], points[start_idx], points[end_idx])
-                if dist > max_dist:
-                    max_dist = dist
-                    max_idx = i
-            
-            # If max distance is greater than epsilon, recursively simplify
-            if max_dist > epsilon:
-                # Recursive call
-                simplify_recursive(points, start_idx, max_idx)
-                optimized.append(points[max_idx])
-                simplify_recursive(points, max_idx, end_idx)
-        
-        # Run recursive simplification
-        simplify_recursive(waypoints, 0, len(waypoints) - 1)
         
-        # Add last point
-        optimized.append(waypoints[-1])
+        # Douglas-Peucker in local meters, keeping every point further than the tolerance from the path
+        keep = simplify_route(waypoints, self.config.get("route_tolerance", SIMPLIFY_TOLERANCE))
+        optimized = [waypoints[i] for i in keep]
         
-        # Sort optimized points to maintain original order
-        optimized_indices = [waypoints.index(p) for p in optimized]
-        optimized_indices.sort()
-        sorted_optimized = [waypoints[i] for i in optimized_indices]
-        
-        logger.info(f"Optimized waypoints from {len(waypoints)} to {len(sorted_optimized)} points")
-        return sorted_optimized
+        logger.info(f"Optimized waypoints from {len(waypoints)} to {len(optimized)} points")
+        return optimized
     
     def _adjust_speed_for_turn(self, angle_diff: float) -> int:
         """Calculate appropriate speed based on sharpness of turn"""
@@ -565,227 +945,384 @@ class NavigationSystem:
         else:
             return self.config["max_speed"]
     
-    def _handle_obstacles(self) -> bool:
-        """Check for obstacles and take avoidance action if needed
+    def _obstacle_distance(self, direction: str) -> float:
+        """Closest ultrasonic reading in a direction over the recent window"""
+        closest = self.history.min(direction, OBSTACLE_WINDOW)
+        if closest is None:
+            return self.state.obstacles[direction]
+        return closest
+    
+    def _start_maneuver(self, phases: List[tuple], now: Optional[float] = None):
+        """Queue motor phases: each (action, seconds[, done]) runs once the previous one ends
+        
+        A phase ends after its duration, or earlier once its optional done()
+        callback returns True.
+        """
+        self._maneuver = deque(phases)
+        self._maneuver_until = time.monotonic() if now is None else now
+        self._maneuver_done: Optional[Callable[[], bool]] = None
+        self.steering.reset()  # the heading error history is meaningless after a maneuver
+    
+    def _maneuver_busy(self, now: float) -> bool:
+        """Advance the current maneuver; True while it still owns the motors"""
+        while now >= self._maneuver_until or (self._maneuver_done is not None and self._maneuver_done()):
+            if not self._maneuver:
+                self._maneuver_done = None
+                return False
+            action, duration, *done = self._maneuver.popleft()
+            if action is not None:
+                action()
+            self._maneuver_until = now + duration
+            self._maneuver_done = done[0] if done else None
+        return True
+    
+    def _handle_obstacles(self, now: Optional[float] = None) -> bool:
+        """Check for obstacles and start an avoidance maneuver if needed
         Returns True if obstacle handling required stopping normal navigation
         """
         threshold = self.config["obstacle_threshold"]
+        front = self._obstacle_distance("front")
+        left = self._obstacle_distance("left")
+        right = self._obstacle_distance("right")
         
         # Check front obstacle
-        if self.state.obstacles["front"] < threshold:
-            logger.warning(f"Obstacle detected ahead at {self.state.obstacles['front']}cm")
+        if front < threshold:
+            logger.warning(f"Obstacle detected ahead at {front}cm")
             self.motors.stop()
             
             # Check left and right for clearance
-            if self.state.obstacles["left"] > self.state.obstacles["right"]:
+            if left > right:
                 logger.info("Turning left to avoid obstacle")
-                self.motors.turn_left()
-                time.sleep(0.5)
+                turn = self.motors.turn_left
             else:
                 logger.info("Turning right to avoid obstacle")
-                self.motors.turn_right()
-                time.sleep(0.5)
-                
-            self.motors.stop()
+                turn = self.motors.turn_right
+            
+            self._start_maneuver([(turn, 0.5), (self.motors.stop, OBSTACLE_SETTLE_TIME)], now)
             return True
             
         # Adjust for side obstacles
-        elif self.state.obstacles["left"] < threshold:
-            logger.info(f"Obstacle close on left at {self.state.obstacles['left']}cm")
-            self.motors.turn_right(radius=50)  # Gentle right turn
-            time.sleep(0.2)
-            self.motors.move_forward()
+        elif left < threshold:
+            logger.info(f"Obstacle close on left at {left}cm")
+            self._start_maneuver([
+                (lambda: self.motors.turn_right(radius=50), 0.2),  # Gentle right turn
+                (self.motors.move_forward, OBSTACLE_SETTLE_TIME),
+            ], now)
             return True
             
-        elif self.state.obstacles["right"] < threshold:
-            logger.info(f"Obstacle close on right at {self.state.obstacles['right']}cm")
-            self.motors.turn_left(radius=50)  # Gentle left turn
-            time.sleep(0.2)
-            self.motors.move_forward()
+        elif right < threshold:
+            logger.info(f"Obstacle close on right at {right}cm")
+            self._start_maneuver([
+                (lambda: self.motors.turn_left(radius=50), 0.2),  # Gentle left turn
+                (self.motors.move_forward, OBSTACLE_SETTLE_TIME),
+            ], now)
             return True
             
         return False
     
-    def navigate_to_waypoint(self, waypoint: Tuple[float, float]) -> bool:
+    def update_route_costs(self):
+        """Penalize campus graph walkways the obstacle map has seen blocked"""
+        if self.campus_graph is None or self.obstacle_map is None:
+            return
+        penalties = self.obstacle_map.edge_penalties(self.campus_graph)
+        self.campus_graph.set_edge_penalties(penalties)
+        if self.campus_graph.penalties is not None:
+            logger.info(f"{int((penalties > 0).sum()) // 2} campus walkways penalized for obstacles seen before")
+    
+    def _plan_locally(self, state: RobotState, goal_bearing: float, now: float) -> SteeringCommand:
+        """Local planner steering for this tick, fed with the ultrasonic samples since the last one"""
+        east, north = self.projection.to_local(state.lat, state.lon)
+        readings = self.local_planner.observe_history(self.history, east, north, state.heading, now)
+        # A smeared position would spread obstacles over the walkways, so only map from good poses
+        if state.position_sigma <= MAP_POSITION_SIGMA:
+            self.obstacle_map.observe(east, north, readings)
+        remembered = self.obstacle_map.occupied_near(east, north, ACTIVE_RANGE / 100.0)
+        return self.local_planner.update(east, north, state.heading, goal_bearing, now,
+                                         stop_distance=self.config["obstacle_threshold"],
+                                         remembered=remembered)
+    
+    def _scaled_speed(self, angle_diff: float, speed_scale: float) -> int:
+        """Turn-adjusted speed slowed for the clearance ahead; 0 drops the forward component"""
+        if speed_scale <= 0:
+            return 0
+        speed = self._adjust_speed_for_turn(angle_diff)
+        return max(self.config["min_speed"], int(speed * speed_scale))
+    
+    def navigate_to_waypoint(self, waypoint: Tuple[float, float], index: Optional[int] = None,
+                             through: bool = False) -> bool:
         """Navigate to a specific waypoint
-        Returns True when waypoint is reached
+        Returns True when waypoint is reached, False if navigation was stopped
+        index is the waypoint's position in the current route, if it is part of one
+        through keeps driving once it is reached: the motors stay on and the steering
+        state carries over to the next waypoint, so the robot follows the route's curves
         """
-        # Calculate distance and bearing to waypoint
-        distance = haversine_distance(
-            self.state.lat, self.state.lon,
-            waypoint[0], waypoint[1]
+        state = self.state
+        distance = haversine_distance(state.lat, state.lon, waypoint[0], waypoint[1])
+        target_bearing = calculate_bearing(state.lat, state.lon, waypoint[0], waypoint[1])
+        logger.info(f"Navigating to waypoint: {waypoint}, Distance: {distance:.2f}m, Bearing: {target_bearing:.1f}°")
+        
+        # Run the navigation step at a fixed rate, waking early on every state update
+        if not self._driving_through:
+            self._start_maneuver([])
+        self.scheduler = ControlScheduler(
+            lambda now: self._navigation_step(waypoint, now, index),
+            rate_hz=self.config.get("control_rate", CONTROL_RATE),
+            wake_event=self.state_changed,
+            stats=self.control_stats,
         )
-        target_bearing = calculate_bearing(
-            self.state.lat, self.state.lon,
+        reached = self.scheduler.run()
+        self._driving_through = reached and through and self.running
+        if not self._driving_through:
+            self.motors.stop()
+        if reached:
+            logger.info(f"Reached waypoint {waypoint}")
+        return reached
+    
+    def _navigation_step(self, waypoint: Tuple[float, float], now: float, index: Optional[int] = None) -> bool:
+        """One control tick toward a waypoint; returns True once it is reached or passed"""
+        # Timed turns and pauses keep the motors until they finish
+        if self._maneuver_busy(now):
+            return False
+        
+        # Distance and bearing from one consistent snapshot, in the campus plane
+        state = self.state
+        distance, target_bearing = self.projection.distance_bearing(
+            state.lat, state.lon,
             waypoint[0], waypoint[1]
         )
+        if distance <= self.config["waypoint_radius"]:
+            return True
+        # A waypoint the robot has already moved past along the route counts as reached,
+        # so a fix that lands just beyond it does not send the robot back
+        route = self.route
+        if index is not None and route is not None and state.along_track_distance > route.distance_to(index):
+            logger.debug(f"Passed waypoint {index + 1} at {state.along_track_distance:.1f}m along the route")
+            return True
         
-        logger.info(f"Navigating to waypoint: {waypoint}, Distance: {distance:.2f}m, Bearing: {target_bearing:.1f}°")
+        # Dead reckoning carries us through GPS gaps until the position is too uncertain
+        position_sigma = self.pose.position_uncertainty()
+        if position_sigma > MAX_POSITION_UNCERTAINTY:
+            logger.warning(f"Position uncertainty {position_sigma:.1f}m too high, stopping navigation")
+            self._start_maneuver([(self.motors.stop, 1.0)], now)
+            return False
         
-        # Keep navigating until we reach the waypoint
-        while distance > self.config["waypoint_radius"]:
-            # Check if GPS data is stale
-            if time.time() - self.state.last_gps_update > MAX_GPS_AGE:
-                logger.warning("GPS data is stale, stopping navigation")
-                self.motors.stop()
-                time.sleep(1)
-                continue
-                
-            # Check for obstacles
-            if self._handle_obstacles():
-                time.sleep(0.5)  # Short delay after obstacle handling
-                continue
-                
-            # Calculate angle difference between current heading and target bearing
-            angle_diff = (target_bearing - self.state.heading + 360) % 360
-            if angle_diff > 180:
-                angle_diff -= 360
-                
-            logger.debug(f"Current heading: {self.state.heading:.1f}°, Target: {target_bearing:.1f}°, Diff: {angle_diff:.1f}°")
-                
-            # Adjust direction based on angle difference
-            if abs(angle_diff) > 20:
-                # Need to turn significantly
-                self.motors.stop()
-                
-                if angle_diff > 0:
-                    logger.debug("Turning right")
-                    self.motors.turn_right()
-                else:
-                    logger.debug("Turning left")
-                    self.motors.turn_left()
-                    
-                # Wait for turn to have an effect
-                time.sleep(0.3)
+        # Never drive blind: obstacle readings must be fresh
+        if self.history.is_stale("front", MAX_SENSOR_AGE):
+            logger.warning("Obstacle sensor data is stale, stopping navigation")
+            self._start_maneuver([(self.motors.stop, 0.2)], now)
+            return False
+            
+        # Check for obstacles: the local planner bends the target bearing around them every tick,
+        # the reactive mode hands the motors to a timed maneuver instead
+        speed_scale = 1.0
+        if self.config.get("obstacle_avoidance", OBSTACLE_AVOIDANCE) == "vfh":
+            command = self._plan_locally(state, target_bearing, now)
+            target_bearing = command.bearing
+            speed_scale = command.speed_scale
+        elif self._handle_obstacles(now):
+            return False
+            
+        # Calculate angle difference between current heading and target bearing
+        angle_diff = (target_bearing - state.heading + 360) % 360
+        if angle_diff > 180:
+            angle_diff -= 360
+            
+        logger.debug(f"Current heading: {state.heading:.1f}°, Target: {target_bearing:.1f}°, Diff: {angle_diff:.1f}°")
+        
+        steering = self.config.get("steering", STEERING_MODE)
+        
+        # On-board steering: the Arduino closes the heading loop against its magnetometer
+        if steering == "onboard" and state.magnetometer_heading is not None \
+                and self.motors.supports('G') and self.motors.supports('H'):
+            # Command in the magnetometer's frame, which may be offset from the fused heading
+            mag_target = (target_bearing + state.magnetometer_heading - state.heading) % 360
+            if abs(angle_diff) > ONBOARD_TURN_ERROR:
+                logger.debug(f"Turning on board to magnetometer heading {mag_target:.0f}°")
+                self._start_maneuver([(lambda: self.motors.turn_to_heading(mag_target), ONBOARD_TURN_TIMEOUT,
+                                       self.motors.heading_turn_done)], now)
+            else:
+                # Whole degrees, so an unchanged target coalesces instead of being re-sent every tick
+                self.motors.hold_heading(round(mag_target), self._scaled_speed(angle_diff, speed_scale))
+            return False
+        
+        # Closed-loop steering follows curves with continuous wheel speeds
+        if steering in ("pid", "onboard") and self.motors.supports('W'):
+            speed = self._scaled_speed(angle_diff, speed_scale)
+            left, right = self.steering.update(target_bearing, state.heading, speed, now)
+            logger.debug(f"Wheel speeds: left {left}, right {right}")
+            self.motors.set_wheel_speeds(left, right)
+            return False
+            
+        # Open-loop fallback: adjust direction based on angle difference
+        if abs(angle_diff) > 20 or (speed_scale <= 0 and abs(angle_diff) > 5):
+            # Need to turn significantly (or cannot drive on): pulse the turn, then let the heading reading settle
+            if angle_diff > 0:
+                logger.debug("Turning right")
+                turn = self.motors.turn_right
+            else:
+                logger.debug("Turning left")
+                turn = self.motors.turn_left
+            self._start_maneuver([(self.motors.stop, 0.0), (turn, 0.3), (self.motors.stop, 0.2)], now)
+            
+        elif abs(angle_diff) > 5:
+            # Minor direction adjustment while moving
+            speed = self._scaled_speed(angle_diff, speed_scale)
+            
+            if angle_diff > 0:
+                logger.debug(f"Moving forward with right adjustment, speed: {speed}")
+                gentle_turn = lambda: self.motors.turn_right(radius=100)  # Gentle right turn
+            else:
+                logger.debug(f"Moving forward with left adjustment, speed: {speed}")
+                gentle_turn = lambda: self.motors.turn_left(radius=100)  # Gentle left turn
+            self._start_maneuver([(gentle_turn, 0.2), (lambda: self.motors.move_forward(speed), 0.0)], now)
+            
+        else:
+            # Heading is good, move forward
+            speed = self._scaled_speed(angle_diff, speed_scale)
+            if speed == 0:
+                logger.debug("Obstacle too close ahead, waiting for a way around")
                 self.motors.stop()
-                time.sleep(0.2)  # Short pause to stabilize heading reading
-                
-            elif abs(angle_diff) > 5:
-                # Minor direction adjustment while moving
-                speed = self._adjust_speed_for_turn(angle_diff)
-                
-                if angle_diff > 0:
-                    logger.debug(f"Moving forward with right adjustment, speed: {speed}")
-                    self.motors.turn_right(radius=100)  # Gentle right turn
-                else:
-                    logger.debug(f"Moving forward with left adjustment, speed: {speed}")
-                    self.motors.turn_left(radius=100)  # Gentle left turn
-                    
-                time.sleep(0.2)
-                self.motors.move_forward(speed)
-                
             else:
-                # Heading is good, move forward
-                speed = self._adjust_speed_for_turn(angle_diff)
                 logger.debug(f"Moving forward, speed: {speed}")
                 self.motors.move_forward(speed)
-            
-            # Update distance to waypoint
-            distance = haversine_distance(
-                self.state.lat, self.state.lon,
-                waypoint[0], waypoint[1]
-            )
-            target_bearing = calculate_bearing(
-                self.state.lat, self.state.lon,
-                waypoint[0], waypoint[1]
-            )
-            
-            # Small delay to prevent tight loop
-            time.sleep(0.2)
         
-        # We've reached the waypoint
-        logger.info(f"Reached waypoint {waypoint}")
-        self.motors.stop()
-        return True
+        return False
 
-    def navigate_route(self, destination: Union[str, Tuple[float, float]]) -> bool:
-        """Navigate to a destination using waypoints from Google Maps API"""
+    def plan_route(self, start: Tuple[float, float],
+                   destination: Union[str, Tuple[float, float]]) -> Optional[PlannedRoute]:
+        """Fetch waypoints and precompute route geometry; safe to run off the navigation thread"""
+        logger.info(f"Planning route from {start} to {destination}")
+        waypoints = self.get_waypoints(start, destination)
+        if not waypoints:
+            return None
+        return PlannedRoute(tuple(start), destination, Route(waypoints, self.projection), time.monotonic())
+    
+    def prefetch_route(self, destination: Union[str, Tuple[float, float]],
+                       start: Tuple[float, float]) -> Future:
+        """Plan a route from start in the background; pass the result to navigate_route"""
+        return self._planner.submit(self.plan_route, start, destination)
+    
+    def _prefetched_plan(self, prefetched: Future, position: Tuple[float, float],
+                         destination: Union[str, Tuple[float, float]]) -> Optional[PlannedRoute]:
+        """A prefetched route checked against the live position, or None if it cannot be used"""
+        try:
+            plan = prefetched.result(timeout=PREFETCH_WAIT)
+        except Exception as e:
+            logger.warning(f"Prefetched route unavailable: {e}")
+            return None
+        if plan is None:
+            return None
+        if not _same_destination(plan.destination, destination):
+            logger.info("Prefetched route is for a different destination")
+            return None
+        offset, _ = self.projection.distance_bearing(position[0], position[1], plan.start[0], plan.start[1])
+        if offset > PREFETCH_START_TOLERANCE:
+            logger.info(f"Robot is {offset:.0f}m from the prefetched route's start, replanning")
+            return None
+        return plan.trimmed_to(position)
+    
+    def navigate_route(self, destination: Union[str, Tuple[float, float]],
+                       prefetched: Optional[Future] = None) -> bool:
+        """Navigate to a destination using waypoints from Google Maps API
+        prefetched is a prefetch_route() result for this destination, used if it still fits
+        """
         # Get current position
-        current_location = (self.state.lat, self.state.lon)
+        state = self.state
+        current_location = (state.lat, state.lon)
         
         # Check if we have a valid GPS position
         if current_location[0] == 0 and current_location[1] == 0:
             logger.error("Cannot start navigation: invalid GPS position")
             return False
         
-        # Fetch waypoints
-        logger.info(f"Planning route from {current_location} to {destination}")
-        self.waypoints = self.get_waypoints(current_location, destination)
+        # A route planned in the background is used at once if the robot is where it starts
+        plan = None
+        if prefetched is not None:
+            plan = self._prefetched_plan(prefetched, current_location, destination)
+            if plan is not None:
+                logger.info(f"Using prefetched route planned {time.monotonic() - plan.planned_at:.0f}s ago")
+        if plan is None:
+            plan = self.plan_route(current_location, destination)
         
-        if not self.waypoints:
+        if plan is None:
             logger.error("Failed to get waypoints for route")
             return False
             
-        logger.info(f"Route planned with {len(self.waypoints)} waypoints")
+        # Route geometry is computed once at planning; the GPS loop only tracks progress along it
+        self.waypoints = plan.waypoints
+        self.route = plan.route
+        self.route_progress = RouteProgress(self.route)
+        logger.info(f"Route planned with {len(self.waypoints)} waypoints, {self.route.length:.0f}m")
         
         # Begin navigation
-        self.state.navigation_active = True
-        self.state.current_waypoint_index = 0
-        self.state.total_waypoints = len(self.waypoints)
+        self.update_state(navigation_active=True, destination_reached=False,
+                          current_waypoint_index=0, total_waypoints=len(self.waypoints),
+                          remaining_distance=self.route.length, along_track_distance=0.0,
+                          cross_track_error=0.0)
         
+        self._driving_through = False
         try:
             for i, waypoint in enumerate(self.waypoints):
                 logger.info(f"Navigating to waypoint {i+1}/{len(self.waypoints)}")
-                self.state.current_waypoint_index = i
+                self.update_state(current_waypoint_index=i)
                 
-                # Navigate to this waypoint
-                success = self.navigate_to_waypoint(waypoint)
+                # Navigate to this waypoint; only the last one stops the robot
+                success = self.navigate_to_waypoint(waypoint, i, through=i < len(self.waypoints) - 1)
+                if not self.running:
+                    logger.info("Navigation stopped")
+                    self.update_state(navigation_active=False)
+                    return False
                 if not success:
                     logger.warning(f"Failed to reach waypoint {i+1}")
                     # Continue to next waypoint anyway
             
             logger.info("Destination reached!")
-            self.state.destination_reached = True
-            self.state.navigation_active = False
+            self.update_state(destination_reached=True, navigation_active=False)
             return True
             
         except KeyboardInterrupt:
             logger.info("Navigation interrupted")
             self.motors.stop()
-            self.state.navigation_active = False
+            self.update_state(navigation_active=False)
             return False
             
         except Exception as e:
             logger.error(f"Navigation error: {e}")
             self.motors.stop()
-            self.state.navigation_active = False
+            self.update_state(navigation_active=False)
             return False
     
     def shutdown(self):
         """Cleanly shut down all system components"""
         logger.info("Shutting down navigation system")
         self.running = False
-        self.motors.stop()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        stop_request = self.motors.stop()
+        if stop_request is not None:
+            stop_request.wait(timeout=1)
         
         # Wait for threads to terminate
+        self._planner.shutdown(wait=False)
         self.gps_thread.join(timeout=1)
         self.sensor_thread.join(timeout=1)
         
+        logger.info(f"Control loop: {self.control_stats.summary()}")
+        logger.info(f"Arduino command latency: {self.arduino.get_stats()}")
+        self.arduino.close()
+        self.gps.close()
+        if self.obstacle_map is not None:
+            self.obstacle_map.close()
+        
         logger.info("Navigation system shutdown complete")
 
 
 # Utility functions
-def haversine_distance(lat1, lon1, lat2, lon2):
-    """Returns distance in meters between two lat/lon pairs"""
-    R = 6371000  # Earth radius in meters
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi/2.0)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(delta_lambda/2.0)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
-def calculate_bearing(lat1, lon1, lat2, lon2):
-    """Calculate angle in degrees between two lat/lon points (0° = North, 90° = East)"""
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_lambda = math.radians(lon2 - lon1)
-    
-    y = math.sin(delta_lambda) * math.cos(phi2)
-    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(delta_lambda)
-    
-    bearing = math.degrees(math.atan2(y, x))
-    return (bearing + 360) % 360
+def _same_destination(a, b) -> bool:
+    """Whether two destinations (addresses or lat/lon pairs) are the same place"""
+    if isinstance(a, str) or isinstance(b, str):
+        return a == b
+    return tuple(a) == tuple(b)
 
 
 class CampusTourRobot:
@@ -796,10 +1333,21 @@ class CampusTourRobot:
         self.audio_enabled = audio_enabled
         self.navigation = NavigationSystem(api_key)
         self.campus_landmarks = {}
+        self.landmark_index = LandmarkIndex()
+        self.proximity = ProximityIndex(self.navigation.projection)
+        self.geofences = GeofenceMonitor(self.proximity)
         self.current_tour = []
         self.tour_index = 0
+        self.current_destination = None
         self.load_landmarks()
         
+        # Landmarks passed on the way are announced from their own thread so TTS never stalls GPS updates
+        self._announcements = queue.Queue()
+        self.navigation.add_position_handler(self._on_position)
+        self.announcement_thread = threading.Thread(target=self._announcement_loop)
+        self.announcement_thread.daemon = True
+        self.announcement_thread.start()
+        
     def load_landmarks(self):
         """Load campus landmark information from file"""
         try:
@@ -815,13 +1363,26 @@ class CampusTourRobot:
         except Exception as e:
             logger.error(f"Failed to load landmarks: {e}")
             self.campus_landmarks = {}
+        
+        points = [info["coordinates"] for info in self.campus_landmarks.values() if info and info.get("coordinates")]
+        if points:
+            # Without a configured origin or campus graph the landmarks anchor the local frame
+            self.navigation.set_origin(*centroid(points), source="campus landmarks")
+        if self.proximity.projection is None:
+            self.proximity.projection = self.navigation.projection
+        self.landmark_index.build(self.campus_landmarks)
+        self.proximity.build(self.campus_landmarks)
     
-    def add_landmark(self, name, lat, lon, description):
+    def add_landmark(self, name, lat, lon, description, aliases=None):
         """Add a new campus landmark"""
         self.campus_landmarks[name] = {
             "coordinates": (lat, lon),
             "description": description
         }
+        if aliases:
+            self.campus_landmarks[name]["aliases"] = list(aliases)
+        self.landmark_index.add(name, aliases)
+        self.proximity.add(name, lat, lon)
         try:
             with open("campus_landmarks.json", 'w') as f:
                 json.dump(self.campus_landmarks, f, indent=4)
@@ -854,22 +1415,89 @@ class CampusTourRobot:
             print(announcement)
             self.text_to_speech(announcement)
     
-    def create_tour(self, landmark_names):
-        """Create a tour visiting multiple landmarks in sequence"""
+    def _on_position(self, state: RobotState):
+        """Check geofences for a new position and queue landmarks passed while navigating"""
+        for event in self.geofences.update(state.lat, state.lon, state.updated):
+            logger.debug(f"Geofence {event.kind}: {event.name} at {event.distance:.1f}m")
+            if event.kind == "enter" and state.navigation_active and event.name != self.current_destination:
+                lat, lon = self.campus_landmarks[event.name]["coordinates"]
+                bearing = calculate_bearing(state.lat, state.lon, lat, lon)
+                relative = wrap_degrees(bearing - state.heading)
+                side = "ahead" if abs(relative) < 30 else ("on our right" if relative > 0 else "on our left")
+                self._announcements.put((event.name, side))
+    
+    def _announcement_loop(self):
+        """Background thread that speaks queued pass-by announcements"""
+        while True:
+            name, side = self._announcements.get()
+            self.announce_passing(name, side)
+    
+    def announce_passing(self, landmark_name, side="nearby"):
+        """Point out a landmark the robot is passing on its way somewhere else"""
+        announcement = f"We are passing {landmark_name}, {side}."
+        description = self.campus_landmarks.get(landmark_name, {}).get("description")
+        if description:
+            announcement += f" {description}"
+        print(announcement)
+        self.text_to_speech(announcement)
+    
+    def nearby_landmarks(self, radius=50.0, k=None):
+        """Landmarks within radius meters of the robot as (name, distance), nearest first"""
+        state = self.navigation.state
+        if k is not None:
+            return self.proximity.nearest(state.lat, state.lon, k, max_distance=radius)
+        return self.proximity.within(state.lat, state.lon, radius)
+    
+    def resolve_landmark(self, spoken_name) -> Optional[str]:
+        """Map a possibly misheard landmark name to a known landmark key"""
+        if spoken_name in self.campus_landmarks:
+            return spoken_name
+        
+        match = self.landmark_index.best_match(spoken_name)
+        if match:
+            logger.info(f"Resolved '{spoken_name}' to landmark '{match}'")
+        return match
+    
+    def create_tour(self, landmark_names, optimize=False, keep_first=False, keep_last=False):
+        """Create a tour visiting multiple landmarks in sequence
+        optimize reorders the stops into the shortest drive from the robot's position;
+        keep_first and keep_last pin the first and last stops as listed
+        """
         self.current_tour = []
         
-        for name in landmark_names:
-            if name in self.campus_landmarks:
+        for spoken_name in landmark_names:
+            name = self.resolve_landmark(spoken_name)
+            if name:
                 self.current_tour.append({
                     "name": name,
                     "coordinates": self.campus_landmarks[name]["coordinates"]
                 })
             else:
-                logger.warning(f"Landmark not found: {name}")
+                logger.warning(f"Landmark not found: {spoken_name}")
+        
+        if optimize and len(self.current_tour) > 2:
+            self.optimize_tour_order(keep_first, keep_last)
         
         logger.info(f"Created tour with {len(self.current_tour)} landmarks")
         return len(self.current_tour) > 0
     
+    def optimize_tour_order(self, keep_first=False, keep_last=False):
+        """Reorder current_tour to shorten the drive, using campus path lengths where known"""
+        state = self.navigation.state
+        position = (state.lat, state.lon) if (state.lat, state.lon) != (0, 0) else None
+        self.navigation.update_route_costs()
+        plan = optimize_tour([stop["coordinates"] for stop in self.current_tour], position,
+                             keep_first=keep_first, keep_last=keep_last,
+                             graph=self.navigation.campus_graph,
+                             speed=self.navigation.config["max_speed"] * WHEEL_SPEED_PER_PWM)
+        self.current_tour = [self.current_tour[i] for i in plan.order]
+        if plan.saved_seconds >= 60:
+            announcement = (f"I have rearranged the stops to save about "
+                            f"{plan.saved_seconds / 60:.0f} minutes of walking.")
+            print(announcement)
+            self.text_to_speech(announcement)
+        return plan
+    
     def start_tour(self):
         """Start a campus tour visiting multiple landmarks"""
         if not self.current_tour:
@@ -878,6 +1506,11 @@ class CampusTourRobot:
             return False
         
         self.tour_index = 0
+        # The first leg is planned while the tour is announced
+        state = self.navigation.state
+        next_leg = None
+        if (state.lat, state.lon) != (0, 0):
+            next_leg = self.navigation.prefetch_route(self.current_tour[0]["coordinates"], (state.lat, state.lon))
         announcement = f"Starting campus tour with {len(self.current_tour)} stops."
         print(announcement)
         self.text_to_speech(announcement)
@@ -885,6 +1518,13 @@ class CampusTourRobot:
         try:
             while self.tour_index < len(self.current_tour):
                 current_stop = self.current_tour[self.tour_index]
+                prefetched = next_leg
+                
+                # Plan the following leg from this stop while driving here, announcing and dwelling
+                next_leg = None
+                if self.tour_index + 1 < len(self.current_tour):
+                    next_leg = self.navigation.prefetch_route(self.current_tour[self.tour_index + 1]["coordinates"],
+                                                              tuple(current_stop["coordinates"]))
                 
                 # Announce next destination
                 announcement = f"Next, we will visit {current_stop['name']}."
@@ -892,7 +1532,8 @@ class CampusTourRobot:
                 self.text_to_speech(announcement)
                 
                 # Navigate to the landmark
-                success = self.navigation.navigate_route(current_stop["coordinates"])
+                self.current_destination = current_stop["name"]
+                success = self.navigation.navigate_route(current_stop["coordinates"], prefetched)
                 
                 if success:
                     # Announce arrival
@@ -927,15 +1568,17 @@ class CampusTourRobot:
             self.text_to_speech(announcement)
             return False
     
-    def navigate_to_landmark(self, landmark_name):
+    def navigate_to_landmark(self, spoken_name):
         """Navigate to a specific landmark by name"""
-        if landmark_name in self.campus_landmarks:
+        landmark_name = self.resolve_landmark(spoken_name)
+        if landmark_name:
             coordinates = self.campus_landmarks[landmark_name]["coordinates"]
             
             announcement = f"Navigating to {landmark_name}."
             print(announcement)
             self.text_to_speech(announcement)
             
+            self.current_destination = landmark_name
             success = self.navigation.navigate_route(coordinates)
             
             if success:
@@ -947,7 +1590,7 @@ class CampusTourRobot:
                 self.text_to_speech(announcement)
                 return False
         else:
-            announcement = f"I don't have information about {landmark_name}."
+            announcement = f"I don't have information about {spoken_name}."
             print(announcement)
             self.text_to_speech(announcement)
             return False
@@ -975,9 +1618,11 @@ class CampusTourRobot:
     
     def navigate_to_address(self, address):
         """Navigate to an address using geocoding"""
-        announcement = f"Finding location for {address}."
-        print(announcement)
-        self.text_to_speech(announcement)
+        # Addresses resolved before come straight from the cache, without the lookup announcement
+        if not self.navigation.geocode_cache.get(address)[0]:
+            announcement = f"Finding location for {address}."
+            print(announcement)
+            self.text_to_speech(announcement)
         
         # Geocode the address
         coordinates = self.navigation.geocode_address(address)
@@ -993,8 +1638,9 @@ class CampusTourRobot:
     
     def get_current_location(self):
         """Get the current GPS location of the robot"""
-        lat = self.navigation.state.lat
-        lon = self.navigation.state.lon
+        state = self.navigation.state
+        lat = state.lat
+        lon = state.lon
         
         # Check if position is valid
         if lat == 0 and lon == 0:
@@ -1085,7 +1731,8 @@ def main():
                     tour_stops = [landmark_names[i] for i in indices if 0 <= i < len(landmark_names)]
                     
                     if tour_stops:
-                        robot.create_tour(tour_stops)
+                        optimize = input("Reorder stops for the shortest tour? (y/n): ").strip().lower() == 'y'
+                        robot.create_tour(tour_stops, optimize=optimize)
                         robot.start_tour()
                     else:
                         print("No valid landmarks selected.")
@@ -1095,6 +1742,7 @@ def main():
             elif choice == '5':
                 name = input("Enter landmark name: ")
                 description = input("Enter landmark description: ")
+                aliases = [a.strip() for a in input("Enter other names for it, comma separated (optional): ").split(',') if a.strip()]
                 
                 # Get coordinates (either directly or current location)
                 coord_choice = input("Use current location (C) or enter coordinates (E)? ").upper()
@@ -1103,7 +1751,7 @@ def main():
                     current_loc = robot.get_current_location()
                     if current_loc:
                         lat, lon = current_loc
-                        robot.add_landmark(name, lat, lon, description)
+                        robot.add_landmark(name, lat, lon, description, aliases)
                         print(f"Added landmark '{name}' at current location ({lat}, {lon})")
                     else:
                         print("Couldn't get current location. Try again or enter coordinates manually.")
@@ -1111,7 +1759,7 @@ def main():
                     try:
                         lat = float(input("Enter latitude: "))
                         lon = float(input("Enter longitude: "))
-                        robot.add_landmark(name, lat, lon, description)
+                        robot.add_landmark(name, lat, lon, description, aliases)
                         print(f"Added landmark '{name}' at ({lat}, {lon})")
                     except ValueError:
                         print("Invalid coordinates. Landmark not added.")
@@ -0,0 +1,201 @@
+# nmea.py
+
+import time
+from typing import Dict, Optional
+
+# Talker IDs accepted for navigation sentences: GPS, multi-GNSS, GLONASS,
+# Galileo, BeiDou (both IDs) and QZSS
+TALKERS = {"GP", "GN", "GL", "GA", "GB", "BD", "GQ"}
+KNOTS_TO_MS = 0.514444
+KMH_TO_MS = 1 / 3.6
+
+
+class GPSFix:
+    """Position fix assembled from the NMEA sentences of one receiver epoch"""
+    __slots__ = ("t", "utc", "lat", "lon", "valid", "fix_quality", "fix_type", "satellites",
+                 "hdop", "pdop", "vdop", "h_accuracy", "altitude", "speed", "course", "talker")
+
+    def __init__(self):
+        self.t = 0.0  # time.monotonic() when the sentence was received
+        self.utc = ""  # hhmmss.ss from the receiver
+        self.lat: Optional[float] = None
+        self.lon: Optional[float] = None
+        self.valid = False
+        self.fix_quality = 0  # GGA: 0 = none, 1 = GPS, 2 = DGPS, 4/5 = RTK
+        self.fix_type = 1  # GSA: 1 = none, 2 = 2D, 3 = 3D
+        self.satellites = 0
+        self.hdop: Optional[float] = None
+        self.pdop: Optional[float] = None
+        self.vdop: Optional[float] = None
+        self.h_accuracy: Optional[float] = None  # meters, 1-sigma (UBX only; NMEA gives HDOP)
+        self.altitude: Optional[float] = None  # meters above mean sea level
+        self.speed: Optional[float] = None  # m/s over ground
+        self.course: Optional[float] = None  # degrees true, 0 = North
+        self.talker = ""
+
+    def copy(self) -> "GPSFix":
+        fix = GPSFix.__new__(GPSFix)
+        for name in GPSFix.__slots__:
+            setattr(fix, name, getattr(self, name))
+        return fix
+
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in GPSFix.__slots__}
+
+    def __repr__(self):
+        return (f"GPSFix(lat={self.lat}, lon={self.lon}, valid={self.valid}, quality={self.fix_quality}, "
+                f"sats={self.satellites}, hdop={self.hdop}, speed={self.speed}, course={self.course})")
+
+
+def checksum_ok(line: str) -> bool:
+    """Validate the *hh XOR checksum of a sentence (sentences without one are rejected)"""
+    star = line.rfind("*")
+    if not line.startswith("$") or star < 0 or len(line) < star + 3:
+        return False
+    calculated = 0
+    for ch in line[1:star]:
+        calculated ^= ord(ch)
+    try:
+        return calculated == int(line[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+
+
+def _coordinate(value: str, hemisphere: str, degree_digits: int) -> Optional[float]:
+    """Convert ddmm.mmmm / dddmm.mmmm plus hemisphere to signed decimal degrees"""
+    if not value:
+        return None
+    degrees = float(value[:degree_digits]) + float(value[degree_digits:]) / 60
+    return -degrees if hemisphere in ("S", "W") else degrees
+
+
+def _float(value: str) -> Optional[float]:
+    return float(value) if value else None
+
+
+class NMEAParser:
+    """Stateful parser for RMC, GGA, GSA and VTG sentences
+
+    Each sentence updates the fix being assembled. parse_line() returns a copy
+    of it whenever a position sentence (RMC or GGA) arrives, so callers get
+    one record per sentence carrying the latest quality, speed and course.
+    """
+
+    def __init__(self):
+        self.fix = GPSFix()
+        self.sentences = 0
+        self.checksum_errors = 0
+        self.parse_errors = 0
+        self.ignored = 0
+
+    def parse_line(self, line: str, t: Optional[float] = None) -> Optional[GPSFix]:
+        line = line.strip()
+        if not line.startswith("$"):
+            return None
+        if not checksum_ok(line):
+            self.checksum_errors += 1
+            return None
+
+        talker = line[1:3]
+        kind = line[3:6]
+        if talker not in TALKERS:
+            self.ignored += 1
+            return None
+
+        fields = line[7:line.rfind("*")].split(",")
+        self.sentences += 1
+        try:
+            if kind == "RMC":
+                return self._rmc(fields, talker, t)
+            if kind == "GGA":
+                return self._gga(fields, talker, t)
+            if kind == "GSA":
+                self._gsa(fields)
+            elif kind == "VTG":
+                self._vtg(fields)
+            else:
+                self.ignored += 1
+        except (ValueError, IndexError):
+            self.parse_errors += 1
+        return None
+
+    def _publish(self, talker: str, t: Optional[float]) -> GPSFix:
+        fix = self.fix
+        fix.talker = talker
+        fix.t = time.monotonic() if t is None else t
+        return fix.copy()
+
+    def _rmc(self, f, talker, t) -> GPSFix:
+        # time, status, lat, N/S, lon, E/W, speed (kn), course, date, ...
+        fix = self.fix
+        fix.utc = f[0]
+        fix.valid = f[1] == "A"
+        if fix.valid:
+            fix.lat = _coordinate(f[2], f[3], 2)
+            fix.lon = _coordinate(f[4], f[5], 3)
+            speed = _float(f[6])
+            fix.speed = speed * KNOTS_TO_MS if speed is not None else None
+            fix.course = _float(f[7])
+        return self._publish(talker, t)
+
+    def _gga(self, f, talker, t) -> GPSFix:
+        # time, lat, N/S, lon, E/W, quality, satellites, hdop, altitude, M, ...
+        fix = self.fix
+        fix.utc = f[0]
+        fix.fix_quality = int(f[5] or 0)
+        fix.satellites = int(f[6] or 0)
+        fix.hdop = _float(f[7])
+        fix.altitude = _float(f[8])
+        if fix.fix_quality > 0:
+            fix.lat = _coordinate(f[1], f[2], 2)
+            fix.lon = _coordinate(f[3], f[4], 3)
+        fix.valid = fix.fix_quality > 0
+        return self._publish(talker, t)
+
+    def _gsa(self, f):
+        # mode, fix type, 12 satellite ids, pdop, hdop, vdop[, system id]
+        self.fix.fix_type = int(f[1] or 1)
+        self.fix.pdop = _float(f[14])
+        self.fix.hdop = _float(f[15])
+        self.fix.vdop = _float(f[16])
+
+    def _vtg(self, f):
+        # course true, T, course magnetic, M, speed kn, N, speed km/h, K[, mode]
+        course = _float(f[0])
+        if course is not None:
+            self.fix.course = course
+        speed = _float(f[6])
+        if speed is not None:
+            self.fix.speed = speed * KMH_TO_MS
+
+
+def with_checksum(body: str) -> str:
+    checksum = 0
+    for ch in body:
+        checksum ^= ord(ch)
+    return f"${body}*{checksum:02X}"
+
+
+def benchmark(epochs: int = 5000):
+    """Measure parsing cost per sentence on a synthetic 4-sentence epoch"""
+    epoch = [
+        with_checksum("GNRMC,123519.00,A,3016.5120,N,07802.6340,E,0.85,54.7,191026,,,A"),
+        with_checksum("GNVTG,54.7,T,,M,0.85,N,1.57,K,A"),
+        with_checksum("GNGGA,123519.00,3016.5120,N,07802.6340,E,1,09,0.9,545.4,M,46.9,M,,"),
+        with_checksum("GNGSA,A,3,04,05,09,12,24,,,,,,,,1.8,0.9,1.5"),
+    ]
+    parser = NMEAParser()
+    lines = epoch * epochs
+    start = time.perf_counter()
+    fixes = 0
+    for line in lines:
+        if parser.parse_line(line) is not None:
+            fixes += 1
+    elapsed = time.perf_counter() - start
+    print(f"{len(lines)} sentences, {fixes} fixes, {1e6 * elapsed / len(lines):.2f} us/sentence, "
+          f"checksum errors {parser.checksum_errors}, parse errors {parser.parse_errors}")
+    print(parser.fix)
+
+
+if __name__ == "__main__":
+    benchmark()
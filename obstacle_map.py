@@ -0,0 +1,330 @@
+# obstacle_map.py
+
+import os
+import json
+import math
+import time
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import LocalProjection, local_projection
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+OBSTACLE_MAP_FILE = "obstacle_map.npy"  # metadata goes next to it with a .json suffix
+MAP_CELL_SIZE = 0.5  # meters per cell
+MAP_SIZE = 4096  # cells per side, centred on the projection's origin (a 2 km square, 16 MB at 0.5 m)
+HIT_EVIDENCE = 40  # added to a cell for an echo from it; cells saturate at 255
+REHIT_INTERVAL = 5.0  # seconds before the same cell gains evidence again, so staring at it counts once
+FREE_EVIDENCE = 4  # taken from each cell a reading saw through
+MAP_HIT_RANGE = 200.0  # cm, farther echoes are too vague about direction to place in a cell
+CLEAR_RANGE = 200.0  # cm along a reading's axis that may be cleared
+OCCUPIED_EVIDENCE = 80  # cells at or above this (two echoes or more) are obstacles
+OBSTACLE_HALF_LIFE = 2 * 24 * 3600  # seconds for remembered evidence to halve
+DECAY_INTERVAL = 3600.0  # seconds between decay passes
+FLUSH_INTERVAL = 60.0  # seconds between writes of changed cells to disk
+BLOCKED_EDGE_PENALTY = 200.0  # meters added to a walkway edge whose centreline is fully blocked
+OFF_MAP_WARNING_INTERVAL = 60.0  # seconds between warnings that the robot is outside the grid
+
+
+class ObstacleMap:
+    """Evidence grid of where the robot has met obstacles, kept on disk between runs
+
+    One byte per cell in campus-plane coordinates, memory-mapped so only
+    the pages the robot visits are read or written. Echoes add evidence to
+    the cell they came from and readings that see through a cell take a
+    little away, so a bench that is always there builds up while a crowd
+    that has moved on fades. Everything also decays with a half-life of
+    OBSTACLE_HALF_LIFE, applied in hourly passes over the touched area.
+    """
+
+    def __init__(self, path: str, projection: LocalProjection, cell_size: float = MAP_CELL_SIZE,
+                 size: int = MAP_SIZE):
+        self.path = path
+        self.meta_path = os.path.splitext(path)[0] + ".json"
+        self.projection = projection
+        self.cell_size = cell_size
+        self.size = size
+        self.decayed_at = time.time()
+        self.bounds: Optional[Tuple[int, int, int, int]] = None  # touched rows/cols, inclusive
+        self.updates = 0  # readings taken in since opening
+        self._flushed_at = time.monotonic()
+        self._dirty = False
+        self._recent_hits: Dict[Tuple[int, int], float] = {}  # cell -> time.time() of its last evidence
+        self._off_map_warned = -math.inf  # time.monotonic() of the last off-map warning
+        self.grid = self._open()
+        self.decay()
+
+    def _meta(self) -> dict:
+        return {"origin": [self.projection.origin_lat, self.projection.origin_lon],
+                "cell_size": self.cell_size, "size": self.size}
+
+    def _open(self) -> np.ndarray:
+        """Memory-map the grid file, starting a new one if it is missing or for another frame"""
+        try:
+            if os.path.exists(self.path) and os.path.exists(self.meta_path):
+                with open(self.meta_path, 'r') as f:
+                    meta = json.load(f)
+                if all(meta.get(key) == value for key, value in self._meta().items()):
+                    grid = np.load(self.path, mmap_mode="r+")
+                    self.decayed_at = meta.get("decayed_at", self.decayed_at)
+                    self.bounds = tuple(meta["bounds"]) if meta.get("bounds") else None
+                    logger.info(f"Loaded obstacle map {self.path}")
+                    return grid
+                logger.warning(f"Obstacle map {self.path} is for another origin or resolution, starting afresh")
+            grid = np.lib.format.open_memmap(self.path, mode="w+", dtype=np.uint8, shape=(self.size, self.size))
+            self._write_meta()
+            return grid
+        except Exception as e:
+            # Still useful for this run without persistence
+            logger.error(f"Failed to open obstacle map {self.path}: {e}")
+            return np.zeros((self.size, self.size), dtype=np.uint8)
+
+    def _write_meta(self):
+        meta = dict(self._meta(), decayed_at=self.decayed_at, bounds=list(self.bounds) if self.bounds else None)
+        with open(self.meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    def cells(self, east, north) -> Tuple[np.ndarray, np.ndarray]:
+        """(row, col) indices of local positions; may fall outside the grid"""
+        half = self.size // 2
+        col = np.floor(np.asarray(east) / self.cell_size).astype(np.int64) + half
+        row = np.floor(np.asarray(north) / self.cell_size).astype(np.int64) + half
+        return row, col
+
+    def _inside(self, row: np.ndarray, col: np.ndarray) -> np.ndarray:
+        return (row >= 0) & (row < self.size) & (col >= 0) & (col < self.size)
+
+    def evidence_at(self, east, north) -> np.ndarray:
+        """Evidence (0-255) at local positions; 0 off the map"""
+        row, col = self.cells(east, north)
+        inside = self._inside(row, col)
+        values = np.zeros(row.shape, dtype=np.uint8)
+        values[inside] = self.grid[row[inside], col[inside]]
+        return values
+
+    def observe(self, east: float, north: float, readings: Sequence[Tuple[float, float]],
+                now: Optional[float] = None):
+        """Take in range readings as (bearing in degrees, distance in cm) from a local position
+        now is wall-clock time (time.time()), which decay and re-hit spacing run on
+        """
+        if not readings:
+            return
+        if not self._inside(*self.cells(east, north)):
+            if time.monotonic() - self._off_map_warned >= OFF_MAP_WARNING_INTERVAL:
+                self._off_map_warned = time.monotonic()
+                logger.warning(f"Robot at ({east:.0f}, {north:.0f}) m is outside the obstacle map around "
+                               f"({self.projection.origin_lat:.5f}, {self.projection.origin_lon:.5f}); "
+                               f"obstacles there are not remembered")
+            return
+        now = time.time() if now is None else now
+        bearing = np.radians([b for b, _ in readings])
+        distance = np.array([d for _, d in readings], dtype=float)
+        dx, dy = np.sin(bearing), np.cos(bearing)
+
+        # Cells each reading saw through, stopping a cell short of an echo
+        reach = np.minimum(distance - 100.0 * self.cell_size, CLEAR_RANGE) / 100.0
+        steps = np.maximum(0, np.floor(reach / (self.cell_size / 2)).astype(int))
+        if steps.sum():
+            ray = np.repeat(np.arange(len(readings)), steps)
+            along = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) * (self.cell_size / 2)
+            row, col = self.cells(east + along * dx[ray], north + along * dy[ray])
+            self._add(row, col, -FREE_EVIDENCE)
+
+        # Cells the echoes came from, each at most once per REHIT_INTERVAL
+        hit = distance < MAP_HIT_RANGE
+        if hit.any():
+            row, col = self.cells(east + distance[hit] / 100.0 * dx[hit], north + distance[hit] / 100.0 * dy[hit])
+            fresh = []
+            for i, cell in enumerate(zip(row.tolist(), col.tolist())):
+                if now - self._recent_hits.get(cell, -math.inf) >= REHIT_INTERVAL:
+                    self._recent_hits[cell] = now
+                    fresh.append(i)
+            if len(self._recent_hits) > 4096:
+                self._recent_hits = {cell: seen for cell, seen in self._recent_hits.items()
+                                     if now - seen < REHIT_INTERVAL}
+            self._add(row[fresh], col[fresh], HIT_EVIDENCE)
+
+        self.updates += len(readings)
+        if now - self.decayed_at >= DECAY_INTERVAL:
+            self.decay(now)
+        if time.monotonic() - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def _add(self, row: np.ndarray, col: np.ndarray, amount: int):
+        inside = self._inside(row, col)
+        row, col = row[inside], col[inside]
+        if not len(row):
+            return
+        values = self.grid[row, col].astype(np.int16) + amount
+        self.grid[row, col] = np.clip(values, 0, 255).astype(np.uint8)
+        if amount > 0:
+            box = (int(row.min()), int(row.max()), int(col.min()), int(col.max()))
+            if self.bounds is not None:
+                r0, r1, c0, c1 = self.bounds
+                box = (min(r0, box[0]), max(r1, box[1]), min(c0, box[2]), max(c1, box[3]))
+            self.bounds = box
+        self._dirty = True
+
+    def decay(self, now: Optional[float] = None):
+        """Fade evidence for the time since the last pass; only the touched area is visited"""
+        now = time.time() if now is None else now
+        elapsed = now - self.decayed_at
+        if elapsed < DECAY_INTERVAL:
+            return
+        self.decayed_at = now
+        if self.bounds is None:
+            return
+        r0, r1, c0, c1 = self.bounds
+        window = self.grid[r0:r1 + 1, c0:c1 + 1]
+        factor = 0.5 ** (elapsed / OBSTACLE_HALF_LIFE)
+        # Flooring takes at least one off every nonzero cell, so single echoes do not linger for weeks
+        window[...] = np.floor(window * factor).astype(np.uint8)
+        if not window.any():
+            self.bounds = None
+        self._dirty = True
+        logger.info(f"Obstacle map decayed by {1 - factor:.1%} after {elapsed / 3600:.1f} h")
+
+    def _occupied_in(self, r0: int, r1: int, c0: int, c1: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Centres (n, 2 local meters) and evidence of occupied cells in a block of rows and columns"""
+        r0, r1 = max(r0, 0), min(r1, self.size - 1)
+        c0, c1 = max(c0, 0), min(c1, self.size - 1)
+        if r0 > r1 or c0 > c1:
+            return np.empty((0, 2)), np.empty(0, dtype=np.uint8)
+        window = self.grid[r0:r1 + 1, c0:c1 + 1]
+        rows, cols = np.nonzero(window >= OCCUPIED_EVIDENCE)
+        half = self.size // 2
+        xy = np.column_stack(((cols + c0 - half + 0.5) * self.cell_size, (rows + r0 - half + 0.5) * self.cell_size))
+        return xy, window[rows, cols]
+
+    def occupied_near(self, east: float, north: float, radius: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Centres (n, 2 local meters) and strength (0-1) of occupied cells within radius meters"""
+        row, col = self.cells(np.array([east - radius, east + radius]), np.array([north - radius, north + radius]))
+        xy, evidence = self._occupied_in(int(row[0]), int(row[1]), int(col[0]), int(col[1]))
+        near = np.hypot(xy[:, 0] - east, xy[:, 1] - north) <= radius
+        return xy[near], evidence[near] / 255.0
+
+    def occupied_cells(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Centres (n, 2 local meters) and evidence of every occupied cell"""
+        if self.bounds is None:
+            return np.empty((0, 2)), np.empty(0, dtype=np.uint8)
+        return self._occupied_in(*self.bounds)
+
+    def edge_penalties(self, graph) -> np.ndarray:
+        """Extra meters for each CampusGraph edge (CSR order) from obstacles on its centreline
+
+        An edge is penalized for every occupied cell its centreline passes
+        through, by up to BLOCKED_EDGE_PENALTY for the strongest of them.
+        Only occupied cells are tested, so the cost follows how much has
+        been seen rather than the size of the graph's area.
+        """
+        penalties = np.zeros(len(graph.indices), dtype=np.float32)
+        cells, evidence = self.occupied_cells()
+        if not len(cells) or not len(penalties):
+            return penalties
+        sources = np.repeat(np.arange(len(graph)), np.diff(graph.indptr))
+        start, end = graph.xy[sources], graph.xy[graph.indices]
+        if graph.projection is not self.projection:
+            # Graphs built around another origin: go through lat/lon into this map's frame
+            start = self.projection.points_to_local(graph.projection.points_to_geodetic(start))
+            end = self.projection.points_to_local(graph.projection.points_to_geodetic(end))
+
+        # Distance from each cell centre to each edge; within half a cell diagonal the line crosses the cell
+        reach = self.cell_size / math.sqrt(2)
+        lo = np.minimum(start, end) - reach
+        hi = np.maximum(start, end) + reach
+        for i in range(len(cells)):
+            x, y = cells[i]
+            candidates = np.nonzero((lo[:, 0] <= x) & (x <= hi[:, 0]) & (lo[:, 1] <= y) & (y <= hi[:, 1]))[0]
+            if not len(candidates):
+                continue
+            a, b = start[candidates], end[candidates]
+            d = b - a
+            t = np.clip(((x - a[:, 0]) * d[:, 0] + (y - a[:, 1]) * d[:, 1]) /
+                        np.maximum((d * d).sum(axis=1), 1e-9), 0.0, 1.0)
+            miss = np.hypot(a[:, 0] + t * d[:, 0] - x, a[:, 1] + t * d[:, 1] - y)
+            crossed = candidates[miss <= reach]
+            penalties[crossed] = np.maximum(penalties[crossed], BLOCKED_EDGE_PENALTY * evidence[i] / 255.0)
+        return penalties
+
+    def flush(self):
+        """Write changed cells and metadata to disk"""
+        self._flushed_at = time.monotonic()
+        if not self._dirty:
+            return
+        try:
+            if isinstance(self.grid, np.memmap):
+                self.grid.flush()
+            self._write_meta()
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"Failed to save obstacle map: {e}")
+
+    def close(self):
+        self.flush()
+
+
+def benchmark(edges_per_side: int = 30, spacing: float = 30.0, seconds: float = 600.0):
+    """Cost of map updates and edge penalties, and how a blocked walkway changes a route"""
+    import tempfile
+    from campus_graph import CampusGraph
+
+    with tempfile.TemporaryDirectory() as directory:
+        obstacle_map = ObstacleMap(os.path.join(directory, "map.npy"), local_projection(12.9716, 77.5946))
+        # Three ultrasonic readings at 20 Hz while driving along a walkway past a barrier
+        rng = np.random.default_rng(3)
+        ticks = int(seconds * 20)
+        start = time.perf_counter()
+        for i in range(ticks):
+            east, north = 0.05 * (i % 2000), 10.0
+            readings = [(90.0 + offset, 300.0 if rng.random() < 0.7 else rng.uniform(30, 250))
+                        for offset in (-45.0, 0.0, 45.0)]
+            obstacle_map.observe(east, north, readings)
+        print(f"observe: {1e6 * (time.perf_counter() - start) / ticks:.0f} us per tick of three readings")
+
+        # A grid of walkways with one edge that keeps being found blocked
+        n = edges_per_side
+        xy = np.array([(i * spacing, j * spacing) for j in range(n) for i in range(n)], dtype=float)
+        neighbours = [[] for _ in range(n * n)]
+        for j in range(n):
+            for i in range(n):
+                if i + 1 < n:
+                    neighbours[j * n + i].append(j * n + i + 1)
+                    neighbours[j * n + i + 1].append(j * n + i)
+                if j + 1 < n:
+                    neighbours[j * n + i].append((j + 1) * n + i)
+                    neighbours[(j + 1) * n + i].append(j * n + i)
+        indptr = np.cumsum([0] + [len(v) for v in neighbours])
+        indices = np.array([v for row in neighbours for v in row])
+        sources = np.repeat(np.arange(n * n), np.diff(indptr))
+        graph = CampusGraph(xy, indptr, indices, np.hypot(*(xy[indices] - xy[sources]).T), obstacle_map.projection)
+
+        source, target = 0, n - 1
+        before = graph.astar(source, target)
+        for visit in range(3):
+            # A barrier on the bottom walkway, met on three tours ten minutes apart
+            obstacle_map.observe(4 * spacing + 10.0, -1.0, [(0.0, 100.0)], now=time.time() + 600 * visit)
+        start = time.perf_counter()
+        penalties = obstacle_map.edge_penalties(graph)
+        elapsed = time.perf_counter() - start
+        graph.set_edge_penalties(penalties)
+        after = graph.astar(source, target)
+        print(f"edge_penalties for {graph.edges} walkways: {1000 * elapsed:.1f} ms, "
+              f"{int((penalties > 0).sum()) // 2} penalized")
+        print(f"route along the bottom row: {graph.path_length(before):.0f} m before, "
+              f"{graph.path_length(after):.0f} m after the barrier was seen three times")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            obstacle_map.occupied_near(4 * spacing + 10.0, -0.5, 1.5)
+        print(f"occupied_near (1.5 m): {(time.perf_counter() - start):.3f} ms per query")
+        obstacle_map.close()
+        print(f"map file on disk: {os.path.getsize(obstacle_map.path) / 1e6:.1f} MB, "
+              f"{os.stat(obstacle_map.path).st_blocks * 512 / 1e6:.2f} MB allocated")
+
+
+if __name__ == "__main__":
+    benchmark()
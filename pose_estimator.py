@@ -0,0 +1,339 @@
+# pose_estimator.py
+
+import math
+import time
+import random
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from geodesy import LocalProjection
+from nmea import GPSFix
+
+# Motion model (matches the PWM values arduino.ino writes for each command)
+WHEEL_SPEED_PER_PWM = 0.004  # m/s of wheel speed per PWM step (~1 m/s at full duty)
+TRACK_WIDTH = 0.30  # meters between the left and right wheels
+TURN_PWM = 100  # wheel PWM used by L/R turns
+GENTLE_TURN_INNER_PWM = 50  # inner wheel PWM of a gentle (radius > 0) turn
+SPEED_TIME_CONSTANT = 0.4  # seconds for the robot to reach a commanded speed
+
+# Process noise, per sqrt(second)
+POSITION_NOISE = 0.3  # m, wheel slip and unmodelled motion
+HEADING_NOISE = math.radians(10)  # rad, turn rate is only known roughly
+SPEED_NOISE = 0.2  # m/s
+
+# Measurement noise (1-sigma)
+GPS_UERE = 3.0  # m, user range error multiplied by HDOP when the fix has no accuracy estimate
+DEFAULT_GPS_SIGMA = 5.0  # m, used when the fix has neither accuracy nor HDOP
+GPS_SPEED_SIGMA = 0.15  # m/s
+GPS_COURSE_SIGMA = math.radians(8)  # rad, at MIN_COURSE_SPEED; shrinks as speed rises
+MAGNETOMETER_SIGMA = math.radians(8)  # rad, includes local magnetic disturbances
+MIN_COURSE_SPEED = 0.3  # m/s, below this the receiver's course over ground is noise
+
+# Innovation gates (chi-square, 99.9%) and how many rejections in a row force acceptance
+GATE_1D = 10.83
+GATE_2D = 13.82
+MAX_REJECTIONS = 5
+
+# State vector indices
+EAST, NORTH, HEADING, SPEED = range(4)
+
+
+@dataclass(frozen=True)
+class Pose:
+    """Fused pose at time t (time.monotonic())"""
+    t: float
+    lat: float
+    lon: float
+    heading: float  # degrees, 0 = North, 90 = East
+    speed: float  # m/s
+    position_sigma: float  # meters, 1-sigma radius
+    heading_sigma: float  # degrees, 1-sigma
+
+
+def wheel_pwm(cmd: str, args: tuple) -> Tuple[int, int]:
+    """Signed (left, right) wheel PWM that a motor command produces"""
+    value = args[0] if args else 0
+    if cmd == 'F':
+        return value, value
+    if cmd == 'B':
+        return -value, -value
+    if cmd == 'L':
+        return (-TURN_PWM, TURN_PWM) if value == 0 else (GENTLE_TURN_INNER_PWM, TURN_PWM)
+    if cmd == 'R':
+        return (TURN_PWM, -TURN_PWM) if value == 0 else (TURN_PWM, GENTLE_TURN_INNER_PWM)
+    if cmd == 'W':
+        return value, args[1] if len(args) > 1 else value
+    if cmd == 'H':
+        speed = args[1] if len(args) > 1 else 100
+        return speed, speed
+    return 0, 0
+
+
+def commanded_motion(left_pwm: int, right_pwm: int) -> Tuple[float, float]:
+    """Differential-drive speed (m/s) and turn rate (rad/s, clockwise positive)"""
+    left = left_pwm * WHEEL_SPEED_PER_PWM
+    right = right_pwm * WHEEL_SPEED_PER_PWM
+    return (left + right) / 2, (left - right) / TRACK_WIDTH
+
+
+def _wrap(angle: float) -> float:
+    """Wrap an angle in radians to [-pi, pi)"""
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class PoseEstimator:
+    """Extended Kalman filter fusing GPS, magnetometer and commanded motion
+
+    The state is [east, north, heading, speed] in a local metric frame
+    anchored at the first GPS fix. predict() dead-reckons from the last motor
+    command; GPS position, speed and course and the magnetometer heading
+    correct it, each weighted by its uncertainty. Measurements whose
+    innovation fails a chi-square gate are dropped (multipath jumps,
+    magnetic disturbances), unless MAX_REJECTIONS arrive in a row, in which
+    case the filter trusts the sensor again. A GPS fix with the UTC time of
+    the previous one is the same receiver epoch and is fused only once.
+
+    All methods are thread-safe; the GPS and sensor threads update it and
+    the control loop reads pose() from its own thread.
+    """
+
+    def __init__(self):
+        self.x = np.zeros(4)
+        self.P = np.diag([1e6, 1e6, math.pi ** 2, 1.0])
+        self.t: Optional[float] = None
+        self.projection: Optional[LocalProjection] = None
+        self.heading_known = False
+        self.command = (0, 0)  # wheel PWM of the last motor command
+        self.rejections = {"gps": 0, "magnetometer": 0}
+        self.rejected = 0
+        self._consecutive = {"gps": 0, "magnetometer": 0}
+        self._gps_epoch = ""  # utc of the last fused fix
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self.projection is not None
+
+    def set_command(self, cmd: str, args: tuple = (), t: Optional[float] = None):
+        """Switch the motion model to a new motor command"""
+        with self._lock:
+            self._predict(time.monotonic() if t is None else t)
+            self.command = wheel_pwm(cmd, args)
+
+    def update_gps(self, fix: GPSFix):
+        """Correct with a GPS fix: position always, speed and course when present"""
+        if not fix.valid or fix.lat is None:
+            return
+        with self._lock:
+            if fix.utc and fix.utc == self._gps_epoch:
+                return
+            self._gps_epoch = fix.utc
+            if self.projection is None:
+                self._initialize(fix)
+                return
+            self._predict(fix.t)
+            sigma = self._gps_sigma(fix)
+            z = np.array(self.projection.to_local(fix.lat, fix.lon))
+            H = np.zeros((2, 4))
+            H[0, EAST] = H[1, NORTH] = 1.0
+            self._update(z, H, np.eye(2) * sigma ** 2, GATE_2D, "gps")
+
+            if fix.speed is not None:
+                self._update_scalar(fix.speed, SPEED, GPS_SPEED_SIGMA ** 2)
+            if fix.course is not None and fix.speed is not None and fix.speed > MIN_COURSE_SPEED:
+                sigma = GPS_COURSE_SIGMA * MIN_COURSE_SPEED / fix.speed
+                self._update_heading(math.radians(fix.course), sigma ** 2, None)
+
+    def update_heading(self, heading: float, t: Optional[float] = None):
+        """Correct with a magnetometer heading in degrees"""
+        with self._lock:
+            self._predict(time.monotonic() if t is None else t)
+            self._update_heading(math.radians(heading), MAGNETOMETER_SIGMA ** 2, "magnetometer")
+
+    def pose(self, t: Optional[float] = None) -> Optional[Pose]:
+        """Pose predicted to time t (now by default), None before the first fix"""
+        with self._lock:
+            if self.projection is None:
+                return None
+            self._predict(time.monotonic() if t is None else t)
+            lat, lon = self.projection.to_geodetic(float(self.x[EAST]), float(self.x[NORTH]))
+            return Pose(
+                t=self.t,
+                lat=lat,
+                lon=lon,
+                heading=math.degrees(float(self.x[HEADING])) % 360,
+                speed=float(self.x[SPEED]),
+                position_sigma=math.sqrt(self.P[EAST, EAST] + self.P[NORTH, NORTH]),
+                heading_sigma=math.degrees(math.sqrt(self.P[HEADING, HEADING])),
+            )
+
+    def position_uncertainty(self, t: Optional[float] = None) -> float:
+        """1-sigma position error in meters (infinite before the first fix)"""
+        pose = self.pose(t)
+        return pose.position_sigma if pose is not None else float("inf")
+
+    def _initialize(self, fix: GPSFix):
+        self.projection = LocalProjection(fix.lat, fix.lon)
+        sigma = self._gps_sigma(fix)
+        self.x[EAST] = self.x[NORTH] = 0.0
+        self.P[EAST, :] = self.P[:, EAST] = 0.0
+        self.P[NORTH, :] = self.P[:, NORTH] = 0.0
+        self.P[EAST, EAST] = self.P[NORTH, NORTH] = sigma ** 2
+        if fix.speed is not None:
+            self.x[SPEED] = fix.speed
+        if self.t is None or fix.t > self.t:
+            self.t = fix.t
+
+    @staticmethod
+    def _gps_sigma(fix: GPSFix) -> float:
+        # The per-axis error is roughly the reported 1-sigma radius over sqrt(2)
+        if fix.h_accuracy:
+            return max(fix.h_accuracy / math.sqrt(2), 0.5)
+        if fix.hdop:
+            return max(fix.hdop * GPS_UERE / math.sqrt(2), 0.5)
+        return DEFAULT_GPS_SIGMA
+
+    def _predict(self, t: float):
+        if self.t is None:
+            self.t = t
+            return
+        dt = t - self.t
+        if dt <= 0:
+            return  # late measurement: apply it at the current state time
+        self.t = t
+
+        v_cmd, turn_rate = commanded_motion(*self.command)
+        east, north, heading, speed = self.x
+        decay = math.exp(-dt / SPEED_TIME_CONSTANT)
+        sin_h, cos_h = math.sin(heading), math.cos(heading)
+
+        self.x[EAST] = east + speed * sin_h * dt
+        self.x[NORTH] = north + speed * cos_h * dt
+        self.x[HEADING] = _wrap(heading + turn_rate * dt)
+        self.x[SPEED] = v_cmd + (speed - v_cmd) * decay
+
+        F = np.eye(4)
+        F[EAST, HEADING] = speed * cos_h * dt
+        F[EAST, SPEED] = sin_h * dt
+        F[NORTH, HEADING] = -speed * sin_h * dt
+        F[NORTH, SPEED] = cos_h * dt
+        F[SPEED, SPEED] = decay
+        # Turning adds heading noise in proportion to how fast we are told to turn
+        heading_noise = HEADING_NOISE ** 2 * (1 + abs(turn_rate))
+        Q = np.diag([POSITION_NOISE ** 2, POSITION_NOISE ** 2, heading_noise, SPEED_NOISE ** 2]) * dt
+        self.P = F @ self.P @ F.T + Q
+
+    def _update_heading(self, heading: float, variance: float, source: Optional[str]):
+        if not self.heading_known:
+            # First heading: adopt it rather than averaging with an arbitrary prior
+            self.x[HEADING] = _wrap(heading)
+            self.P[HEADING, :] = self.P[:, HEADING] = 0.0
+            self.P[HEADING, HEADING] = variance
+            self.heading_known = True
+            return
+        H = np.zeros((1, 4))
+        H[0, HEADING] = 1.0
+        self._update(np.array([heading]), H, np.array([[variance]]), GATE_1D, source, angle=True)
+
+    def _update_scalar(self, value: float, index: int, variance: float):
+        H = np.zeros((1, 4))
+        H[0, index] = 1.0
+        self._update(np.array([value]), H, np.array([[variance]]), None, None)
+
+    def _update(self, z, H, R, gate: Optional[float], source: Optional[str], angle: bool = False) -> bool:
+        y = z - H @ self.x
+        if angle:
+            y[0] = _wrap(y[0])
+        S = H @ self.P @ H.T + R
+        S_inv = np.linalg.inv(S)
+
+        if gate is not None and source is not None:
+            if float(y @ S_inv @ y) > gate and self._consecutive[source] < MAX_REJECTIONS:
+                self._consecutive[source] += 1
+                self.rejections[source] += 1
+                self.rejected += 1
+                return False
+            self._consecutive[source] = 0
+
+        K = self.P @ H.T @ S_inv
+        self.x = self.x + K @ y
+        self.x[HEADING] = _wrap(self.x[HEADING])
+        # Joseph form keeps P symmetric and positive definite
+        I_KH = np.eye(4) - K @ H
+        self.P = I_KH @ self.P @ I_KH.T + K @ R @ K.T
+        return True
+
+
+def simulate(duration: float = 120.0, gps_rate: float = 1.0, outage: Tuple[float, float] = (60.0, 75.0),
+             seed: int = 1):
+    """Drive a simulated loop and compare fused, raw and averaged GPS position error"""
+    rng = random.Random(seed)
+    origin = LocalProjection(30.2752, 78.0439)
+    estimator = PoseEstimator()
+    east = north = 0.0
+    heading = 0.0
+    dt = 0.05  # 20 Hz sensor frames
+    gps_sigma, mag_sigma, mag_bias = 2.5, math.radians(6), math.radians(3)
+    recent = []
+    errors = {"fused": [], "raw gps": [], "5-fix mean": [], "outage": []}
+    last_fix = None
+    last_cmd = None
+    t = 0.0
+    step = 0
+
+    while t < duration:
+        # Alternate straight runs and right turns, as a tour route would
+        cmd = ('R', (100,)) if (t % 20) > 16 else ('F', (100,))
+        if cmd != last_cmd:
+            estimator.set_command(cmd[0], cmd[1], t)
+            last_cmd = cmd
+        # Truth drifts from the model: wheels run 10% slow
+        v, turn_rate = commanded_motion(*wheel_pwm(*cmd))
+        v *= 0.9
+        turn_rate *= 0.9
+        heading = _wrap(heading + turn_rate * dt)
+        east += v * math.sin(heading) * dt
+        north += v * math.cos(heading) * dt
+        t += dt
+        step += 1
+
+        estimator.update_heading(math.degrees(heading + mag_bias + rng.gauss(0, mag_sigma)), t)
+        in_outage = outage[0] <= t < outage[1]
+        if step % int(1 / (gps_rate * dt)) == 0 and not in_outage:
+            fix = GPSFix()
+            fix.t = t
+            fix.valid = True
+            fix.lat, fix.lon = origin.to_geodetic(east + rng.gauss(0, gps_sigma), north + rng.gauss(0, gps_sigma))
+            fix.hdop = gps_sigma * math.sqrt(2) / GPS_UERE
+            fix.speed = abs(v + rng.gauss(0, 0.1))
+            fix.course = math.degrees(heading + rng.gauss(0, 0.1)) % 360
+            estimator.update_gps(fix)
+            last_fix = origin.to_local(fix.lat, fix.lon)
+            recent = (recent + [last_fix])[-5:]
+
+        pose = estimator.pose(t)
+        if pose is None or last_fix is None or t < 10:
+            continue
+        fused = origin.to_local(pose.lat, pose.lon)
+        mean = (sum(p[0] for p in recent) / len(recent), sum(p[1] for p in recent) / len(recent))
+        for name, (pe, pn) in (("fused", fused), ("raw gps", last_fix), ("5-fix mean", mean)):
+            errors[name].append(math.hypot(pe - east, pn - north))
+        if in_outage:
+            errors["outage"].append(math.hypot(fused[0] - east, fused[1] - north))
+
+    for name, values in errors.items():
+        rms = math.sqrt(sum(e * e for e in values) / len(values))
+        print(f"{name:>10}: rms {rms:5.2f} m, max {max(values):5.2f} m")
+    print(f"final sigma {estimator.position_uncertainty(t):.2f} m, gated measurements {estimator.rejections}")
+
+    start = time.perf_counter()
+    for i in range(2000):
+        estimator.update_heading(90.0, t + i * dt)
+    print(f"predict + magnetometer update: {1e6 * (time.perf_counter() - start) / 2000:.1f} us")
+
+
+if __name__ == "__main__":
+    simulate()
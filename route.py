@@ -0,0 +1,302 @@
+# route.py
+
+import sys
+import time
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from geodesy import LocalProjection
+
+# Constants
+SIMPLIFY_TOLERANCE = 1.0  # meters a simplified route may deviate from the original
+PROGRESS_SEARCH_WINDOW = 4  # segments ahead of the active one checked on each update
+REACQUIRE_DISTANCE = 15.0  # meters off the nearby segments before searching the whole route
+
+
+def project_points(points: Sequence[Tuple[float, float]], projection: LocalProjection = None) -> np.ndarray:
+    """(n, 2) array of east/north meters for lat/lon points (origin at the first point by default)"""
+    if projection is None:
+        first = np.asarray(points[0], dtype=float)
+        projection = LocalProjection(first[0], first[1])
+    return projection.points_to_local(points)
+
+
+def segment_distances(xy: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Distance of points start+1..end-1 to the segment xy[start]-xy[end], in meters"""
+    a = xy[start]
+    ab = xy[end] - a
+    ap = xy[start + 1:end] - a
+    length_sq = ab @ ab
+    if length_sq == 0.0:
+        return np.hypot(ap[:, 0], ap[:, 1])
+    # Clamp to the segment so points beyond either end (routes doubling back) measure to the endpoint
+    t = np.clip(ap @ ab / length_sq, 0.0, 1.0)
+    d = ap - t[:, None] * ab
+    return np.hypot(d[:, 0], d[:, 1])
+
+
+def simplify_indices(xy: np.ndarray, tolerance: float = SIMPLIFY_TOLERANCE) -> List[int]:
+    """Douglas-Peucker on projected points; returns the sorted indices to keep
+
+    Uses an explicit stack instead of recursion, so route length is not
+    limited by the interpreter's recursion depth, and computes each
+    segment's distances in one vectorized pass.
+    """
+    n = len(xy)
+    if n <= 2:
+        return list(range(n))
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = segment_distances(xy, start, end)
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep).tolist()
+
+
+def simplify_route(points: Sequence[Tuple[float, float]], tolerance: float = SIMPLIFY_TOLERANCE) -> List[int]:
+    """Indices of the lat/lon points kept when simplifying to tolerance meters"""
+    if len(points) <= 2:
+        return list(range(len(points)))
+    return simplify_indices(project_points(points), tolerance)
+
+
+class Route:
+    """Route geometry computed once per route
+
+    Waypoints are projected to local meters and stored in arrays together
+    with segment lengths, headings and cumulative distance, so remaining
+    distance from any point of the route is a single subtraction.
+    """
+
+    def __init__(self, waypoints: Sequence[Tuple[float, float]], projection: Optional[LocalProjection] = None):
+        if not waypoints:
+            raise ValueError("A route needs at least one waypoint")
+        self.waypoints = list(waypoints)
+        self.projection = projection or LocalProjection(*self.waypoints[0])
+        self.xy = project_points(self.waypoints, self.projection)
+        deltas = np.diff(self.xy, axis=0)
+        self.segment_lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+        self.segment_headings = np.degrees(np.arctan2(deltas[:, 0], deltas[:, 1])) % 360
+        self.length = float(self.cumulative[-1])
+        # Plain lists for the scalar per-update path, where numpy call overhead dominates
+        self._x = self.xy[:, 0].tolist()
+        self._y = self.xy[:, 1].tolist()
+        self._dx = deltas[:, 0].tolist()
+        self._dy = deltas[:, 1].tolist()
+        self._lengths = self.segment_lengths.tolist()
+        self._cumulative = self.cumulative.tolist()
+
+    def __len__(self):
+        return len(self.waypoints)
+
+    @property
+    def segments(self) -> int:
+        return len(self.waypoints) - 1
+
+    def distance_to(self, index: int) -> float:
+        """Distance along the route from the start to waypoint index"""
+        return self._cumulative[index]
+
+    def remaining_from(self, index: int) -> float:
+        """Distance along the route from waypoint index to the end"""
+        return self.length - self._cumulative[index]
+
+    def point_at(self, distance: float) -> Tuple[float, float]:
+        """Lat/lon of the point at a distance along the route (clamped to its ends)"""
+        distance = min(max(distance, 0.0), self.length)
+        segment = min(int(np.searchsorted(self.cumulative, distance, side="right")) - 1, max(self.segments - 1, 0))
+        if self.segments == 0:
+            return self.waypoints[0]
+        t = (distance - self._cumulative[segment]) / self._lengths[segment] if self._lengths[segment] else 0.0
+        east = self._x[segment] + t * self._dx[segment]
+        north = self._y[segment] + t * self._dy[segment]
+        return self.projection.to_geodetic(east, north)
+
+    def project(self, east: float, north: float, segment: int) -> Tuple[float, float, float]:
+        """(distance from the segment, signed cross-track error, fraction along it) for a local point
+
+        Cross-track error is positive when the point is right of the route.
+        """
+        dx, dy = self._dx[segment], self._dy[segment]
+        px, py = east - self._x[segment], north - self._y[segment]
+        length = self._lengths[segment]
+        if length == 0.0:
+            return math.hypot(px, py), 0.0, 0.0
+        t = (px * dx + py * dy) / (length * length)
+        clamped = min(max(t, 0.0), 1.0)
+        distance = math.hypot(px - clamped * dx, py - clamped * dy)
+        cross = (px * dy - py * dx) / length
+        return distance, cross, t
+
+
+@dataclass(frozen=True)
+class PlannedRoute:
+    """A route ready to drive: where it was planned from, to where, and its geometry"""
+    start: Tuple[float, float]
+    destination: Union[str, Tuple[float, float]]
+    route: Route
+    planned_at: float  # time.monotonic() when planning finished
+
+    @property
+    def waypoints(self) -> List[Tuple[float, float]]:
+        return self.route.waypoints
+
+    def trimmed_to(self, position: Tuple[float, float]) -> "PlannedRoute":
+        """The same route starting at its waypoint nearest position"""
+        route = self.route
+        east, north = route.projection.to_local(position[0], position[1])
+        nearest = int(np.argmin(np.hypot(route.xy[:, 0] - east, route.xy[:, 1] - north)))
+        if nearest == 0:
+            return self
+        return PlannedRoute(tuple(position), self.destination,
+                            Route(route.waypoints[nearest:], route.projection), self.planned_at)
+
+
+class RouteProgress:
+    """Tracks the robot's position along a Route
+
+    Each update projects the position onto the active segment and the few
+    after it and moves forward to the closest one, so the cost per update
+    is constant however long the route is. Only when the robot is far from
+    all of those (a detour or a GPS jump) does it search the whole route.
+    """
+
+    def __init__(self, route: Route, search_window: int = PROGRESS_SEARCH_WINDOW):
+        self.route = route
+        self.search_window = search_window
+        self.segment = 0
+        self.along_track = 0.0  # meters from the start of the route
+        self.cross_track = 0.0  # meters, positive = right of the route
+        self.reacquisitions = 0
+
+    @property
+    def remaining(self) -> float:
+        return max(self.route.length - self.along_track, 0.0)
+
+    @property
+    def segment_heading(self) -> float:
+        return float(self.route.segment_headings[self.segment]) if self.route.segments else 0.0
+
+    def passed(self, index: int) -> bool:
+        """True once the robot is past waypoint index along the route"""
+        return self.along_track >= self.route.distance_to(index)
+
+    def update(self, lat: float, lon: float) -> "RouteProgress":
+        route = self.route
+        if route.segments == 0:
+            return self
+        east, north = route.projection.to_local(lat, lon)
+
+        best = None
+        first = max(self.segment - 1, 0)
+        last = min(self.segment + self.search_window, route.segments - 1)
+        for segment in range(first, last + 1):
+            distance, cross, t = route.project(east, north, segment)
+            if best is None or distance < best[0]:
+                best = (distance, segment, cross, t)
+
+        if best[0] > REACQUIRE_DISTANCE:
+            best = self._search_all(east, north)
+            self.reacquisitions += 1
+
+        _, segment, cross, t = best
+        self.segment = segment
+        self.cross_track = cross
+        self.along_track = route.distance_to(segment) + min(max(t, 0.0), 1.0) * route._lengths[segment]
+        return self
+
+    def _search_all(self, east: float, north: float):
+        """Closest segment over the whole route, vectorized"""
+        route = self.route
+        a = route.xy[:-1]
+        d = np.diff(route.xy, axis=0)
+        p = np.array([east, north]) - a
+        length_sq = np.maximum(np.einsum("ij,ij->i", d, d), 1e-12)
+        t = np.clip(np.einsum("ij,ij->i", p, d) / length_sq, 0.0, 1.0)
+        offset = p - t[:, None] * d
+        segment = int(np.argmin(np.einsum("ij,ij->i", offset, offset)))
+        distance, cross, t = route.project(east, north, segment)
+        return distance, segment, cross, t
+
+
+def _synthetic_route(n: int, seed: int = 7) -> List[Tuple[float, float]]:
+    """A winding campus-scale walk sampled every ~0.5 m, like decoded step polylines"""
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.08, n))
+    step = 0.5
+    east = np.cumsum(step * np.sin(heading))
+    north = np.cumsum(step * np.cos(heading))
+    projection = LocalProjection(30.2752, 78.0439)
+    lat, lon = projection.to_geodetic(east, north)
+    return list(zip(lat.tolist(), lon.tolist()))
+
+
+def benchmark(sizes=(1000, 10000, 100000), tolerance: float = SIMPLIFY_TOLERANCE):
+    """Time simplification of long routes and check the tolerance holds"""
+    for n in sizes:
+        points = _synthetic_route(n)
+        start = time.perf_counter()
+        keep = simplify_route(points, tolerance)
+        elapsed = time.perf_counter() - start
+
+        # Every dropped point must lie within tolerance of the kept polyline
+        xy = project_points(points)
+        worst = 0.0
+        for a, b in zip(keep, keep[1:]):
+            if b - a > 1:
+                worst = max(worst, float(segment_distances(xy, a, b).max()))
+        print(f"{n:>7} points -> {len(keep):>6} kept in {1000 * elapsed:8.1f} ms, "
+              f"max deviation {worst:.3f} m (tolerance {tolerance} m)")
+
+    # A zig-zag forces a split at every point: depth n for a recursive implementation
+    zigzag = [(30.2752 + i * 1e-5, 78.0439 + (i % 2) * 1e-4) for i in range(5000)]
+    start = time.perf_counter()
+    keep = simplify_route(zigzag, tolerance)
+    print(f"zig-zag {len(zigzag)} points -> {len(keep)} kept in {1000 * (time.perf_counter() - start):.1f} ms "
+          f"(recursion limit {sys.getrecursionlimit()})")
+
+
+def benchmark_progress(n: int = 10000, updates: int = 10000):
+    """Per-fix cost of remaining distance: summing haversines vs the progress tracker"""
+    from geodesy import haversine_distance
+
+    points = _synthetic_route(n)
+    start = time.perf_counter()
+    route = Route(points)
+    print(f"Route of {n} points built in {1000 * (time.perf_counter() - start):.1f} ms, {route.length:.0f} m long")
+
+    index = n // 2
+    start = time.perf_counter()
+    for _ in range(20):
+        remaining = 0
+        for i in range(index, len(points) - 1):
+            remaining += haversine_distance(points[i][0], points[i][1], points[i + 1][0], points[i + 1][1])
+    loop_time = (time.perf_counter() - start) / 20
+    print(f"haversine sum over remaining waypoints: {1000 * loop_time:8.3f} ms/fix ({remaining:.1f} m)")
+
+    progress = RouteProgress(route)
+    fixes = [route.point_at(route.length * k / updates) for k in range(updates)]
+    start = time.perf_counter()
+    for lat, lon in fixes:
+        progress.update(lat, lon)
+    tracker_time = (time.perf_counter() - start) / updates
+    print(f"progress tracker update:                {1000 * tracker_time:8.3f} ms/fix "
+          f"(remaining {progress.remaining:.1f} m, {progress.reacquisitions} full searches)")
+
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark_progress()
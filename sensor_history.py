@@ -0,0 +1,239 @@
+# sensor_history.py
+
+import time
+import threading
+from array import array
+from typing import Dict, Iterator, Optional
+
+# Constants
+DEFAULT_CAPACITY = 256  # samples kept per channel (~12 s of 20 Hz telemetry)
+
+
+class Sample:
+    """One timestamped reading (time.monotonic() seconds, value)"""
+    __slots__ = ("t", "value")
+
+    def __init__(self, t: float, value: float):
+        self.t = t
+        self.value = value
+
+    def __repr__(self):
+        return f"Sample(t={self.t:.3f}, value={self.value})"
+
+
+class RingBuffer:
+    """Fixed-memory ring of timestamped float samples for one sensor channel
+
+    Times and values live in preallocated array('d') storage, so appends are
+    O(1) and never grow memory. Window queries walk backwards from the newest
+    sample and stop at the first one older than the window; the median copies
+    the window into a preallocated scratch array and runs an in-place
+    quickselect on it. Each reader thread gets its own scratch array, sized to
+    the capacity on its first median query and reused after that, so queries
+    never allocate and concurrent readers never share working memory.
+
+    Each channel has a single writer thread. Readers take no lock: the value
+    and time are written before the head moves, so a reader at worst misses
+    the sample being appended.
+    """
+    __slots__ = ("capacity", "_times", "_values", "_local", "_head", "_count")
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._local = threading.local()  # per-thread median scratch
+        self._head = 0  # index of the next write
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value: float, t: Optional[float] = None):
+        """Add a sample; timestamps must be non-decreasing (time.monotonic())"""
+        head = self._head
+        self._values[head] = value
+        self._times[head] = time.monotonic() if t is None else t
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def latest(self) -> Optional[Sample]:
+        """Newest sample, or None if nothing has been recorded"""
+        if not self._count:
+            return None
+        i = (self._head - 1) % self.capacity
+        return Sample(self._times[i], self._values[i])
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Seconds since the newest sample (infinite if there is none)"""
+        if not self._count:
+            return float("inf")
+        now = time.monotonic() if now is None else now
+        return now - self._times[(self._head - 1) % self.capacity]
+
+    def samples(self, window: float, now: Optional[float] = None) -> Iterator[Sample]:
+        """Samples within the last `window` seconds, newest first"""
+        now = time.monotonic() if now is None else now
+        cutoff = now - window
+        i = self._head
+        for _ in range(self._count):
+            i = (i - 1) % self.capacity
+            if self._times[i] < cutoff:
+                return
+            yield Sample(self._times[i], self._values[i])
+
+    def _window_bounds(self, window: float, now: Optional[float]) -> int:
+        """Number of newest samples that fall inside the window"""
+        now = time.monotonic() if now is None else now
+        cutoff = now - window
+        times = self._times
+        capacity = self.capacity
+        i = self._head
+        n = 0
+        while n < self._count:
+            i = (i - 1) % capacity
+            if times[i] < cutoff:
+                break
+            n += 1
+        return n
+
+    def window_min(self, window: float, now: Optional[float] = None) -> Optional[float]:
+        n = self._window_bounds(window, now)
+        if not n:
+            return None
+        values, capacity, i = self._values, self.capacity, self._head
+        result = float("inf")
+        for _ in range(n):
+            i = (i - 1) % capacity
+            if values[i] < result:
+                result = values[i]
+        return result
+
+    def window_max(self, window: float, now: Optional[float] = None) -> Optional[float]:
+        n = self._window_bounds(window, now)
+        if not n:
+            return None
+        values, capacity, i = self._values, self.capacity, self._head
+        result = float("-inf")
+        for _ in range(n):
+            i = (i - 1) % capacity
+            if values[i] > result:
+                result = values[i]
+        return result
+
+    def window_mean(self, window: float, now: Optional[float] = None) -> Optional[float]:
+        n = self._window_bounds(window, now)
+        if not n:
+            return None
+        values, capacity, i = self._values, self.capacity, self._head
+        total = 0.0
+        for _ in range(n):
+            i = (i - 1) % capacity
+            total += values[i]
+        return total / n
+
+    def _scratch(self) -> array:
+        """This thread's scratch array, allocated on its first median query"""
+        scratch = getattr(self._local, "scratch", None)
+        if scratch is None:
+            scratch = self._local.scratch = array("d", bytes(8 * self.capacity))
+        return scratch
+
+    def window_median(self, window: float, now: Optional[float] = None) -> Optional[float]:
+        n = self._window_bounds(window, now)
+        if not n:
+            return None
+        values, scratch, capacity, i = self._values, self._scratch(), self.capacity, self._head
+        for k in range(n):
+            i = (i - 1) % capacity
+            scratch[k] = values[i]
+        mid = n // 2
+        upper = _quickselect(scratch, n, mid)
+        if n % 2:
+            return upper
+        # Even count: the lower middle is the largest value left of mid after partitioning
+        lower = scratch[0]
+        for k in range(1, mid):
+            if scratch[k] > lower:
+                lower = scratch[k]
+        return (lower + upper) / 2.0
+
+
+def _quickselect(data: array, n: int, k: int) -> float:
+    """k-th smallest of data[:n], partitioning data in place (Hoare selection)"""
+    lo, hi = 0, n - 1
+    while lo < hi:
+        pivot = data[(lo + hi) // 2]
+        i, j = lo, hi
+        while i <= j:
+            while data[i] < pivot:
+                i += 1
+            while data[j] > pivot:
+                j -= 1
+            if i <= j:
+                data[i], data[j] = data[j], data[i]
+                i += 1
+                j -= 1
+        if k <= j:
+            hi = j
+        elif k >= i:
+            lo = i
+        else:
+            break
+    return data[k]
+
+
+class SensorHistory:
+    """Named ring buffers for the robot's sensor channels
+
+    Channels are created on first write. The sensor loop records the
+    ultrasonic ("front", "left", "right") and "magnetometer" channels, and the
+    GPS loop records "lat", "lon" and "gps_heading".
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.channels: Dict[str, RingBuffer] = {}
+
+    def channel(self, name: str) -> RingBuffer:
+        buffer = self.channels.get(name)
+        if buffer is None:
+            buffer = self.channels[name] = RingBuffer(self.capacity)
+        return buffer
+
+    def record(self, name: str, value: float, t: Optional[float] = None):
+        self.channel(name).append(value, t)
+
+    def record_many(self, values: Dict[str, float], t: Optional[float] = None):
+        """Record several channels sampled at the same instant"""
+        t = time.monotonic() if t is None else t
+        for name, value in values.items():
+            self.channel(name).append(value, t)
+
+    def latest(self, name: str) -> Optional[Sample]:
+        buffer = self.channels.get(name)
+        return buffer.latest() if buffer is not None else None
+
+    def age(self, name: str, now: Optional[float] = None) -> float:
+        buffer = self.channels.get(name)
+        return buffer.age(now) if buffer is not None else float("inf")
+
+    def is_stale(self, name: str, max_age: float, now: Optional[float] = None) -> bool:
+        return self.age(name, now) > max_age
+
+    def min(self, name: str, window: float, now: Optional[float] = None) -> Optional[float]:
+        buffer = self.channels.get(name)
+        return buffer.window_min(window, now) if buffer is not None else None
+
+    def max(self, name: str, window: float, now: Optional[float] = None) -> Optional[float]:
+        buffer = self.channels.get(name)
+        return buffer.window_max(window, now) if buffer is not None else None
+
+    def mean(self, name: str, window: float, now: Optional[float] = None) -> Optional[float]:
+        buffer = self.channels.get(name)
+        return buffer.window_mean(window, now) if buffer is not None else None
+
+    def median(self, name: str, window: float, now: Optional[float] = None) -> Optional[float]:
+        buffer = self.channels.get(name)
+        return buffer.window_median(window, now) if buffer is not None else None
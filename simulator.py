@@ -0,0 +1,724 @@
+# simulator.py
+
+import os
+import json
+import argparse
+import math
+import time
+import random
+import select
+import logging
+import tempfile
+import threading
+import tty
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import arduino_protocol as protocol
+from geodesy import SAMPLE_ORIGIN, LocalProjection, local_projection
+from nmea import with_checksum, KNOTS_TO_MS
+from pose_estimator import GPS_UERE, SPEED_TIME_CONSTANT, TRACK_WIDTH, commanded_motion, wheel_pwm
+from local_planner import SENSOR_ANGLES, SENSOR_BEAM_WIDTH, SENSOR_MAX_RANGE
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+SIM_SPEEDUP = 4.0  # simulated seconds per wall-clock second
+PHYSICS_RATE = 100  # Hz of simulated time
+SIM_GPS_RATE = 5  # Hz, NMEA epochs (RMC + GGA)
+SIM_GPS_NOISE = 1.5  # meters, 1-sigma horizontal error of each fix
+GPS_NOISE_CORRELATION = 20.0  # seconds; receiver errors wander slowly rather than jump
+SIM_GPS_DROPOUT = 0.02  # probability that an epoch is not sent at all
+MAGNETOMETER_NOISE = 1.0  # degrees, 1-sigma
+MAGNETOMETER_BIAS = 0.0  # degrees between the magnetometer and true heading
+ULTRASONIC_NOISE = 1.0  # cm, 1-sigma
+ROBOT_BODY_RADIUS = TRACK_WIDTH / 2 + 0.05  # meters, for collisions
+SCENARIO_TIME_LIMIT = 300.0  # simulated seconds before a run is abandoned
+GOAL_NOISE_SIGMAS = 2.0  # arrival counts within the waypoint radius plus this many GPS sigmas of the true goal
+
+# Firmware behaviour mirrored from arduino.ino
+WHEEL_COMMAND_TIMEOUT = 1.0  # seconds
+HEADING_CONTROL_INTERVAL = 0.02  # seconds
+HEADING_TOLERANCE = 2.0  # degrees
+HEADING_SETTLE_TIME = 0.2  # seconds
+HEADING_TURN_TIMEOUT = 5.0  # seconds
+HEADING_KP = 3.0  # PWM per degree of error
+HEADING_MAX_TURN_PWM = 100
+HEADING_MIN_TURN_PWM = 45
+
+
+class SimClock:
+    """Process-wide clock running speedup times faster than the wall clock
+
+    install() points time.monotonic, time.time and time.sleep, and the
+    timeouts of threading.Event.wait, at the scaled clock, so every thread
+    of the unchanged navigation code (control scheduler, pose estimator,
+    staleness checks, maneuver timing) runs on simulated time while the
+    serial ports stay real pseudo-terminals.
+    """
+
+    def __init__(self, speedup: float = SIM_SPEEDUP):
+        self.speedup = speedup
+        self._monotonic = time.monotonic
+        self._time = time.time
+        self._sleep = time.sleep
+        self._wait = threading.Event.wait
+        self._real_start = self._monotonic()
+        self._wall_start = self._time()
+
+    def monotonic(self) -> float:
+        return self._real_start + (self._monotonic() - self._real_start) * self.speedup
+
+    def time(self) -> float:
+        return self._wall_start + (self._monotonic() - self._real_start) * self.speedup
+
+    def sleep(self, seconds: float):
+        self._sleep(max(seconds, 0.0) / self.speedup)
+
+    def install(self):
+        wait, speedup = self._wait, self.speedup
+
+        def scaled_wait(event, timeout=None):
+            return wait(event, None if timeout is None else max(timeout, 0.0) / speedup)
+
+        time.monotonic, time.time, time.sleep = self.monotonic, self.time, self.sleep
+        threading.Event.wait = scaled_wait
+
+    def uninstall(self):
+        time.monotonic, time.time, time.sleep = self._monotonic, self._time, self._sleep
+        threading.Event.wait = self._wait
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A simulated run: start, goal, walkways and obstacles in campus-plane meters"""
+    name: str
+    start: Tuple[float, float]  # east, north
+    goal: Tuple[float, float]
+    heading: float = 0.0  # degrees the robot faces at the start
+    paths: Tuple[Tuple[Tuple[float, float], ...], ...] = ()  # walkways for the campus graph; default start -> goal
+    circles: Tuple[Tuple[float, float, float], ...] = ()  # (east, north, radius)
+    walls: Tuple[Tuple[float, float, float, float], ...] = ()  # (east1, north1, east2, north2)
+    gps_noise: float = SIM_GPS_NOISE
+    gps_rate: float = SIM_GPS_RATE
+    gps_dropout: float = SIM_GPS_DROPOUT
+    gps_outages: Tuple[Tuple[float, float], ...] = ()  # (start, end) seconds into the run with no fix
+    time_limit: float = SCENARIO_TIME_LIMIT
+    origin: Tuple[float, float] = SAMPLE_ORIGIN  # lat, lon of the scenario's (0, 0)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Scenario":
+        def tuples(value):
+            return tuple(tuples(v) for v in value) if isinstance(value, (list, tuple)) else value
+        return cls(**{key: tuples(value) for key, value in data.items()})
+
+    @classmethod
+    def load(cls, path: str) -> "Scenario":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        data.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+        return cls.from_dict(data)
+
+
+@dataclass(frozen=True)
+class ScenarioResult:
+    """How a simulated run went, measured against the true robot motion"""
+    name: str
+    reached: bool  # navigation finished near the true goal (see GOAL_NOISE_SIGMAS)
+    completed: bool  # navigate_route() reported the destination reached, wherever the robot really is
+    time_to_goal: float  # simulated seconds until navigation returned (or the time limit)
+    path_length: float  # meters actually driven
+    collisions: int  # times the robot's body touched an obstacle
+    final_error: float  # meters from the true goal at the end
+    gps_fixes: int
+    gps_dropped: int
+    wall_time: float  # seconds the run took on the wall clock
+
+
+class SimWorld:
+    """Circular and straight-wall obstacles for ray casts and collision checks"""
+
+    def __init__(self, circles: Sequence[Tuple[float, float, float]] = (),
+                 walls: Sequence[Tuple[float, float, float, float]] = ()):
+        self.circles = [tuple(c) for c in circles]
+        self.walls = [tuple(w) for w in walls]
+
+    def ray_distance(self, x: float, y: float, bearing: float, max_range: float) -> float:
+        """Meters along a bearing (degrees) to the first obstacle, or max_range"""
+        dx, dy = math.sin(math.radians(bearing)), math.cos(math.radians(bearing))
+        best = max_range
+        for cx, cy, r in self.circles:
+            along = (cx - x) * dx + (cy - y) * dy
+            miss = (cx - x) * dy - (cy - y) * dx
+            if along > 0 and abs(miss) < r:
+                best = min(best, max(along - math.sqrt(r * r - miss * miss), 0.0))
+        for x1, y1, x2, y2 in self.walls:
+            ex, ey = x2 - x1, y2 - y1
+            denominator = dx * ey - dy * ex
+            if abs(denominator) < 1e-12:
+                continue
+            t = ((x1 - x) * ey - (y1 - y) * ex) / denominator  # along the ray
+            s = ((x1 - x) * dy - (y1 - y) * dx) / denominator  # along the wall
+            if t > 0 and 0 <= s <= 1:
+                best = min(best, t)
+        return best
+
+    def collides(self, x: float, y: float, radius: float) -> bool:
+        """True if a disc at (x, y) overlaps any obstacle"""
+        for cx, cy, r in self.circles:
+            if math.hypot(cx - x, cy - y) < r + radius:
+                return True
+        for x1, y1, x2, y2 in self.walls:
+            ex, ey = x2 - x1, y2 - y1
+            t = max(0.0, min(1.0, ((x - x1) * ex + (y - y1) * ey) / max(ex * ex + ey * ey, 1e-12)))
+            if math.hypot(x1 + t * ex - x, y1 + t * ey - y) < radius:
+                return True
+        return False
+
+
+class SimRobot:
+    """Differential-drive kinematics with first-order wheel response
+
+    Wheels approach the commanded PWM with SPEED_TIME_CONSTANT. Motion
+    into an obstacle is blocked (the robot can still turn) and each new
+    contact counts as a collision.
+    """
+
+    def __init__(self, east: float, north: float, heading: float):
+        self.east = east
+        self.north = north
+        self.heading = heading % 360
+        self.command = (0, 0)  # commanded left/right PWM
+        self.wheels = (0.0, 0.0)  # actual left/right PWM
+        self.path_length = 0.0
+        self.collisions = 0
+        self.touching = False
+
+    @property
+    def speed(self) -> float:
+        return commanded_motion(*self.wheels)[0]
+
+    def step(self, dt: float, world: SimWorld):
+        blend = 1.0 - math.exp(-dt / SPEED_TIME_CONSTANT)
+        left, right = self.wheels
+        self.wheels = (left + (self.command[0] - left) * blend, right + (self.command[1] - right) * blend)
+        speed, turn_rate = commanded_motion(*self.wheels)
+        self.heading = (self.heading + math.degrees(turn_rate) * dt) % 360
+        east = self.east + speed * math.sin(math.radians(self.heading)) * dt
+        north = self.north + speed * math.cos(math.radians(self.heading)) * dt
+        if world.collides(east, north, ROBOT_BODY_RADIUS):
+            if not self.touching:
+                self.collisions += 1
+                logger.warning(f"Simulated collision at ({east:.1f}, {north:.1f})")
+            self.touching = True
+            return
+        self.touching = False
+        self.path_length += math.hypot(east - self.east, north - self.north)
+        self.east, self.north = east, north
+
+
+def _open_pty() -> Tuple[int, int, str]:
+    """(master fd, slave fd, slave device path) of a raw, non-blocking pseudo-terminal"""
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    os.set_blocking(master, False)
+    return master, slave, os.ttyname(slave)
+
+
+class SimulatedArduino:
+    """Speaks the arduino.ino serial protocol (ASCII and binary) on a pseudo-terminal
+
+    Motor commands set the simulated wheel PWM exactly as the firmware
+    drives its pins; W and H streams stop after WHEEL_COMMAND_TIMEOUT of
+    silence; G and H run the firmware's heading loop against the simulated
+    magnetometer; S and subscribed telemetry report ray-cast ultrasonic
+    ranges.
+    """
+
+    def __init__(self, robot: SimRobot, world: SimWorld, rng: random.Random, start_time: float,
+                 has_magnetometer: bool = True):
+        self.robot = robot
+        self.world = world
+        self.rng = rng
+        self.has_magnetometer = has_magnetometer
+        self.start_time = start_time
+        self.master, self.slave, self.port = _open_pty()
+        self.binary = False
+        self.telemetry_interval = 0.0
+        self.last_telemetry = 0.0
+        self.wheel_mode = False
+        self.last_wheel_command = 0.0
+        self.heading_mode: Optional[str] = None  # "turn" or "hold"
+        self.heading_target = 0.0
+        self.heading_speed = 0
+        self.heading_started = 0.0
+        self.settled_since: Optional[float] = None
+        self.last_heading_control = 0.0
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._decoder = protocol.FrameDecoder()
+        self._line = b""
+        self.running = True
+        self.thread = threading.Thread(target=self._reader_loop, name="SimArduino", daemon=True)
+        self.thread.start()
+
+    def _write(self, data: bytes):
+        with self._write_lock:
+            try:
+                os.write(self.master, data)
+            except (BlockingIOError, OSError):
+                pass  # Nobody is reading; a real serial line would drop it too
+
+    def _reader_loop(self):
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 256)
+            except (BlockingIOError, OSError):
+                continue
+            with self._lock:
+                self._receive(data, time.monotonic())
+
+    def _receive(self, data: bytes, now: float):
+        if self.binary:
+            for msg_type, seq, fields in self._decoder.feed(data):
+                if msg_type == protocol.MSG_COMMAND:
+                    cmd, argc, arg0, arg1 = fields
+                    self._binary_command(cmd, [arg0, arg1][:argc], seq, now)
+            return
+        self._line += data
+        while b"\n" in self._line and not self.binary:
+            line, self._line = self._line.split(b"\n", 1)
+            line = line.decode("ascii", errors="replace").strip()
+            if line:
+                self._ascii_command(line, now)
+        if self.binary:
+            # Bytes after the protocol switch are the first binary frames
+            rest, self._line = self._line, b""
+            self._receive(rest, now)
+
+    def _ascii_command(self, line: str, now: float):
+        args = []
+        if ":" in line:
+            try:
+                args = [int(value) for value in line.split(":", 1)[1].split(",")[:2]]
+            except ValueError:
+                args = [0]
+        reply = self._execute(line[0], args, 0, now)
+        if reply is not None:
+            self._write((reply + "\r\n").encode())
+        elif line[0] != 'S':
+            self._write(f"{protocol.ERROR_PREFIX}{line[0]}\r\n".encode())
+
+    def _binary_command(self, cmd: str, args: List[int], seq: int, now: float):
+        if cmd == 'S':
+            self._send_sensors(seq, now)  # The sensor frame is the reply
+            return
+        reply = self._execute(cmd, args, seq, now)
+        status = protocol.ACK_OK if reply is not None else protocol.ACK_UNKNOWN
+        self._write(protocol.encode_frame(protocol.MSG_ACK, seq, protocol.ACK.pack(cmd.encode(), status)))
+
+    def _execute(self, cmd: str, args: List[int], seq: int, now: float) -> Optional[str]:
+        """Run a command like executeCommand() in arduino.ino; returns the ASCII ack or None"""
+        self.commands += 1
+        if cmd in "FBLRXWGH":
+            self.wheel_mode = False
+            self.heading_mode = None
+        if cmd == 'S':
+            self._send_sensors(seq, now)
+            return None
+        if cmd == 'T':
+            self.telemetry_interval = max(1, 1000 // args[0]) / 1000.0 if args and args[0] > 0 else 0.0
+        elif cmd == 'P':
+            self.binary = bool(args) and args[0] == 1
+            self._decoder = protocol.FrameDecoder()
+        elif cmd in "FBLRX":
+            value = args[0] if args else (100 if cmd in "FB" else 0)
+            self.robot.command = wheel_pwm(cmd, (value,))
+        elif cmd == 'W':
+            left = args[0] if args else 0
+            right = args[1] if len(args) > 1 else left
+            self.robot.command = (max(-255, min(255, left)), max(-255, min(255, right)))
+            self.wheel_mode = True
+            self.last_wheel_command = now
+        elif cmd in "GH":
+            if not args or not self.has_magnetometer:
+                return None
+            self.heading_mode = "turn" if cmd == 'G' else "hold"
+            self.heading_target = args[0] / 10.0
+            self.heading_speed = 0 if cmd == 'G' else (args[1] if len(args) > 1 else 100)
+            self.heading_started = now
+            self.settled_since = None
+            self.last_heading_control = 0.0
+            if cmd == 'H':
+                self.wheel_mode = True
+                self.last_wheel_command = now
+        else:
+            return None
+        return protocol.ACK_TEXT[cmd]
+
+    def magnetometer(self) -> float:
+        """Heading the HMC5883 would report, degrees; -1 without one, like readHeading()"""
+        if not self.has_magnetometer:
+            return -1.0
+        return (self.robot.heading + MAGNETOMETER_BIAS + self.rng.gauss(0.0, MAGNETOMETER_NOISE)) % 360
+
+    def ultrasonic(self) -> Dict[str, int]:
+        """Ranges in cm as NewPing reports them: nearest echo in the cone, 0 (no echo) becomes MAX_DISTANCE"""
+        robot, max_range = self.robot, SENSOR_MAX_RANGE / 100.0
+        readings = {}
+        for sensor, offset in SENSOR_ANGLES.items():
+            bearing = robot.heading + offset
+            distance = min(self.world.ray_distance(robot.east, robot.north, bearing + spread, max_range)
+                           for spread in (-SENSOR_BEAM_WIDTH / 2, -SENSOR_BEAM_WIDTH / 4, 0.0,
+                                          SENSOR_BEAM_WIDTH / 4, SENSOR_BEAM_WIDTH / 2))
+            if distance >= max_range:
+                readings[sensor] = SENSOR_MAX_RANGE
+            else:
+                readings[sensor] = int(max(2, min(SENSOR_MAX_RANGE, round(100 * distance +
+                                                                          self.rng.gauss(0.0, ULTRASONIC_NOISE)))))
+        return readings
+
+    def _send_sensors(self, seq: int, now: float):
+        ranges = self.ultrasonic()
+        heading = self.magnetometer()
+        if self.binary:
+            millis = int(1000 * (now - self.start_time))
+            self._write(protocol.encode_sensor(seq, ranges["front"], ranges["left"], ranges["right"], heading, millis))
+        else:
+            self._write((json.dumps({"ultrasonic": ranges, "magnetometer": round(heading, 2)}) + "\r\n").encode())
+
+    def _finish_turn(self, status: int, heading: float):
+        self.heading_mode = None
+        if self.binary:
+            payload = protocol.EVENT.pack(b'G', status, int(heading * 10))
+            self._write(protocol.encode_frame(protocol.MSG_EVENT, 0, payload))
+        else:
+            self._write(f"{protocol.EVENT_PREFIX}G,{status},{int(heading * 10)}\r\n".encode())
+
+    def tick(self, now: float):
+        """Firmware loop(): wheel watchdog, heading control and telemetry"""
+        with self._lock:
+            if self.wheel_mode and now - self.last_wheel_command > WHEEL_COMMAND_TIMEOUT:
+                self.robot.command = (0, 0)
+                self.wheel_mode = False
+                self.heading_mode = None
+            if self.heading_mode is not None and now - self.last_heading_control >= HEADING_CONTROL_INTERVAL:
+                self.last_heading_control = now
+                self._heading_control(now)
+            if self.telemetry_interval > 0 and now - self.last_telemetry >= self.telemetry_interval:
+                self.last_telemetry = now
+                self._send_sensors(0, now)
+
+    def _heading_control(self, now: float):
+        heading = self.magnetometer()
+        error = (self.heading_target - heading + 180) % 360 - 180
+        if self.heading_mode == "hold":
+            turn = max(-HEADING_MAX_TURN_PWM, min(HEADING_MAX_TURN_PWM, int(HEADING_KP * error)))
+            self.robot.command = (max(-255, min(255, self.heading_speed + turn)),
+                                  max(-255, min(255, self.heading_speed - turn)))
+            return
+        if abs(error) <= HEADING_TOLERANCE:
+            self.robot.command = (0, 0)
+            if self.settled_since is None:
+                self.settled_since = now
+            if now - self.settled_since >= HEADING_SETTLE_TIME:
+                self._finish_turn(protocol.EVENT_DONE, heading)
+            return
+        self.settled_since = None
+        if now - self.heading_started > HEADING_TURN_TIMEOUT:
+            self.robot.command = (0, 0)
+            self._finish_turn(protocol.EVENT_TIMEOUT, heading)
+            return
+        turn = max(HEADING_MIN_TURN_PWM, min(HEADING_MAX_TURN_PWM, int(HEADING_KP * abs(error))))
+        self.robot.command = (turn, -turn) if error > 0 else (-turn, turn)
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=1)
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _nmea_coordinate(value: float, degree_digits: int, hemispheres: str) -> Tuple[str, str]:
+    """Signed decimal degrees as NMEA ddmm.mmmmm / dddmm.mmmmm plus hemisphere"""
+    hemisphere = hemispheres[0] if value >= 0 else hemispheres[1]
+    value = abs(value)
+    degrees = int(value)
+    return f"{degrees:0{degree_digits}d}{(value - degrees) * 60:08.5f}", hemisphere
+
+
+class SimulatedGPS:
+    """NMEA receiver on a pseudo-terminal reporting the simulated robot's position
+
+    Each epoch sends RMC and GGA. The position error is a Gauss-Markov
+    process (GPS_NOISE_CORRELATION) with the configured 1-sigma size, and
+    GGA's HDOP is set so HDOP * GPS_UERE matches it. Epochs can be dropped
+    at random, and outage windows report no fix.
+    """
+
+    def __init__(self, robot: SimRobot, projection: LocalProjection, rng: random.Random, start_time: float,
+                 noise: float = SIM_GPS_NOISE, rate: float = SIM_GPS_RATE, dropout: float = SIM_GPS_DROPOUT,
+                 outages: Sequence[Tuple[float, float]] = ()):
+        self.robot = robot
+        self.projection = projection
+        self.rng = rng
+        self.start_time = start_time
+        self.noise = noise
+        self.period = 1.0 / rate
+        self.dropout = dropout
+        self.outages = list(outages)
+        self.master, self.slave, self.port = _open_pty()
+        self.error = [rng.gauss(0.0, noise), rng.gauss(0.0, noise)]
+        self.last_epoch = 0.0
+        self.fixes = 0
+        self.dropped = 0
+
+    def _write(self, data: bytes):
+        try:
+            os.write(self.master, data)
+        except (BlockingIOError, OSError):
+            pass
+
+    def tick(self, now: float):
+        if now - self.last_epoch < self.period:
+            return
+        dt = now - self.last_epoch if self.last_epoch else self.period
+        self.last_epoch = now
+        decay = math.exp(-dt / GPS_NOISE_CORRELATION)
+        spread = self.noise * math.sqrt(1.0 - decay * decay)
+        self.error = [e * decay + self.rng.gauss(0.0, spread) for e in self.error]
+
+        elapsed = now - self.start_time
+        if self.rng.random() < self.dropout:
+            self.dropped += 1
+            return
+        valid = not any(start <= elapsed < end for start, end in self.outages)
+        self._write(self.epoch(valid))
+        if valid:
+            self.fixes += 1
+        else:
+            self.dropped += 1
+
+    def epoch(self, valid: bool = True) -> bytes:
+        """RMC and GGA sentences for the current (noisy) position"""
+        wall = time.time()
+        utc = time.strftime("%H%M%S", time.gmtime(wall)) + f".{int(wall * 100) % 100:02d}"
+        date = time.strftime("%d%m%y", time.gmtime(wall))
+        if not valid:
+            sentences = [f"GNRMC,{utc},V,,,,,,,{date},,,N", f"GNGGA,{utc},,,,,0,00,99.9,,M,,M,,"]
+        else:
+            robot = self.robot
+            lat, lon = self.projection.to_geodetic(robot.east + self.error[0], robot.north + self.error[1])
+            lat_text, ns = _nmea_coordinate(lat, 2, "NS")
+            lon_text, ew = _nmea_coordinate(lon, 3, "EW")
+            speed = abs(robot.speed) / KNOTS_TO_MS
+            hdop = max(0.5, self.noise / GPS_UERE)
+            sentences = [
+                f"GNRMC,{utc},A,{lat_text},{ns},{lon_text},{ew},{speed:.2f},{robot.heading:.1f},{date},,,A",
+                f"GNGGA,{utc},{lat_text},{ns},{lon_text},{ew},1,09,{hdop:.1f},545.4,M,46.9,M,,",
+            ]
+        return "".join(with_checksum(s) + "\r\n" for s in sentences).encode()
+
+    def close(self):
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class Simulator:
+    """World, robot, virtual Arduino and GPS stepped together on one physics thread"""
+
+    def __init__(self, scenario: Scenario, projection: Optional[LocalProjection] = None, seed: int = 1):
+        self.scenario = scenario
+        self.projection = projection or local_projection(*scenario.origin)
+        self.rng = random.Random(seed)
+        self.world = SimWorld(scenario.circles, scenario.walls)
+        self.robot = SimRobot(scenario.start[0], scenario.start[1], scenario.heading)
+        self.start_time = time.monotonic()
+        self.arduino = SimulatedArduino(self.robot, self.world, self.rng, self.start_time)
+        self.gps = SimulatedGPS(self.robot, self.projection, self.rng, self.start_time, scenario.gps_noise,
+                                scenario.gps_rate, scenario.gps_dropout, scenario.gps_outages)
+        self.steps = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._physics_loop, name="SimPhysics", daemon=True)
+        self.thread.start()
+
+    def _physics_loop(self):
+        period = 1.0 / PHYSICS_RATE
+        last = time.monotonic()
+        while self.running:
+            time.sleep(period)
+            now = time.monotonic()
+            # A stalled thread must not teleport the robot
+            self.robot.step(min(now - last, 5 * period), self.world)
+            last = now
+            self.arduino.tick(now)
+            self.gps.tick(now)
+            self.steps += 1
+
+    def distance_to(self, east: float, north: float) -> float:
+        return math.hypot(self.robot.east - east, self.robot.north - north)
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=1)
+        self.arduino.close()
+        self.gps.close()
+
+
+def _build_scenario_graph(scenario: Scenario, projection: LocalProjection, output: str):
+    """Save the scenario's walkways as the campus graph the navigation system will load"""
+    from campus_graph import CampusGraphBuilder
+    builder = CampusGraphBuilder(projection)
+    for path in scenario.paths or ((scenario.start, scenario.goal),):
+        builder.add_path(projection.points_to_geodetic(path).tolist())
+    builder.build().save(output)
+
+
+def run_scenario(scenario: Scenario, config: Optional[Dict] = None, seed: int = 1) -> ScenarioResult:
+    """Drive a NavigationSystem through a scenario on virtual serial ports
+
+    Call inside an installed SimClock. The navigation system plans on a
+    campus graph of the scenario's walkways (no network needed) and runs
+    navigate_route() to the goal; metrics come from the simulated robot,
+    not from the navigation system's own estimate.
+    """
+    from navigation import NavigationSystem, DEFAULT_CONFIG
+
+    projection = local_projection(*scenario.origin)
+    wall_start = time.perf_counter()  # SimClock leaves perf_counter on the wall clock
+    with tempfile.TemporaryDirectory(prefix="robot-sim-") as directory:
+        _build_scenario_graph(scenario, projection, os.path.join(directory, "campus_graph.npz"))
+        simulator = Simulator(scenario, projection, seed)
+
+        # Start from the navigation system's own defaults, pointed at the virtual devices
+        config_file = os.path.join(directory, "robot_config.json")
+        settings = dict(DEFAULT_CONFIG)
+        settings.update({
+            "gps_port": simulator.gps.port,
+            "arduino_port": simulator.arduino.port,
+            "gps_mode": "nmea",
+            "campus_origin": [projection.origin_lat, projection.origin_lon],
+            "campus_graph": os.path.join(directory, "campus_graph.npz"),
+            "cache_file": os.path.join(directory, "robot_cache.sqlite"),
+            "obstacle_map": os.path.join(directory, "obstacle_map.npy"),
+        })
+        settings.update(config or {})
+        with open(config_file, 'w') as f:
+            json.dump(settings, f, indent=4)
+
+        navigation = NavigationSystem("simulated", config_file=config_file)
+        goal = projection.to_geodetic(*scenario.goal)
+        outcome = {}
+        try:
+            # The pose estimator needs a first fix before a route can start
+            deadline = time.monotonic() + 10.0
+            while navigation.state.lat == 0 and time.monotonic() < deadline:
+                time.sleep(0.1)
+
+            start = time.monotonic()
+            path_start = simulator.robot.path_length
+            driver = threading.Thread(target=lambda: outcome.update(done=navigation.navigate_route(goal)),
+                                      name="SimNavigation", daemon=True)
+            driver.start()
+            while driver.is_alive() and time.monotonic() - start < scenario.time_limit:
+                time.sleep(0.1)
+            if driver.is_alive():
+                logger.warning(f"Scenario {scenario.name} hit its {scenario.time_limit:.0f}s limit")
+                navigation.running = False
+                if navigation.scheduler is not None:
+                    navigation.scheduler.stop()
+                driver.join(timeout=5)
+            elapsed = time.monotonic() - start
+        finally:
+            navigation.shutdown()
+            simulator.close()
+
+        final_error = simulator.distance_to(*scenario.goal)
+        tolerance = settings.get("waypoint_radius", 0.0) + GOAL_NOISE_SIGMAS * scenario.gps_noise
+        return ScenarioResult(
+            name=scenario.name,
+            reached=bool(outcome.get("done")) and final_error <= tolerance,
+            completed=bool(outcome.get("done")),
+            time_to_goal=elapsed,
+            path_length=simulator.robot.path_length - path_start,
+            collisions=simulator.robot.collisions,
+            final_error=final_error,
+            gps_fixes=simulator.gps.fixes,
+            gps_dropped=simulator.gps.dropped,
+            wall_time=time.perf_counter() - wall_start,
+        )
+
+
+SCENARIOS = {
+    "open walkway": Scenario("open walkway", start=(0.0, 0.0), goal=(0.0, 40.0)),
+    "bench on the walkway": Scenario("bench on the walkway", start=(0.0, 0.0), goal=(0.0, 40.0),
+                                     circles=((0.0, 18.0, 0.5),)),
+    "hedge and bicycles": Scenario("hedge and bicycles", start=(0.0, 0.0), goal=(0.0, 40.0),
+                                   circles=((-1.0, 12.0, 0.35), (-0.4, 12.0, 0.35), (0.2, 12.0, 0.35),
+                                            (0.6, 24.0, 0.3), (-0.2, 24.6, 0.3)),
+                                   walls=((-3.0, 0.0, -3.0, 40.0), (3.0, 0.0, 3.0, 40.0))),
+    "corner past a building": Scenario("corner past a building", start=(0.0, 0.0), goal=(30.0, 30.0),
+                                       paths=(((0.0, 0.0), (0.0, 30.0), (30.0, 30.0)),),
+                                       walls=((2.0, 0.0, 2.0, 27.0), (2.0, 27.0, 30.0, 27.0))),
+    "gps outage": Scenario("gps outage", start=(0.0, 0.0), goal=(0.0, 40.0), gps_outages=((8.0, 16.0),)),
+}
+
+
+def run_scenarios(scenarios: Sequence[Scenario], speedup: float = SIM_SPEEDUP, config: Optional[Dict] = None,
+                  seed: int = 1) -> List[ScenarioResult]:
+    """Run scenarios one after another on a sped-up clock and print a summary table"""
+    results = []
+    with SimClock(speedup):
+        for scenario in scenarios:
+            results.append(run_scenario(scenario, config, seed))
+            result = results[-1]
+            print(f"{result.name:>24}: {'reached' if result.reached else 'FAILED ':>7} in {result.time_to_goal:6.1f} s, "
+                  f"{result.path_length:5.1f} m driven, {result.collisions} collisions, "
+                  f"{result.final_error:4.1f} m from goal, {result.gps_fixes} fixes ({result.gps_dropped} missing), "
+                  f"{result.time_to_goal / max(result.wall_time, 1e-9):4.1f}x real time")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive the navigation system through simulated scenarios")
+    parser.add_argument("scenarios", nargs="*", metavar="scenario",
+                        help=f"built-in scenario name ({', '.join(SCENARIOS)}) or scenario .json file; default all")
+    parser.add_argument("--speedup", type=float, default=SIM_SPEEDUP, help="simulated seconds per wall-clock second")
+    parser.add_argument("--steering", help="override the steering config (e.g. pid)")
+    parser.add_argument("--avoidance", help="override the obstacle_avoidance config (e.g. vfh)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for sensor noise")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show navigation logs")
+    options = parser.parse_args()
+    logging.getLogger("RobotNavigation").setLevel(logging.INFO if options.verbose else logging.ERROR)
+
+    chosen = []
+    for name in options.scenarios:
+        if name.endswith(".json"):
+            chosen.append(Scenario.load(name))
+        elif name in SCENARIOS:
+            chosen.append(SCENARIOS[name])
+        else:
+            parser.error(f"unknown scenario {name!r}")
+    overrides = {}
+    if options.steering:
+        overrides["steering"] = options.steering
+    if options.avoidance:
+        overrides["obstacle_avoidance"] = options.avoidance
+    run_scenarios(chosen or list(SCENARIOS.values()), options.speedup, overrides, options.seed)
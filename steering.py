@@ -0,0 +1,144 @@
+# steering.py
+
+import math
+from typing import List, Optional, Tuple
+
+from pose_estimator import commanded_motion, wheel_pwm
+
+# Constants
+STEERING_KP = 1.5  # PWM of wheel difference per degree of heading error
+STEERING_KI = 0.1  # PWM per degree-second
+STEERING_KD = 0.08  # PWM per degree/second
+MAX_TURN_PWM = 100  # limit on the PID output (added to one wheel, taken from the other)
+MAX_WHEEL_PWM = 255
+SPIN_IN_PLACE_ERROR = 60.0  # degrees, beyond this the forward component is dropped
+INTEGRAL_LIMIT = 200.0  # degree-seconds, anti-windup clamp
+
+
+def wrap_degrees(angle: float) -> float:
+    """Wrap an angle in degrees to [-180, 180)"""
+    return (angle + 180) % 360 - 180
+
+
+class PIDController:
+    """PID on a scalar error with output clamping and integral anti-windup"""
+
+    def __init__(self, kp: float, ki: float, kd: float, output_limit: float, integral_limit: float):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_limit = output_limit
+        self.integral_limit = integral_limit
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.previous_error: Optional[float] = None
+        self.previous_time: Optional[float] = None
+
+    def update(self, error: float, now: float) -> float:
+        derivative = 0.0
+        if self.previous_time is not None and now > self.previous_time:
+            dt = now - self.previous_time
+            # Only integrate while the output is not saturated by the proportional term alone
+            if abs(self.kp * error) < self.output_limit:
+                self.integral = max(-self.integral_limit, min(self.integral_limit, self.integral + error * dt))
+            derivative = wrap_degrees(error - self.previous_error) / dt
+        self.previous_error = error
+        self.previous_time = now
+        output = self.kp * error + self.ki * self.integral + self.kd * derivative
+        return max(-self.output_limit, min(self.output_limit, output))
+
+
+class HeadingController:
+    """Turns a heading error into continuous left/right wheel PWM
+
+    The PID output is a wheel speed difference: positive error (target to
+    the right) speeds up the left wheel and slows the right one. The
+    forward component fades as the error grows, reaching a spin in place
+    at SPIN_IN_PLACE_ERROR, so the robot follows curves without stopping.
+    """
+
+    def __init__(self, kp: float = STEERING_KP, ki: float = STEERING_KI, kd: float = STEERING_KD,
+                 max_turn: int = MAX_TURN_PWM):
+        self.pid = PIDController(kp, ki, kd, max_turn, INTEGRAL_LIMIT)
+
+    def reset(self):
+        self.pid.reset()
+
+    def update(self, target_bearing: float, heading: float, base_speed: int, now: float) -> Tuple[int, int]:
+        """Wheel PWM (left, right) that steers toward target_bearing"""
+        error = wrap_degrees(target_bearing - heading)
+        turn = self.pid.update(error, now)
+        forward = base_speed * max(0.0, 1.0 - abs(error) / SPIN_IN_PLACE_ERROR)
+        left = forward + turn
+        right = forward - turn
+        # Keep the turn intact when a wheel saturates by shifting both wheels
+        excess = max(abs(left), abs(right)) - MAX_WHEEL_PWM
+        if excess > 0:
+            shift = excess if forward >= 0 else -excess
+            left -= shift
+            right -= shift
+        return int(round(left)), int(round(right))
+
+
+def _simulate(policy, route: List[Tuple[float, float]], dt: float = 0.05, radius: float = 2.0,
+              limit: float = 600.0) -> Tuple[float, float]:
+    """Drive a simulated robot through route; returns (seconds, meters driven)"""
+    x = y = 0.0
+    heading = 0.0
+    t = driven = 0.0
+    pwm = (0, 0)
+    for wx, wy in route:
+        while math.hypot(wx - x, wy - y) > radius and t < limit:
+            bearing = math.degrees(math.atan2(wx - x, wy - y)) % 360
+            pwm = policy(bearing, heading, t, pwm)
+            v, turn_rate = commanded_motion(*pwm)
+            heading = (heading + math.degrees(turn_rate) * dt) % 360
+            x += v * math.sin(math.radians(heading)) * dt
+            y += v * math.cos(math.radians(heading)) * dt
+            driven += abs(v) * dt
+            t += dt
+    return t, driven
+
+
+def compare_steering(speed: int = 100):
+    """Time to drive an S-shaped campus path with bang-bang and PID steering"""
+    route = [(0, 10), (5, 18), (12, 20), (18, 28), (15, 38), (5, 42)]
+
+    # Bang-bang mirrors the old navigate_to_waypoint: stop-spin-stop pulses above 20 degrees,
+    # a fixed 50/100 gentle turn for 0.2 s between 5 and 20 degrees, then a new decision
+    pulse = {"until": 0.0, "queue": []}
+
+    def bang_bang(bearing, heading, t, pwm):
+        if t < pulse["until"]:
+            return pwm
+        if pulse["queue"]:
+            pwm, duration = pulse["queue"].pop(0)
+            pulse["until"] = t + duration
+            return pwm
+        error = wrap_degrees(bearing - heading)
+        if abs(error) > 20:
+            spin = wheel_pwm('R' if error > 0 else 'L', (0,))
+            pulse["queue"] = [(spin, 0.3), ((0, 0), 0.2)]
+            pulse["until"] = t
+            return (0, 0)
+        if abs(error) > 5:
+            pulse["queue"] = [((speed, speed), 0.2)]
+            pulse["until"] = t + 0.2
+            return wheel_pwm('R' if error > 0 else 'L', (100,))
+        pulse["until"] = t + 0.2
+        return speed, speed
+
+    controller = HeadingController()
+
+    def pid(bearing, heading, t, pwm):
+        return controller.update(bearing, heading, speed, t)
+
+    for name, policy in (("bang-bang", bang_bang), ("pid", pid)):
+        seconds, meters = _simulate(policy, route)
+        print(f"{name:>9}: {seconds:6.1f} s to destination, {meters:5.1f} m driven")
+
+
+if __name__ == "__main__":
+    compare_steering()
@@ -0,0 +1,40 @@
+# test_arduino_link.py
+
+import random
+import time
+
+import pytest
+
+import arduino_link
+import navigation
+from simulator import SimRobot, SimWorld, SimulatedArduino
+
+
+@pytest.fixture
+def no_magnetometer(monkeypatch):
+    """Firmware on a board whose magnetometer failed to start, on a virtual serial port"""
+    monkeypatch.setattr(arduino_link, "ARDUINO_RESET_DELAY", 0.0)
+    arduino = SimulatedArduino(SimRobot(0.0, 0.0, 0.0), SimWorld(), random.Random(1), time.monotonic(),
+                               has_magnetometer=False)
+    yield arduino
+    arduino.close()
+
+
+@pytest.mark.parametrize("protocol_mode", ["ascii", "binary"])
+def test_heading_commands_are_rejected_at_once(no_magnetometer, protocol_mode):
+    link = arduino_link.ArduinoLink(port=no_magnetometer.port, protocol_mode=protocol_mode)
+    motors = navigation.MotionController(link=link)
+    try:
+        assert link.binary == (protocol_mode == "binary")
+        start = time.monotonic()
+        request = motors.turn_to_heading(90)
+        request.wait(timeout=arduino_link.REQUEST_TIMEOUT)
+        assert request.rejected
+        # Well inside one request timeout, let alone the three that mark an unanswered command unsupported
+        assert time.monotonic() - start < 0.5
+        assert not motors.supports('G')
+        assert motors.heading_turn_done()
+        # Other commands still work
+        assert link.request('X') == "Stopped"
+    finally:
+        link.close()
@@ -0,0 +1,45 @@
+# test_arduino_protocol.py
+
+from arduino_protocol import (HEADER, MAX_PAYLOAD, MSG_ACK, MSG_SENSOR, PROTOCOL_VERSION, SYNC,
+                              FrameDecoder, encode_frame, encode_sensor)
+
+READING = (120, 45, 300, 90.5, 123456)
+FIELDS = (120, 45, 300, 905, 123456)
+
+
+def test_frame_split_across_reads():
+    frame = encode_sensor(0, *READING)
+    decoder = FrameDecoder()
+    # Byte by byte: nothing until the last CRC byte arrives
+    for byte in frame[:-1]:
+        assert decoder.feed(bytes([byte])) == []
+    assert decoder.feed(frame[-1:]) == [(MSG_SENSOR, 0, FIELDS)]
+    assert decoder.buffer == bytearray() and decoder.discarded_bytes == 0
+
+
+def test_corrupted_crc_is_skipped_and_next_frame_decoded():
+    bad = bytearray(encode_sensor(0, *READING))
+    bad[HEADER.size] ^= 0xFF  # flip a payload byte
+    good = encode_frame(MSG_ACK, 7, b"F\x00")
+    decoder = FrameDecoder()
+    assert decoder.feed(bytes(bad) + good) == [(MSG_ACK, 7, ("F", 0))]
+    assert decoder.crc_errors == 1
+    assert decoder.discarded_bytes == len(bad)
+
+
+def test_leading_garbage_with_sync_bytes():
+    garbage = bytes([0x00, SYNC, 0x13, SYNC, SYNC, 0x7F, 0x42])
+    frame = encode_sensor(0, *READING)
+    decoder = FrameDecoder()
+    assert decoder.feed(garbage + frame) == [(MSG_SENSOR, 0, FIELDS)]
+    assert decoder.discarded_bytes == len(garbage)
+    assert decoder.frames == 1
+
+
+def test_oversized_length_is_not_waited_for():
+    # A header claiming more payload than any frame carries must not stall the decoder
+    bogus = HEADER.pack(SYNC, PROTOCOL_VERSION, MSG_SENSOR, 0, MAX_PAYLOAD + 1)
+    frame = encode_sensor(0, *READING)
+    decoder = FrameDecoder()
+    assert decoder.feed(bogus + frame) == [(MSG_SENSOR, 0, FIELDS)]
+    assert decoder.discarded_bytes == HEADER.size
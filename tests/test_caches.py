@@ -0,0 +1,135 @@
+# test_caches.py
+
+import math
+import time
+
+import polyline
+import pytest
+
+import maps
+from caches import (GEOCODE_NEGATIVE_TTL, GeocodeCache, PersistentCache, RouteCache, directions_profile,
+                    normalize_address, route_cache)
+from geodesy import METERS_PER_DEGREE, SAMPLE_ORIGIN, local_projection
+from route import SIMPLIFY_TOLERANCE
+
+FRAME = local_projection(*SAMPLE_ORIGIN)
+
+
+class Clock:
+    """Stands in for time.time() so expiry can be tested without waiting"""
+
+    def __init__(self, monkeypatch):
+        self.now = time.time()
+        monkeypatch.setattr(time, "time", lambda: self.now)
+
+
+def test_persistent_cache_entries_expire(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    cache = PersistentCache(str(tmp_path / "cache.sqlite"), "items", ttl=60, memory_size=4, max_entries=10)
+    cache.put("default", [1])
+    cache.put("short", [2], ttl=5)
+    clock.now += 10
+    assert cache.get("short") is None and cache.stats.expired == 1
+    assert cache.get("default") == [1]
+    clock.now += 60
+    assert cache.get("default") is None
+    # Entries read back from disk expire too, not just the in-memory copies
+    reopened = PersistentCache(str(tmp_path / "cache.sqlite"), "items", ttl=60, memory_size=4, max_entries=10)
+    assert reopened.get("default") is None
+
+
+def _edge_start(cache):
+    """A start 2 m south of a cell edge, so a start 5 m north of it lands in the next cell"""
+    lat_step = cache.cell_size / METERS_PER_DEGREE
+    lat = (math.floor(SAMPLE_ORIGIN[0] / lat_step) + 1) * lat_step - 2.0 / METERS_PER_DEGREE
+    return lat, SAMPLE_ORIGIN[1]
+
+
+def test_route_cache_finds_a_start_in_the_neighboring_cell(tmp_path):
+    cache = RouteCache(str(tmp_path / "cache.sqlite"))
+    start = _edge_start(cache)
+    east, north = FRAME.to_local(*start)
+    nearby = FRAME.to_geodetic(east, north + 5.0)
+    destination = FRAME.to_geodetic(east, north + 200.0)
+    assert cache.key(start, destination) != cache.key(nearby, destination)
+
+    cache.put(start, destination, [start, destination])
+    assert cache.get(nearby, destination) is not None
+    assert cache.get(FRAME.to_geodetic(east, north + 40.0), destination) is None
+    assert cache.get(start, destination, "other profile") is None
+
+
+def test_route_cache_trims_the_route_to_the_live_position(tmp_path):
+    cache = RouteCache(str(tmp_path / "cache.sqlite"))
+    route = [FRAME.to_geodetic(0.0, north) for north in (0.0, 6.0, 12.0, 100.0)]
+    cache.put(route[0], route[-1], route)
+    # Arriving 7 m along the route: the waypoints behind the robot are dropped
+    waypoints = cache.get(FRAME.to_geodetic(0.5, 7.0), route[-1])
+    assert waypoints == pytest.approx(route[1:])
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def test_maps_and_navigation_share_cached_routes(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "cache.sqlite")
+    # A straight walkway sampled every 5 m over two steps: simplifies to its two ends
+    points = [FRAME.to_geodetic(0.0, 5.0 * i) for i in range(21)]
+    steps = [{"polyline": {"points": polyline.encode(points[:11])}},
+             {"polyline": {"points": polyline.encode(points[10:])}}]
+    requests_made = []
+
+    def fake_get(url, params=None):
+        requests_made.append(url)
+        return FakeResponse({"status": "OK", "routes": [{"legs": [{"steps": steps}]}]})
+
+    monkeypatch.setattr(maps.requests, "get", fake_get)
+    waypoints = maps.get_waypoints("key", points[0], points[-1], cache_file=cache_file)
+    assert len(waypoints) == 2 and len(requests_made) == 1
+
+    # NavigationSystem looks routes up under the same profile for its default tolerance
+    cached = route_cache(cache_file).get(points[0], points[-1], directions_profile(SIMPLIFY_TOLERANCE))
+    assert cached == pytest.approx(waypoints, abs=1e-5)
+    assert maps.get_waypoints("key", points[0], points[-1], cache_file=cache_file) == cached
+    assert len(requests_made) == 1
+
+
+def test_address_spellings_share_one_geocode_entry(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    assert normalize_address("Main Bldg., Rajpur Rd") == normalize_address("main building rajpur road")
+    cache.put("Main Bldg., Rajpur Rd", (30.3165, 78.0322))
+    assert cache.get("MAIN BUILDING  Rajpur Road") == (True, (30.3165, 78.0322))
+
+
+def test_not_found_is_cached_until_its_shorter_ttl(tmp_path, monkeypatch):
+    clock = Clock(monkeypatch)
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    cache.put("the libary", None)
+    assert cache.get("the libary") == (True, None)
+    assert cache.stats.memory_hits == 1
+    clock.now += GEOCODE_NEGATIVE_TTL - 60
+    assert cache.get("the libary") == (True, None)
+    clock.now += 120
+    assert cache.get("the libary") == (False, None)
+    assert cache.stats.expired == 1
+
+
+def test_geocodes_survive_reopening_the_cache_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = GeocodeCache(path)
+    cache.put("Central Library", (12.9716, 77.5946))
+    cache.put("nowhere hall", None)
+    cache.cache.close()
+
+    reopened = GeocodeCache(path)
+    assert reopened.get("central library") == (True, (12.9716, 77.5946))
+    assert reopened.get("Nowhere Hall") == (True, None)
+    assert reopened.stats.disk_hits == 2
+    # Read once from disk, then served from the memory tier
+    reopened.get("central library")
+    assert reopened.stats.memory_hits == 1
@@ -0,0 +1,57 @@
+# test_campus_graph.py
+
+import json
+
+import pytest
+
+from campus_graph import CampusGraph, CampusGraphBuilder, build_campus_graph
+from geodesy import LocalProjection, haversine_distance
+
+# An L of walkways in Bangalore, far from any default origin
+CORNER = (12.9716, 77.5946)
+NORTH_END = (12.9716 + 0.0009, 77.5946)  # about 100 m north
+EAST_END = (12.9716, 77.5946 + 0.0009)  # about 98 m east
+
+
+def _l_shape(projection=None) -> CampusGraphBuilder:
+    builder = CampusGraphBuilder(projection)
+    builder.add_path([NORTH_END, CORNER])
+    builder.add_path([CORNER, EAST_END])
+    return builder
+
+
+def test_builder_anchors_at_the_data():
+    graph = _l_shape().build()
+    assert graph.projection.origin_lat == pytest.approx(12.9716, abs=1e-3)
+    assert graph.projection.origin_lon == pytest.approx(77.5946, abs=1e-3)
+    # Walkway lengths in the graph's frame match the true distances
+    waypoints = graph.plan(NORTH_END, EAST_END)
+    expected = haversine_distance(*NORTH_END, *CORNER) + haversine_distance(*CORNER, *EAST_END)
+    length = sum(haversine_distance(*a, *b) for a, b in zip(waypoints, waypoints[1:]))
+    assert length == pytest.approx(expected, rel=0.01)
+
+
+def test_origin_is_saved_with_the_graph(tmp_path):
+    graph = _l_shape(LocalProjection(*CORNER)).build()
+    graph.save(str(tmp_path / "graph.npz"))
+    loaded = CampusGraph.load(str(tmp_path / "graph.npz"))
+    assert (loaded.projection.origin_lat, loaded.projection.origin_lon) == CORNER
+    assert loaded.xy.ravel().tolist() == pytest.approx(graph.xy.ravel().tolist())
+
+
+def test_build_anchors_at_the_landmarks(tmp_path):
+    paths = {"type": "FeatureCollection", "features": [{"type": "Feature", "geometry": {
+        "type": "LineString", "coordinates": [[p[1], p[0]] for p in (NORTH_END, CORNER, EAST_END)]}}]}
+    landmarks = {"Gate": {"coordinates": list(NORTH_END)}, "Library": {"coordinates": list(EAST_END)}}
+    (tmp_path / "paths.geojson").write_text(json.dumps(paths))
+    (tmp_path / "landmarks.json").write_text(json.dumps(landmarks))
+    graph = build_campus_graph([str(tmp_path / "paths.geojson")], str(tmp_path / "landmarks.json"),
+                               str(tmp_path / "graph.npz"))
+    assert graph.projection.origin_lat == pytest.approx((NORTH_END[0] + EAST_END[0]) / 2)
+    assert graph.projection.origin_lon == pytest.approx((NORTH_END[1] + EAST_END[1]) / 2)
+    assert set(graph.landmark_nodes) == {"Gate", "Library"}
+
+
+def test_nothing_to_build():
+    with pytest.raises(ValueError):
+        CampusGraphBuilder().build()
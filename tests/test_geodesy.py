@@ -0,0 +1,73 @@
+# test_geodesy.py
+
+import json
+import math
+
+import pytest
+
+import navigation
+from geodesy import (EARTH_RADIUS, SAMPLE_ORIGIN, calculate_bearing, centroid, check_accuracy, haversine_distance,
+                     local_projection)
+
+# A leg of about 108 m heading north-east
+LEG = (12.9716, 77.5946, 12.9723, 77.5953)
+
+
+@pytest.mark.parametrize("lat", [0.0, SAMPLE_ORIGIN[0], 30.0, 45.0, 60.0])
+def test_planar_matches_haversine_around_any_origin(lat):
+    errors = check_accuracy(n=2000, origin=(lat, SAMPLE_ORIGIN[1]))
+    assert errors["batched_distance"] < 1e-6
+    assert errors["batched_bearing"] < 1e-6
+    # 500 m pairs within 1.5 km of the origin
+    assert errors["planar_distance"] < 1e-3
+    assert errors["planar_lateral"] < 1e-3
+    # The frame itself only has the documented east-west stretch
+    assert errors["frame_distance"] < 0.01 + 500 * math.tan(math.radians(lat)) * 1500 / EARTH_RADIUS
+    assert errors["round_trip"] < 1e-9
+
+
+def test_distance_bearing_scalars_match_arrays():
+    projection = local_projection(45.0, 7.0)
+    distance, bearing = projection.distance_bearing(45.0, 7.0, 45.003, 7.004)
+    assert isinstance(distance, float) and isinstance(bearing, float)
+    assert distance == pytest.approx(haversine_distance(45.0, 7.0, 45.003, 7.004), abs=1e-3)
+    assert bearing == pytest.approx(calculate_bearing(45.0, 7.0, 45.003, 7.004), abs=1e-6)
+
+
+def test_centroid():
+    assert centroid([(10.0, 70.0), (12.0, 72.0)]) == (11.0, 71.0)
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "robot_config.json"
+    path.write_text(json.dumps({
+        "gps_port": str(tmp_path / "no-gps"), "arduino_port": str(tmp_path / "no-arduino"),
+        "campus_graph": str(tmp_path / "campus_graph.npz"), "cache_file": str(tmp_path / "cache.sqlite"),
+        "obstacle_map": str(tmp_path / "obstacle_map.npy"),
+    }))
+    return str(path)
+
+
+def test_navigation_frame_is_anchored_on_campus(config_file):
+    nav = navigation.NavigationSystem("test", config_file=config_file)
+    try:
+        # Nothing configured: no frame until a fix (or the landmarks) anchor one
+        assert nav.projection is None and nav.obstacle_map is None
+        nav.set_origin(LEG[0], LEG[1], source="first GPS fix")
+        distance, bearing = nav.projection.distance_bearing(*LEG)
+        assert distance == pytest.approx(haversine_distance(*LEG), abs=1e-3)
+        assert bearing == pytest.approx(calculate_bearing(*LEG), abs=1e-6)
+        # A later anchor does not move the frame
+        assert nav.set_origin(30.0, 78.0) is nav.projection
+        assert nav.obstacle_map.projection is nav.projection
+    finally:
+        nav.shutdown()
+
+    with open(config_file) as f:
+        assert json.load(f)["campus_origin"] == [LEG[0], LEG[1]]
+    reopened = navigation.NavigationSystem("test", config_file=config_file)
+    try:
+        assert (reopened.projection.origin_lat, reopened.projection.origin_lon) == (LEG[0], LEG[1])
+    finally:
+        reopened.shutdown()
@@ -0,0 +1,46 @@
+# test_gps_module.py
+
+import json
+import time
+
+import pytest
+
+import navigation
+from nmea import with_checksum
+
+EPOCH = [
+    "GNRMC,083015.00,A,1258.2960,N,07735.6760,E,0.50,45.0,191026,,,A",
+    "GNGGA,083015.00,1258.2960,N,07735.6760,E,1,09,0.9,545.4,M,46.9,M,,",
+]
+
+
+@pytest.fixture
+def nav(tmp_path):
+    path = tmp_path / "robot_config.json"
+    path.write_text(json.dumps({
+        "gps_port": str(tmp_path / "no-gps"), "arduino_port": str(tmp_path / "no-arduino"),
+        "campus_origin": [12.9716, 77.5946],
+        "campus_graph": str(tmp_path / "campus_graph.npz"), "cache_file": str(tmp_path / "cache.sqlite"),
+        "obstacle_map": str(tmp_path / "obstacle_map.npy"),
+    }))
+    system = navigation.NavigationSystem("test", config_file=str(path))
+    yield system
+    system.shutdown()
+
+
+def test_rmc_and_gga_of_one_epoch_update_the_filter_once(nav):
+    updates = []
+    update_gps = nav.pose.update_gps
+    nav.pose.update_gps = lambda fix: (updates.append(fix), update_gps(fix))
+
+    for sentence in EPOCH:
+        nav.gps._handle_item(("nmea", with_checksum(sentence)))
+    deadline = time.monotonic() + 2.0
+    while not updates and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)  # room for a second update, were one coming
+
+    assert len(updates) == 1
+    assert len(nav.gps.gps_data) == 1
+    # The published fix carries the GGA fields of the same epoch
+    assert nav.gps.latest_fix.hdop == 0.9 and nav.gps.latest_fix.speed is not None
@@ -0,0 +1,96 @@
+# test_landmark_index.py
+
+import random
+import string
+import time
+
+import pytest
+
+from landmark_index import LandmarkIndex, normalize_name
+
+CAMPUS = {
+    "Central Library": {"aliases": ["library", "main library"]},
+    "CV Raman Block": {"aliases": ["raman block", "science block"]},
+    "Student Activity Center": {"aliases": ["SAC", "student centre"]},
+    "Main Auditorium": {"aliases": ["auditorium"]},
+    "Food Court": {"aliases": ["canteen", "mess"]},
+    "Admin Block": {},
+    "Sports Complex": {"aliases": ["gym"]},
+}
+
+
+def campus_with_fillers(count: int, seed: int = 5):
+    """CAMPUS plus count made-up landmarks with one alias each"""
+    rng = random.Random(seed)
+    landmarks = dict(CAMPUS)
+    for i in range(count):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9))).title()
+        name = f"{word} {rng.choice(['Hall', 'Block', 'Lab', 'Center', 'Wing', 'Gate'])} {i}"
+        landmarks[name] = {"aliases": [word]}
+    return landmarks
+
+
+@pytest.fixture(scope="module")
+def index():
+    index = LandmarkIndex()
+    index.build(campus_with_fillers(400))
+    return index
+
+
+def test_normalize_joins_spelled_initials():
+    assert normalize_name("Take me to the C V Raman block!") == "cv raman block"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("the libary", "Central Library"),
+    ("main lybrary", "Central Library"),
+    ("C V Raman block", "CV Raman Block"),
+    ("science blok", "CV Raman Block"),
+    ("auditorim", "Main Auditorium"),
+])
+def test_misheard_names_rank_the_right_landmark_first(index, query, expected):
+    matches = index.lookup(query)
+    assert matches[0][0] == expected
+    # Clearly ahead of the runner-up, so best_match is not a coin toss
+    assert len(matches) == 1 or matches[0][1] - matches[1][1] > 0.2
+    assert index.best_match(query) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("take me to the canteen", "Food Court"),
+    ("SAC", "Student Activity Center"),
+    ("gym", "Sports Complex"),
+])
+def test_aliases_match_exactly(index, query, expected):
+    assert index.lookup(query)[0] == (expected, 1.0)
+
+
+def test_unrelated_query_has_no_best_match(index):
+    assert index.best_match("xq") is None
+
+
+def test_build_replaces_previous_landmarks():
+    index = LandmarkIndex()
+    index.build(CAMPUS)
+    index.build({"Food Court": {"aliases": ["canteen"]}})
+    assert len(index) == 1 and "Central Library" not in index
+    assert index.best_match("library") is None
+    assert index.best_match("canteen") == "Food Court"
+
+
+def test_remove_and_readd():
+    index = LandmarkIndex()
+    index.build(CAMPUS)
+    index.remove("Food Court")
+    assert index.best_match("canteen") is None
+    index.add("Food Court", ["canteen"])
+    assert index.best_match("canteen") == "Food Court"
+
+
+def test_lookup_is_sub_millisecond(index):
+    assert len(index) > 400
+    queries = ["the libary", "C V Raman block", "auditorim", "science blok", "canteen"] * 100
+    start = time.perf_counter()
+    for query in queries:
+        index.lookup(query)
+    assert (time.perf_counter() - start) / len(queries) < 1e-3
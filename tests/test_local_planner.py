@@ -0,0 +1,34 @@
+# test_local_planner.py
+
+import pytest
+
+from local_planner import ENCOUNTER_SCENARIOS, compare_encounters
+
+MAX_SPEED = 0.4  # m/s at full PWM (pose_estimator.MPS_PER_PWM * 100)
+FREE_RUN = 29.0  # m driven from the origin to within 1 m of the goal
+MAX_LOST_PER_ENCOUNTER = 2.5  # s, mean over all scenarios
+MAX_LOST_PER_SCENARIO = 4.5  # s, the worst single scenario (the hedge)
+
+
+@pytest.fixture(scope="module")
+def results():
+    return compare_encounters()
+
+
+def test_free_run_drives_at_full_speed(results):
+    assert results["free"]["planner"] <= FREE_RUN / MAX_SPEED * 1.02
+
+
+@pytest.mark.parametrize("scenario", list(ENCOUNTER_SCENARIOS))
+def test_planner_gets_past_obstacle_quickly(results, scenario):
+    lost, meters, collisions, reached = results["scenarios"][scenario]["planner"]
+    assert reached
+    assert collisions == 0
+    assert lost <= MAX_LOST_PER_SCENARIO
+    assert meters <= FREE_RUN * 1.05
+
+
+def test_planner_loses_less_time_than_reactive_maneuvers(results):
+    per_encounter = results["per_encounter"]
+    assert per_encounter["planner"] <= MAX_LOST_PER_ENCOUNTER
+    assert per_encounter["planner"] < per_encounter["reactive"]
@@ -0,0 +1,50 @@
+# test_obstacle_map.py
+
+import logging
+import time
+
+import numpy as np
+import pytest
+
+from geodesy import LocalProjection
+from obstacle_map import MAP_CELL_SIZE, MAP_SIZE, ObstacleMap
+
+
+@pytest.fixture
+def obstacle_map(tmp_path):
+    obstacle_map = ObstacleMap(str(tmp_path / "map.npy"), LocalProjection(12.9716, 77.5946))
+    yield obstacle_map
+    obstacle_map.close()
+
+
+def test_remembers_obstacles_around_its_origin(obstacle_map):
+    # A bench 1 m north of the robot, echoed on three visits ten minutes apart
+    for visit in range(3):
+        obstacle_map.observe(40.0, -25.0, [(0.0, 100.0)], now=time.time() + 600 * visit)
+    cells, strength = obstacle_map.occupied_near(40.0, -24.0, 1.0)
+    assert len(cells) == 1
+    assert np.hypot(cells[0, 0] - 40.0, cells[0, 1] + 24.0) <= MAP_CELL_SIZE
+    assert strength[0] > 0
+
+
+def test_survives_a_reload(tmp_path):
+    projection = LocalProjection(12.9716, 77.5946)
+    first = ObstacleMap(str(tmp_path / "map.npy"), projection)
+    for visit in range(3):
+        first.observe(0.0, 0.0, [(90.0, 150.0)], now=time.time() + 600 * visit)
+    first.close()
+    second = ObstacleMap(str(tmp_path / "map.npy"), projection)
+    assert len(second.occupied_near(1.5, 0.0, 1.0)[0]) == 1
+    # A map saved around another origin is not reused in this frame
+    moved = ObstacleMap(str(tmp_path / "map.npy"), LocalProjection(12.98, 77.60))
+    assert len(moved.occupied_cells()[0]) == 0
+
+
+def test_warns_once_when_off_the_map(obstacle_map, caplog):
+    far = MAP_SIZE * MAP_CELL_SIZE  # a full map width from the origin
+    with caplog.at_level(logging.WARNING, logger="RobotNavigation"):
+        for _ in range(5):
+            obstacle_map.observe(far, 0.0, [(0.0, 100.0)])
+    warnings = [r for r in caplog.records if "outside the obstacle map" in r.getMessage()]
+    assert len(warnings) == 1
+    assert obstacle_map.bounds is None
@@ -0,0 +1,76 @@
+# test_pose_estimator.py
+
+import math
+import random
+
+import pytest
+
+from geodesy import SAMPLE_ORIGIN, LocalProjection
+from nmea import GPSFix
+from pose_estimator import GPS_UERE, PoseEstimator
+
+FRAME = LocalProjection(*SAMPLE_ORIGIN)
+
+
+def _fix(t, east, north, sigma=2.0, utc=None, speed=None, course=None):
+    fix = GPSFix()
+    fix.t = t
+    fix.utc = f"{t:09.2f}" if utc is None else utc
+    fix.valid = True
+    fix.lat, fix.lon = FRAME.to_geodetic(east, north)
+    fix.hdop = sigma * math.sqrt(2) / GPS_UERE
+    fix.speed = speed
+    fix.course = course
+    return fix
+
+
+def _position(estimator, t):
+    pose = estimator.pose(t)
+    return FRAME.to_local(pose.lat, pose.lon)
+
+
+def _converged(seconds=30):
+    rng = random.Random(3)
+    estimator = PoseEstimator()
+    for t in range(seconds):
+        estimator.update_gps(_fix(float(t), 10.0 + rng.gauss(0, 2.0), 20.0 + rng.gauss(0, 2.0), speed=0.0))
+    return estimator, float(seconds - 1)
+
+
+def test_converges_to_a_stationary_fix():
+    estimator, t = _converged()
+    east, north = _position(estimator, t)
+    sigma = estimator.position_uncertainty(t)
+    # Averaging fixes of 2 m per axis (2.8 m radius) beats any single one
+    assert sigma < 1.5
+    assert math.hypot(east - 10.0, north - 20.0) < 3 * sigma
+    assert estimator.rejections["gps"] == 0
+
+
+def test_uncertainty_grows_while_dead_reckoning_through_a_gap():
+    estimator, t = _converged()
+    estimator.set_command('F', (100,), t)
+    sigmas = [estimator.position_uncertainty(t + dt) for dt in (0.0, 2.0, 5.0, 10.0)]
+    assert sigmas == sorted(sigmas) and sigmas[-1] > 2 * sigmas[0]
+    # A fix after the gap pulls it back down
+    estimator.update_gps(_fix(t + 11.0, 10.0, 24.0))
+    assert estimator.position_uncertainty(t + 11.0) < sigmas[-1]
+
+
+def test_outlier_fix_is_rejected():
+    estimator, t = _converged()
+    before = _position(estimator, t + 1)
+    estimator.update_gps(_fix(t + 1, 60.0, 20.0))  # a 50 m multipath jump
+    assert estimator.rejections["gps"] == 1
+    after = _position(estimator, t + 1)
+    assert after == pytest.approx(before, abs=0.05)
+
+
+def test_same_epoch_is_fused_once():
+    estimator, t = _converged()
+    sigma = estimator.position_uncertainty(t + 1)
+    estimator.update_gps(_fix(t + 1, 10.0, 20.0, utc="083015.00"))
+    once = estimator.position_uncertainty(t + 1)
+    estimator.update_gps(_fix(t + 1, 10.0, 20.0, utc="083015.00"))
+    assert once < sigma
+    assert estimator.position_uncertainty(t + 1) == once
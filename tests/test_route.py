@@ -0,0 +1,166 @@
+# test_route.py
+
+import math
+import sys
+
+import numpy as np
+import pytest
+
+from geodesy import LocalProjection
+from route import (REACQUIRE_DISTANCE, PlannedRoute, Route, RouteProgress, _synthetic_route, project_points,
+                   segment_distances, simplify_indices, simplify_route)
+
+PROJECTION = LocalProjection(12.9716, 77.5946)
+
+
+def at(east, north):
+    """Lat/lon of a point in PROJECTION's east/north meters"""
+    return PROJECTION.to_geodetic(east, north)
+
+
+def l_route(step=10.0):
+    """100 m north then 100 m east, a waypoint every step meters"""
+    legs = [(0.0, n) for n in np.arange(0.0, 100.0, step)] + [(e, 100.0) for e in np.arange(0.0, 100.0 + step, step)]
+    return Route([at(e, n) for e, n in legs], PROJECTION)
+
+
+def line_distance(p, a, b):
+    """The old simplifier's distance: perpendicular to the infinite line through a and b"""
+    if a == b:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    cross = abs((b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0]))
+    return cross / math.hypot(b[0] - a[0], b[1] - a[1])
+
+
+def segment_distance(p, a, b):
+    """Distance to the segment a-b, clamped at its ends like segment_distances()"""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else min(max(((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length_sq, 0.0), 1.0)
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def recursive_simplify(points, tolerance, distance):
+    """The recursive Douglas-Peucker the iterative one replaced, on projected points"""
+    kept = [0]
+
+    def simplify(start, end):
+        max_dist, max_idx = 0, start
+        for i in range(start + 1, end):
+            dist = distance(points[i], points[start], points[end])
+            if dist > max_dist:
+                max_dist, max_idx = dist, i
+        if max_dist > tolerance:
+            simplify(start, max_idx)
+            kept.append(max_idx)
+            simplify(max_idx, end)
+
+    simplify(0, len(points) - 1)
+    kept.append(len(points) - 1)
+    return sorted(kept)
+
+
+def test_matches_old_recursive_result_on_a_gentle_curve():
+    # Never doubles back, so clamping to the segment makes no difference
+    east = np.linspace(0, 400, 300)
+    xy = np.column_stack((east, 6 * np.sin(east / 40)))
+    points = [tuple(p) for p in xy.tolist()]
+    for tolerance in (0.2, 1.0, 3.0):
+        expected = recursive_simplify(points, tolerance, line_distance)
+        assert simplify_indices(xy, tolerance) == expected
+        assert 2 < len(expected) < len(points)
+
+
+def test_matches_recursive_reference_on_a_winding_route():
+    xy = project_points(_synthetic_route(800))
+    points = [tuple(p) for p in xy.tolist()]
+    assert simplify_indices(xy, 1.0) == recursive_simplify(points, 1.0, segment_distance)
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 1.0, 5.0])
+def test_tolerance_is_in_meters(tolerance):
+    points = _synthetic_route(2000)
+    keep = simplify_route(points, tolerance)
+    xy = project_points(points)
+    worst = max(float(segment_distances(xy, a, b).max()) for a, b in zip(keep, keep[1:]) if b - a > 1)
+    assert worst <= tolerance
+    # The same shape far from the equator keeps the same points: no degree-based epsilon
+    shape = project_points(points)
+    north_projection = LocalProjection(60.0, 10.0)
+    lat, lon = north_projection.to_geodetic(shape[:, 0], shape[:, 1])
+    assert simplify_route(list(zip(lat.tolist(), lon.tolist())), tolerance) == keep
+
+
+def test_bump_kept_only_above_tolerance():
+    xy = np.array([[0.0, 0.0], [50.0, 0.0], [51.0, 2.0], [52.0, 0.0], [100.0, 0.0]])
+    assert simplify_indices(xy, 1.0) == [0, 1, 2, 3, 4]
+    assert simplify_indices(xy, 2.5) == [0, 4]
+
+
+def test_route_that_doubles_back_keeps_its_turn():
+    xy = np.array([[0.0, 0.0], [10.0, 0.0], [20.0, 0.0], [10.0, 0.5], [5.0, 0.0]])
+    assert 2 in simplify_indices(xy, 1.0)
+
+
+def test_zigzag_deeper_than_recursion_limit():
+    n = sys.getrecursionlimit() + 500
+    xy = np.column_stack((np.arange(n, dtype=float), 5.0 * (np.arange(n) % 2)))
+    assert simplify_indices(xy, 1.0) == list(range(n))
+
+
+def test_route_geometry():
+    route = l_route()
+    assert route.length == pytest.approx(200.0)
+    assert route.remaining_from(10) == pytest.approx(100.0)
+    assert route.segment_headings[0] == pytest.approx(0.0)
+    assert route.segment_headings[-1] == pytest.approx(90.0)
+    assert PROJECTION.to_local(*route.point_at(150.0)) == pytest.approx((50.0, 100.0))
+
+
+def test_progress_along_and_across_the_l():
+    progress = RouteProgress(l_route())
+    # Right of a northbound leg is east
+    progress.update(*at(3.0, 45.0))
+    assert progress.along_track == pytest.approx(45.0)
+    assert progress.cross_track == pytest.approx(3.0)
+    assert progress.segment_heading == pytest.approx(0.0)
+    # Right of an eastbound leg is south, so north of it is negative
+    for north in np.arange(50.0, 100.0, 5.0):
+        progress.update(*at(0.0, north))
+    progress.update(*at(30.0, 102.0))
+    assert progress.along_track == pytest.approx(130.0)
+    assert progress.cross_track == pytest.approx(-2.0)
+    assert progress.remaining == pytest.approx(70.0)
+    assert progress.passed(10) and not progress.passed(14)
+    assert progress.reacquisitions == 0
+
+
+def test_progress_reacquires_after_a_jump():
+    progress = RouteProgress(l_route())
+    progress.update(*at(0.0, 5.0))
+    # Within REACQUIRE_DISTANCE of the active segments: followed without a full search
+    progress.update(*at(REACQUIRE_DISTANCE - 1, 12.0))
+    assert progress.reacquisitions == 0 and progress.segment == 1
+    # Far down the route, beyond the search window
+    progress.update(*at(85.0, 99.0))
+    assert progress.reacquisitions == 1
+    assert progress.segment == 18
+    assert progress.along_track == pytest.approx(185.0)
+    assert progress.cross_track == pytest.approx(1.0)
+    # Back near the start (a GPS glitch) is found again too
+    progress.update(*at(1.0, 20.0))
+    assert progress.reacquisitions == 2 and progress.along_track == pytest.approx(20.0)
+
+
+def test_trimmed_to_starts_at_the_nearest_waypoint():
+    route = l_route()
+    plan = PlannedRoute(route.waypoints[0], "library", route, planned_at=12.0)
+    assert plan.trimmed_to(at(1.0, 2.0)) is plan
+
+    position = at(2.0, 62.0)
+    trimmed = plan.trimmed_to(position)
+    assert trimmed.waypoints == route.waypoints[6:]
+    assert trimmed.start == position
+    assert (trimmed.destination, trimmed.planned_at) == ("library", 12.0)
+    assert trimmed.route.projection is route.projection
+    assert trimmed.route.length == pytest.approx(140.0)
@@ -0,0 +1,53 @@
+# test_sensor_history.py
+
+import statistics
+import threading
+
+from sensor_history import RingBuffer
+
+
+def test_window_median_matches_statistics():
+    buffer = RingBuffer(capacity=16)
+    values = [5.0, 1.0, 9.0, 3.0, 7.0, 2.0, 8.0, 4.0, 6.0, 0.0, 11.0, 10.0]
+    for t, value in enumerate(values):
+        buffer.append(value, t=float(t))
+    now = float(len(values) - 1)
+    for window in range(len(values)):
+        expected = statistics.median(values[len(values) - 1 - window:])
+        assert buffer.window_median(float(window), now) == expected
+
+
+def test_concurrent_window_medians_do_not_interfere():
+    # Two channels' worth of readers hammer the same buffer with different
+    # windows; a shared scratch array would mix their partial quickselects
+    buffer = RingBuffer(capacity=256)
+    for t in range(256):
+        buffer.append(float((t * 37) % 256), t=float(t))
+    now = 255.0
+    windows = [10.0, 51.0, 100.0, 255.0]
+    expected = {w: buffer.window_median(w, now) for w in windows}
+    errors = []
+
+    def reader(window):
+        for _ in range(300):
+            result = buffer.window_median(window, now)
+            if result != expected[window]:
+                errors.append((window, result))
+                return
+
+    threads = [threading.Thread(target=reader, args=(w,)) for w in windows for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_window_median_reuses_its_scratch_array():
+    buffer = RingBuffer(capacity=64)
+    for t in range(64):
+        buffer.append(float(t), t=float(t))
+    buffer.window_median(10.0, 63.0)
+    scratch = buffer._scratch()
+    buffer.window_median(63.0, 63.0)
+    assert buffer._scratch() is scratch and len(scratch) == 64
@@ -0,0 +1,40 @@
+# test_simulator.py
+
+import dataclasses
+import math
+
+import pytest
+
+from navigation import MAX_SPEED
+from pose_estimator import WHEEL_SPEED_PER_PWM
+from simulator import SCENARIOS, SimClock, run_scenario
+
+SPEEDUP = 10.0  # simulated seconds per wall-clock second
+GPS_NOISE = 0.3  # m, 1-sigma; a good receiver, so the arrival check can be tight
+WAYPOINT_RADIUS = 1.0  # m
+GOAL_TOLERANCE = WAYPOINT_RADIUS + 3 * GPS_NOISE  # m from the true goal; 3 sigmas covers 99% of 2-D fixes
+TIME_MARGIN = 1.15  # allowed time over driving the whole route at full speed
+START_TIME = 5.0  # s to plan the route and get moving
+ENCOUNTER_TIME = 10.0  # s allowed per obstacle the robot has to steer around
+ENCOUNTERS = {"bench on the walkway": 1, "hedge and bicycles": 2}
+
+
+def _route_length(scenario):
+    path = (scenario.paths or ((scenario.start, scenario.goal),))[0]
+    return sum(math.dist(a, b) for a, b in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize("name", list(SCENARIOS))
+def test_scenario_reaches_goal(name):
+    scenario = dataclasses.replace(SCENARIOS[name], gps_noise=GPS_NOISE)
+    with SimClock(SPEEDUP):
+        result = run_scenario(scenario, {"waypoint_radius": WAYPOINT_RADIUS})
+
+    assert result.completed
+    assert result.final_error <= GOAL_TOLERANCE
+    assert result.collisions == 0
+    length = _route_length(scenario)
+    limit = length / (MAX_SPEED * WHEEL_SPEED_PER_PWM) * TIME_MARGIN + START_TIME \
+        + ENCOUNTERS.get(name, 0) * ENCOUNTER_TIME
+    assert result.time_to_goal <= limit
+    assert result.path_length <= length * 1.05
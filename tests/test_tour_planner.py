@@ -0,0 +1,86 @@
+# test_tour_planner.py
+
+import numpy as np
+import pytest
+
+from geodesy import SAMPLE_ORIGIN, local_projection
+from tour_planner import _brute_force, optimize_tour, plan_order, tour_length
+
+FRAME = local_projection(*SAMPLE_ORIGIN)
+PINS = [(None, None), ("start", None), ("start", "end"), (None, "end")]
+
+
+def _matrix(rng, n):
+    xy = rng.uniform(0, 800, (n, 2))
+    return np.hypot(xy[:, None, 0] - xy[None, :, 0], xy[:, None, 1] - xy[None, :, 1])
+
+
+def _pins(n, pins):
+    return (0 if pins[0] else None), (n - 1 if pins[1] else None)
+
+
+@pytest.mark.parametrize("pins", PINS)
+@pytest.mark.parametrize("n", [3, 4, 5])
+def test_plan_order_is_optimal_on_small_instances(n, pins):
+    rng = np.random.default_rng(n)
+    start, end = _pins(n, pins)
+    for _ in range(30):
+        matrix = _matrix(rng, n)
+        order = plan_order(matrix, start, end)
+        assert sorted(order) == list(range(n))
+        assert tour_length(order, matrix) == pytest.approx(_brute_force(matrix, start, end))
+
+
+@pytest.mark.parametrize("pins", PINS)
+def test_plan_order_is_near_optimal_on_seven_stops(pins):
+    rng = np.random.default_rng(7)
+    start, end = _pins(7, pins)
+    gaps = []
+    for _ in range(30):
+        matrix = _matrix(rng, 7)
+        order = plan_order(matrix, start, end)
+        assert start is None or order[0] == start
+        assert end is None or order[-1] == end
+        gaps.append(tour_length(order, matrix) / _brute_force(matrix, start, end) - 1)
+    assert np.mean(gaps) < 0.01 and max(gaps) < 0.10
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+@pytest.mark.parametrize("pins", PINS)
+def test_plan_order_with_at_most_two_stops(n, pins):
+    matrix = np.array([[0.0, 5.0], [5.0, 0.0]])[:n, :n]
+    start, end = _pins(n, pins) if n else (None, None)
+    order = plan_order(matrix, start, end)
+    assert sorted(order) == list(range(n))
+    assert start is None or order[0] == start
+    assert end is None or order[-1] == end
+    # Pinning the second node at either end turns the pair around
+    if n == 2:
+        assert plan_order(matrix, start=1) == [1, 0]
+        assert plan_order(matrix, end=0) == [1, 0]
+
+
+def _stops(rng, n):
+    return [FRAME.to_geodetic(*rng.uniform(0, 800, 2)) for _ in range(n)]
+
+
+@pytest.mark.parametrize("with_position", [False, True])
+@pytest.mark.parametrize("keep_first,keep_last", [(False, False), (True, False), (False, True), (True, True)])
+def test_optimize_tour_keeps_pinned_stops(keep_first, keep_last, with_position):
+    rng = np.random.default_rng(3)
+    for n in (2, 3, 6):
+        stops = _stops(rng, n)
+        position = FRAME.to_geodetic(400.0, -50.0) if with_position else None
+        plan = optimize_tour(stops, position, keep_first=keep_first, keep_last=keep_last)
+        assert sorted(plan.order) == list(range(n))
+        assert not keep_first or plan.order[0] == 0
+        assert not keep_last or plan.order[-1] == n - 1
+        assert plan.saved_seconds >= 0
+
+
+def test_optimize_tour_never_makes_the_tour_longer():
+    rng = np.random.default_rng(11)
+    for _ in range(40):
+        plan = optimize_tour(_stops(rng, 7), keep_last=True)
+        assert plan.length <= plan.original_length + 1e-9
+        assert plan.saved_seconds >= 0
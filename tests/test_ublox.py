@@ -0,0 +1,175 @@
+# test_ublox.py
+
+import struct
+import threading
+import time
+
+import pytest
+
+import navigation
+import ublox
+from nmea import with_checksum
+from ublox import (ACK_ACK, CFG_MSG, CFG_PRT, CLS_ACK, CLS_CFG, CLS_NAV, CLS_NMEA, NAV_PVT,
+                   UBXStreamDecoder, encode_nav_pvt, ubx_frame)
+
+NMEA_EPOCH = (with_checksum("GNRMC,123519.00,A,3016.51200,N,07802.63400,E,0.10,45.0,191026,,,A") + "\r\n" +
+              with_checksum("GNGGA,123519.00,3016.51200,N,07802.63400,E,1,09,0.9,545.4,M,46.9,M,,") + "\r\n")
+EPOCH_INTERVAL = 0.05  # seconds between simulated receiver outputs
+
+
+class FakeReceiver:
+    """Serial port with a NEO-M8N behind it: NMEA at 9600 baud until reconfigured over UBX
+
+    With speaks_ubx False it behaves like a plain NMEA receiver that ignores
+    every UBX message. Bytes sent or read at a baud the receiver is not using
+    turn into line noise, as on a real UART.
+    """
+
+    def __init__(self, speaks_ubx: bool = True, receiver_baud: int = 9600):
+        self.speaks_ubx = speaks_ubx
+        self.receiver_baud = receiver_baud
+        self.baudrate = 9600
+        self.timeout = 1
+        self.nmea_enabled = True
+        self.pvt_enabled = False
+        self.decoder = UBXStreamDecoder()
+        self.output = bytearray()
+        self.last_epoch = 0.0
+        self.lock = threading.Lock()
+
+    # serial.Serial interface used by GPSModule and UbloxConfigurator
+    def write(self, data: bytes):
+        with self.lock:
+            if self.baudrate != self.receiver_baud or not self.speaks_ubx:
+                return len(data)
+            for item in self.decoder.feed(data):
+                if item[0] == "ubx" and item[1] == CLS_CFG:
+                    self._configure(item[2], item[3])
+        return len(data)
+
+    def _configure(self, msg_id: int, payload: bytes):
+        ack = ubx_frame(CLS_ACK, ACK_ACK, bytes((CLS_CFG, msg_id)))
+        if msg_id == CFG_PRT:
+            self.receiver_baud = struct.unpack_from("<I", payload, 8)[0]  # switches before answering
+        elif msg_id == CFG_MSG:
+            msg_class, msg, rate = payload[:3]
+            if (msg_class, msg) == (CLS_NAV, NAV_PVT):
+                self.pvt_enabled = rate > 0
+            elif msg_class == CLS_NMEA:
+                self.nmea_enabled = False
+        self.output += ack
+
+    def _produce(self):
+        now = time.monotonic()
+        if now - self.last_epoch < EPOCH_INTERVAL:
+            return
+        self.last_epoch = now
+        if self.nmea_enabled:
+            self.output += NMEA_EPOCH.encode()
+        if self.pvt_enabled:
+            self.output += encode_nav_pvt(30.2752, 78.0439, speed=0.5, heading=45.0)
+
+    @property
+    def in_waiting(self) -> int:
+        with self.lock:
+            self._produce()
+            return len(self.output)
+
+    def read(self, size: int = 1) -> bytes:
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                self._produce()
+                if self.output:
+                    data = bytes(self.output[:size])
+                    del self.output[:size]
+                    return data if self.baudrate == self.receiver_baud else bytes(0x80 | b for b in data)
+            time.sleep(0.005)
+        return b""
+
+    def readline(self) -> bytes:
+        line = b""
+        while not line.endswith(b"\n"):
+            data = self.read(1)
+            if not data:
+                break
+            line += data
+        return line
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self.lock:
+            self.output.clear()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_port(monkeypatch):
+    """Make GPSModule open a FakeReceiver; the test sets its behaviour"""
+    ports = {}
+
+    def open_port(port, baud, timeout=1):
+        receiver = ports["receiver"]
+        receiver.baudrate = baud
+        return receiver
+
+    monkeypatch.setattr(navigation.serial, "Serial", open_port)
+    monkeypatch.setattr(ublox, "ACK_TIMEOUT", 0.3)
+    monkeypatch.setattr(ublox, "PVT_TIMEOUT", 0.5)
+    return ports
+
+
+def _first_valid_fix(gps: navigation.GPSModule, since: float = 0.0, timeout: float = 5.0):
+    """First valid fix published after `since` (time.monotonic())"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        gps.wait_for_fix(0.2)
+        fix = gps.latest_fix
+        if fix is not None and fix.valid and fix.t > since:
+            return fix
+    return None
+
+
+def test_configures_nav_pvt(fake_port):
+    fake_port["receiver"] = FakeReceiver()
+    gps = navigation.GPSModule(mode="ubx", rate_hz=5)
+    try:
+        assert _first_valid_fix(gps) is not None
+        assert gps.ubx_active
+        assert gps.ser.baudrate == navigation.GPS_UBX_BAUD
+        # Sentences read before NMEA was switched off have been replayed by now
+        fix = _first_valid_fix(gps, since=time.monotonic() + 0.2)
+        assert fix is not None and fix.talker == "UBX"
+        assert fix.lat == pytest.approx(30.2752) and fix.lon == pytest.approx(78.0439)
+    finally:
+        gps.close()
+
+
+def test_falls_back_to_nmea_at_the_receiver_baud(fake_port):
+    fake_port["receiver"] = FakeReceiver(speaks_ubx=False)
+    gps = navigation.GPSModule(mode="ubx", rate_hz=5)
+    try:
+        time.sleep(3 * ublox.ACK_TIMEOUT + ublox.PVT_TIMEOUT)  # both configuration attempts have failed
+        assert not gps.ubx_active
+        assert gps.ser.baudrate == 9600
+        fix = _first_valid_fix(gps, since=time.monotonic())
+        assert fix is not None and fix.talker == "GN"
+        assert fix.lat == pytest.approx(30.2752) and fix.lon == pytest.approx(78.0439)
+    finally:
+        gps.close()
+
+
+def test_recorded_stream_round_trip():
+    frames = [encode_nav_pvt(30.2752 + i * 1e-6, 78.0439, speed=1.2, heading=45.0, itow=i * 200) for i in range(50)]
+    stream = NMEA_EPOCH.encode().join(frames)
+    decoder = UBXStreamDecoder()
+    items = [item for i in range(0, len(stream), 37) for item in decoder.feed(stream[i:i + 37])]
+    fixes = [ublox.nav_pvt_to_fix(item[3]) for item in items if item[0] == "ubx"]
+    assert len(fixes) == 50 and decoder.checksum_errors == 0
+    assert sum(item[0] == "nmea" for item in items) == 2 * 49
+    assert fixes[-1].lat == pytest.approx(30.2752 + 49e-6)
+    assert fixes[0].speed == pytest.approx(1.2) and fixes[0].course == pytest.approx(45.0)
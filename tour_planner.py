@@ -0,0 +1,231 @@
+# tour_planner.py
+
+import time
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import haversine_distances
+from pose_estimator import WHEEL_SPEED_PER_PWM
+
+logger = logging.getLogger("RobotNavigation")
+
+# Constants
+TOUR_SPEED = 100 * WHEEL_SPEED_PER_PWM  # m/s, cruising at the default MAX_SPEED PWM
+OR_OPT_SEGMENT = 3  # longest run of consecutive stops Or-opt moves at once
+
+
+@dataclass(frozen=True)
+class TourPlan:
+    """Visiting order chosen by optimize_tour and what it saves"""
+    order: List[int]  # indices into the stops as given
+    length: float  # meters, optimized order
+    original_length: float  # meters, order as given
+    speed: float  # m/s used for the time estimates
+
+    @property
+    def saved_meters(self) -> float:
+        return self.original_length - self.length
+
+    @property
+    def saved_seconds(self) -> float:
+        return self.saved_meters / self.speed if self.speed > 0 else 0.0
+
+
+def distance_matrix(points: Sequence[Tuple[float, float]], graph=None) -> np.ndarray:
+    """Symmetric matrix of travel distances in meters between lat/lon points
+
+    Pairs the campus graph can route use the walkway path length (plus the
+    walk to and from the graph); all others use the haversine distance.
+    """
+    coords = np.asarray(points, dtype=float).reshape(-1, 2)
+    matrix = haversine_distances(coords[:, None, 0], coords[:, None, 1], coords[None, :, 0], coords[None, :, 1])
+    if graph is None or len(coords) < 2:
+        return matrix
+
+    snapped = [graph.nearest_node(*graph.projection.to_local(lat, lon)) for lat, lon in coords.tolist()]
+    for i, (source, source_offset) in enumerate(snapped):
+        distances = graph.distances_from(source)
+        for j, (target, target_offset) in enumerate(snapped):
+            if i != j and target in distances:
+                matrix[i, j] = source_offset + distances[target] + target_offset
+    # Both directions of a walkway are the same length; average away snapping asymmetry
+    return (matrix + matrix.T) / 2
+
+
+def tour_length(order: Sequence[int], matrix: np.ndarray) -> float:
+    """Length of an open path visiting nodes in order"""
+    return float(sum(matrix[a, b] for a, b in zip(order, order[1:])))
+
+
+def nearest_neighbour(matrix: np.ndarray, start: Optional[int] = None, end: Optional[int] = None) -> List[int]:
+    """Greedy open path over every node: always move to the closest unvisited one"""
+    n = len(matrix)
+    if start is not None:
+        current = start
+    else:
+        # Start from the most central node, which cannot be the pinned end
+        centrality = matrix.sum(axis=1)
+        if end is not None and n > 1:
+            centrality[end] = np.inf
+        current = int(np.argmin(centrality))
+    order = [current]
+    remaining = set(range(n)) - {current}
+    if end is not None and end != current:
+        remaining.discard(end)
+    while remaining:
+        current = min(remaining, key=lambda j: matrix[current, j])
+        order.append(current)
+        remaining.discard(current)
+    if end is not None and end != order[0]:
+        order.append(end)
+    return order
+
+
+def two_opt(order: List[int], matrix: np.ndarray, fix_start: bool, fix_end: bool) -> List[int]:
+    """Reverse sub-paths while that shortens the open path; fixed ends never move"""
+    order = list(order)
+    n = len(order)
+    first = 1 if fix_start else 0
+    last = n - 2 if fix_end else n - 1
+    improved = True
+    while improved:
+        improved = False
+        for i in range(first, last):
+            for j in range(i + 1, last + 1):
+                before = order[i - 1] if i > 0 else None
+                after = order[j + 1] if j + 1 < n else None
+                old = (matrix[before, order[i]] if before is not None else 0.0) + \
+                      (matrix[order[j], after] if after is not None else 0.0)
+                new = (matrix[before, order[j]] if before is not None else 0.0) + \
+                      (matrix[order[i], after] if after is not None else 0.0)
+                if new < old - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+    return order
+
+
+def or_opt(order: List[int], matrix: np.ndarray, fix_start: bool, fix_end: bool) -> List[int]:
+    """Move runs of up to OR_OPT_SEGMENT stops (either way round) to wherever they fit best"""
+    order = list(order)
+    first = 1 if fix_start else 0
+    improved = True
+    while improved:
+        improved = False
+        n = len(order)
+        last = n - 2 if fix_end else n - 1
+        for size in range(1, OR_OPT_SEGMENT + 1):
+            for i in range(first, last - size + 2):
+                segment = order[i:i + size]
+                rest = order[:i] + order[i + size:]
+                current = tour_length(order, matrix)
+                best_length, best_order = current, None
+                # Insert before rest[k]; fixed ends stay at the ends of rest
+                for k in range(first, len(rest) - (1 if fix_end else 0) + 1):
+                    if k == i:
+                        continue
+                    for candidate in (segment, segment[::-1]):
+                        trial = rest[:k] + candidate + rest[k:]
+                        length = tour_length(trial, matrix)
+                        if length < best_length - 1e-9:
+                            best_length, best_order = length, trial
+                if best_order is not None:
+                    order = best_order
+                    improved = True
+                    break
+            if improved:
+                break
+    return order
+
+
+def plan_order(matrix: np.ndarray, start: Optional[int] = None, end: Optional[int] = None) -> List[int]:
+    """Short open path over all nodes: nearest neighbour, then 2-opt and Or-opt until neither helps"""
+    if len(matrix) <= 2:
+        order = list(range(len(matrix)))
+        if order and ((start is not None and order[0] != start) or (end is not None and order[-1] != end)):
+            order.reverse()
+        return order
+    order = nearest_neighbour(matrix, start, end)
+    fix_start, fix_end = start is not None, end is not None
+    while True:
+        length = tour_length(order, matrix)
+        order = or_opt(two_opt(order, matrix, fix_start, fix_end), matrix, fix_start, fix_end)
+        if tour_length(order, matrix) >= length - 1e-9:
+            return order
+
+
+def optimize_tour(stops: Sequence[Tuple[float, float]], position: Optional[Tuple[float, float]] = None,
+                  keep_first: bool = False, keep_last: bool = False, graph=None,
+                  speed: float = TOUR_SPEED) -> TourPlan:
+    """Best visiting order for tour stops
+
+    position is where the robot starts (not a stop); keep_first and
+    keep_last pin the first and last stops as given. Lengths include the
+    drive from position to the first stop.
+    """
+    points = ([tuple(position)] if position is not None else []) + [tuple(s) for s in stops]
+    offset = 1 if position is not None else 0
+    matrix = distance_matrix(points, graph)
+
+    end = len(points) - 1 if keep_last and stops else None
+    if position is not None and keep_first and stops:
+        # The drive to the pinned first stop is fixed; optimize the rest starting from it
+        rest = list(range(1, len(points)))
+        sub_order = plan_order(matrix[np.ix_(rest, rest)], 0, end - 1 if end is not None else None)
+        order = [0] + [rest[i] for i in sub_order]
+    else:
+        start = 0 if position is not None or keep_first else None
+        order = plan_order(matrix, start, end)
+    # The search is a heuristic; the order as given satisfies every pin, so never return a longer one
+    listed = list(range(len(points)))
+    if tour_length(order, matrix) > tour_length(listed, matrix):
+        order = listed
+
+    plan = TourPlan(order=[i - offset for i in order if i >= offset], length=tour_length(order, matrix),
+                    original_length=tour_length(listed, matrix), speed=speed)
+    logger.info(f"Tour order {plan.order}: {plan.length:.0f}m instead of {plan.original_length:.0f}m, "
+                f"about {plan.saved_seconds / 60:.1f} min saved")
+    return plan
+
+
+def _brute_force(matrix: np.ndarray, start: Optional[int], end: Optional[int]) -> float:
+    """Shortest open path by trying every order (small n only)"""
+    from itertools import permutations
+    n = len(matrix)
+    best = float("inf")
+    for order in permutations(range(n)):
+        if (start is not None and order[0] != start) or (end is not None and order[-1] != end):
+            continue
+        best = min(best, tour_length(order, matrix))
+    return best
+
+
+def benchmark(trials: int = 50, stops: int = 7, seed: int = 12):
+    """Heuristic tour length against the optimum, and the saving over the listed order"""
+    rng = np.random.default_rng(seed)
+    gaps, savings, times = [], [], []
+    for _ in range(trials):
+        xy = rng.uniform(0, 800, (stops + 1, 2))
+        matrix = np.hypot(xy[:, None, 0] - xy[None, :, 0], xy[:, None, 1] - xy[None, :, 1])
+        start = time.perf_counter()
+        order = plan_order(matrix, start=0)
+        times.append(time.perf_counter() - start)
+        length = tour_length(order, matrix)
+        gaps.append(length / _brute_force(matrix, 0, None) - 1)
+        savings.append(1 - length / tour_length(range(stops + 1), matrix))
+    print(f"{trials} random {stops}-stop tours: mean gap to optimum {100 * np.mean(gaps):.2f}% "
+          f"(worst {100 * max(gaps):.2f}%), {100 * np.mean(savings):.0f}% shorter than the listed order, "
+          f"{1000 * np.mean(times):.2f} ms per plan")
+
+    xy = rng.uniform(0, 1500, (40, 2))
+    matrix = np.hypot(xy[:, None, 0] - xy[None, :, 0], xy[:, None, 1] - xy[None, :, 1])
+    start = time.perf_counter()
+    order = plan_order(matrix, start=0, end=39)
+    print(f"40 stops with fixed ends: {tour_length(order, matrix):.0f}m vs {tour_length(range(40), matrix):.0f}m "
+          f"listed, planned in {1000 * (time.perf_counter() - start):.0f} ms")
+
+
+if __name__ == "__main__":
+    benchmark()
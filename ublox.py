@@ -0,0 +1,255 @@
+# ublox.py
+
+import math
+import time
+import struct
+import logging
+from typing import List, Optional, Tuple
+
+from nmea import GPSFix
+
+logger = logging.getLogger("RobotNavigation")
+
+# UBX frame: 0xB5 0x62 | class | id | length (U2) | payload | CK_A CK_B
+SYNC = b"\xb5\x62"
+HEADER = struct.Struct("<BBH")
+MAX_PAYLOAD = 512
+
+CLS_NAV, CLS_ACK, CLS_CFG, CLS_NMEA = 0x01, 0x05, 0x06, 0xF0
+NAV_PVT = 0x07
+ACK_NAK, ACK_ACK = 0x00, 0x01
+CFG_PRT, CFG_MSG, CFG_RATE = 0x00, 0x01, 0x08
+
+# Standard NMEA output (class 0xF0) switched off once NAV-PVT is flowing
+NMEA_SENTENCES = {"GGA": 0x00, "GLL": 0x01, "GSA": 0x02, "GSV": 0x03, "RMC": 0x04, "VTG": 0x05}
+
+# NAV-PVT (protocol 15+), 92 bytes
+NAV_PVT_FORMAT = struct.Struct("<IHBBBBBBIiBBBBiiiiIIiiiiiIIH6xihH")
+UART1 = 1
+MODE_8N1 = 0x08D0
+PROTO_UBX, PROTO_NMEA = 0x01, 0x02
+
+ACK_TIMEOUT = 1.0  # seconds to wait for ACK-ACK after a CFG message
+PVT_TIMEOUT = 2.0  # seconds to wait for the first NAV-PVT after enabling it
+
+
+def checksum(data) -> Tuple[int, int]:
+    """8-bit Fletcher checksum over class, id, length and payload"""
+    ck_a = ck_b = 0
+    for byte in data:
+        ck_a = (ck_a + byte) & 0xFF
+        ck_b = (ck_b + ck_a) & 0xFF
+    return ck_a, ck_b
+
+
+def ubx_frame(msg_class: int, msg_id: int, payload: bytes = b"") -> bytes:
+    body = HEADER.pack(msg_class, msg_id, len(payload)) + payload
+    return SYNC + body + bytes(checksum(body))
+
+
+def cfg_prt(baud: int, out_proto: int = PROTO_UBX | PROTO_NMEA) -> bytes:
+    """CFG-PRT for UART1: 8N1 at `baud`, UBX+NMEA in, `out_proto` out"""
+    payload = struct.pack("<BBHIIHHHH", UART1, 0, 0, MODE_8N1, baud, PROTO_UBX | PROTO_NMEA, out_proto, 0, 0)
+    return ubx_frame(CLS_CFG, CFG_PRT, payload)
+
+
+def cfg_rate(rate_hz: float) -> bytes:
+    """CFG-RATE: measurement period in ms, one solution per measurement, GPS time"""
+    return ubx_frame(CLS_CFG, CFG_RATE, struct.pack("<HHH", int(round(1000 / rate_hz)), 1, 1))
+
+
+def cfg_msg(msg_class: int, msg_id: int, rate: int) -> bytes:
+    """CFG-MSG: output rate of one message on the current port (0 = off)"""
+    return ubx_frame(CLS_CFG, CFG_MSG, struct.pack("<BBB", msg_class, msg_id, rate))
+
+
+def encode_nav_pvt(lat: float, lon: float, fix_type: int = 3, num_sv: int = 10, speed: float = 0.0,
+                   heading: float = 0.0, h_acc: float = 2.5, itow: int = 0) -> bytes:
+    """Build a NAV-PVT frame (for recorded-stream replay and simulators)"""
+    vel_n = int(speed * 1000 * math.cos(math.radians(heading)))
+    vel_e = int(speed * 1000 * math.sin(math.radians(heading)))
+    flags = 0x01 if fix_type >= 2 else 0x00  # gnssFixOK
+    payload = NAV_PVT_FORMAT.pack(
+        itow, 2026, 1, 1, 12, 0, 0, 0x07, 50, 0, fix_type, flags, 0, num_sv,
+        int(round(lon * 1e7)), int(round(lat * 1e7)), 500000, 450000,
+        int(h_acc * 1000), int(h_acc * 1500), vel_n, vel_e, 0,
+        int(speed * 1000), int(round(heading * 1e5)) % 36000000, 200, 500000, 150, 0, 0, 0)
+    return ubx_frame(CLS_NAV, NAV_PVT, payload)
+
+
+def nav_pvt_to_fix(payload, t: Optional[float] = None) -> GPSFix:
+    """Convert a NAV-PVT payload to the same fix record the NMEA parser produces"""
+    (itow, year, month, day, hour, minute, second, valid, t_acc, nano, fix_type, flags, flags2,
+     num_sv, lon, lat, height, h_msl, h_acc, v_acc, vel_n, vel_e, vel_d, g_speed, head_mot,
+     s_acc, head_acc, p_dop, head_veh, mag_dec, mag_acc) = NAV_PVT_FORMAT.unpack_from(payload)
+    fix = GPSFix()
+    fix.t = time.monotonic() if t is None else t
+    fix.utc = f"{hour:02d}{minute:02d}{second:02d}.{max(nano, 0) // 10000000:02d}"
+    fix.valid = bool(flags & 0x01) and fix_type in (2, 3, 4)
+    fix.fix_type = fix_type if fix_type in (2, 3) else (1 if fix_type == 0 else fix_type)
+    fix.fix_quality = (2 if flags & 0x02 else 1) if fix.valid else 0
+    fix.satellites = num_sv
+    fix.pdop = p_dop / 100.0
+    fix.h_accuracy = h_acc / 1000.0
+    fix.altitude = h_msl / 1000.0
+    fix.speed = g_speed / 1000.0
+    fix.course = head_mot / 1e5
+    fix.talker = "UBX"
+    if fix.valid:
+        fix.lat = lat / 1e7
+        fix.lon = lon / 1e7
+    return fix
+
+
+class UBXStreamDecoder:
+    """Splits a receiver byte stream into UBX messages and NMEA sentences
+
+    The two protocols share the port while the receiver is being configured
+    (and after a failed configuration), so both are decoded from one buffer.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.checksum_errors = 0
+
+    def feed(self, data: bytes) -> List[tuple]:
+        """Return ("ubx", class, id, payload) and ("nmea", line) items in arrival order"""
+        buf = self.buffer
+        buf += data
+        items = []
+        pos = 0
+        while pos < len(buf):
+            byte = buf[pos]
+            if byte == 0xB5:
+                if len(buf) - pos < 6:
+                    break
+                if buf[pos + 1] != 0x62:
+                    pos += 1
+                    continue
+                msg_class, msg_id, length = HEADER.unpack_from(buf, pos + 2)
+                if length > MAX_PAYLOAD:
+                    pos += 1
+                    continue
+                end = pos + 6 + length + 2
+                if end > len(buf):
+                    break
+                if bytes(checksum(memoryview(buf)[pos + 2:end - 2])) != buf[end - 2:end]:
+                    self.checksum_errors += 1
+                    pos += 1
+                    continue
+                items.append(("ubx", msg_class, msg_id, bytes(buf[pos + 6:end - 2])))
+                self.frames += 1
+                pos = end
+            elif byte == ord("$"):
+                newline = buf.find(b"\n", pos)
+                if newline < 0:
+                    if len(buf) - pos > 120:  # longer than any NMEA sentence
+                        pos += 1
+                        continue
+                    break
+                items.append(("nmea", buf[pos:newline].decode("ascii", errors="replace").strip()))
+                pos = newline + 1
+            else:
+                pos += 1
+        del buf[:pos]
+        return items
+
+
+class UbloxConfigurator:
+    """Switches a NEO-M8N from 1 Hz NMEA to high-rate NAV-PVT
+
+    Works on any serial-like object with write(), read(), in_waiting and a
+    settable baudrate, so it can be driven by a recorded or fake byte stream.
+    configure() returns True only when NAV-PVT frames are arriving; otherwise
+    the receiver is left producing NMEA and the caller should parse that.
+    """
+
+    def __init__(self, ser, target_baud: int = 115200, rate_hz: float = 5.0):
+        self.ser = ser
+        self.target_baud = target_baud
+        self.rate_hz = rate_hz
+        self.decoder = UBXStreamDecoder()
+        self.pending: List[tuple] = []  # items read while waiting, replayed by the caller
+
+    def configure(self) -> bool:
+        try:
+            original_baud = self.ser.baudrate
+            if self.target_baud and self.target_baud != original_baud:
+                # The receiver switches immediately, so its ACK is sent at the new rate and lost
+                self.ser.write(cfg_prt(self.target_baud))
+                self.ser.flush()
+                time.sleep(0.1)
+                self.ser.baudrate = self.target_baud
+                self.ser.reset_input_buffer()
+                if not self._send_with_ack(cfg_prt(self.target_baud)):
+                    logger.warning(f"u-blox did not answer at {self.target_baud} baud, reverting to {original_baud}")
+                    self.ser.baudrate = original_baud
+                    return False
+
+            if not self._send_with_ack(cfg_rate(self.rate_hz)):
+                logger.warning("u-blox rejected CFG-RATE")
+                return False
+            if not self._send_with_ack(cfg_msg(CLS_NAV, NAV_PVT, 1)):
+                logger.warning("u-blox rejected NAV-PVT output")
+                return False
+            if not self._wait_for(lambda item: item[0] == "ubx" and item[1:3] == (CLS_NAV, NAV_PVT), PVT_TIMEOUT):
+                logger.warning("No NAV-PVT frames received after enabling them")
+                return False
+
+            # NAV-PVT is flowing: drop the NMEA sentences it replaces
+            for name, msg_id in NMEA_SENTENCES.items():
+                if not self._send_with_ack(cfg_msg(CLS_NMEA, msg_id, 0)):
+                    logger.warning(f"Could not disable NMEA {name} output")
+            logger.info(f"u-blox configured for NAV-PVT at {self.rate_hz} Hz, {self.ser.baudrate} baud")
+            return True
+        except Exception as e:
+            logger.error(f"u-blox configuration failed: {e}")
+            return False
+
+    def _send_with_ack(self, frame: bytes) -> bool:
+        self.ser.write(frame)
+        msg_class, msg_id = frame[2], frame[3]
+
+        def is_ack(item):
+            return item[0] == "ubx" and item[1] == CLS_ACK and item[3][:2] == bytes((msg_class, msg_id))
+        item = self._wait_for(is_ack, ACK_TIMEOUT)
+        return item is not None and item[2] == ACK_ACK
+
+    def _wait_for(self, predicate, timeout: float) -> Optional[tuple]:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            data = self.ser.read(self.ser.in_waiting or 1)
+            for item in self.decoder.feed(data):
+                if predicate(item):
+                    return item
+                self.pending.append(item)
+        return None
+
+
+def replay(stream: bytes, chunk: int = 37):
+    """Decode a recorded receiver byte stream and print the fixes (for offline checks)"""
+    decoder = UBXStreamDecoder()
+    fixes = 0
+    start = time.perf_counter()
+    for i in range(0, len(stream), chunk):
+        for item in decoder.feed(stream[i:i + chunk]):
+            if item[0] == "ubx" and item[1:3] == (CLS_NAV, NAV_PVT):
+                fix = nav_pvt_to_fix(item[3])
+                fixes += 1
+    elapsed = time.perf_counter() - start
+    print(f"{fixes} NAV-PVT fixes, {decoder.checksum_errors} checksum errors, "
+          f"{1e6 * elapsed / max(fixes, 1):.2f} us/fix")
+    if fixes:
+        print(fix, f"h_accuracy={fix.h_accuracy} m")
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            replay(f.read())
+    else:
+        frames = [encode_nav_pvt(30.2752 + i * 1e-6, 78.0439, speed=1.2, heading=45.0, itow=i * 200)
+                  for i in range(5000)]
+        replay(b"$GNTXT,01,01,02,u-blox AG*4C\r\n".join(frames))